@@ -0,0 +1 @@
+"""Benchmarks y corpus de referencia (golden) de las reglas SARKOB."""
@@ -0,0 +1,186 @@
+"""Benchmarks de las reglas, del pipeline individual, del modo lote, de la evaluación en paralelo, de los barridos, de los informes en lote, del cubo de cohorte y de la app.
+
+    python -m benchmarks.bench                  # ejecuta todo y compara con baseline.json
+    python -m benchmarks.bench --solo micro,pipeline
+    python -m benchmarks.bench --guardar        # guarda los tiempos como nueva referencia
+
+Cada medida es el mejor tiempo (en segundos por operación) de varias
+repeticiones. La comparación marca como regresión cualquier medida más lenta
+que la referencia por encima de `--tolerancia` (por defecto ×1.5); la
+referencia depende de la máquina, así que conviene regenerarla en cada nodo.
+`--guardar` anota además el nº de CPU (`maquina.cpus`); con otro nº de CPU
+las medidas del grupo paralelo se muestran pero no se comparan. La referencia
+incluida es de una máquina de 1 CPU: el escalado en paralelo hay que medirlo
+(`--solo paralelo --guardar`) en un nodo con varios núcleos.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+from typing import Callable, Dict
+
+from sarkob import (
+    ENTRADAS, evaluar, filas_tabla, construir_informe, COLUMNAS,
+    handgrip_percentile, calf_cutoff_adjusted, smm_weight_pct_label, sarcf_score,
+)
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Paciente completo (todas las medidas informadas)
+PACIENTE = dict(ENTRADAS, sex_in="female", age_in=67, height_cm=158.0, weight_kg=92.4,
+                s1=1, s2=1, s3=0, s4=2, falls_n=2, hand_kg=15.2, time_4m=5.6, chair5_s=18.3,
+                fat_pct=44.1, vat_cm2=142.0, vatsat=0.55, waist_cm=112.0, hip_cm=121.0,
+                neck_cm=37.2, smm_kg=20.1, dxa_alm_kg=16.8, calf_cm=36.5)
+
+def _mejor(fn: Callable[[], object], number: int, repeat: int = 7) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+def micro() -> Dict[str, float]:
+    return {
+        "micro.handgrip_percentile": _mejor(lambda: handgrip_percentile(15.2, "female", 67), 100_000),
+        "micro.calf_cutoff_adjusted": _mejor(lambda: calf_cutoff_adjusted("female", 37.0), 200_000),
+        "micro.smm_weight_pct_label": _mejor(lambda: smm_weight_pct_label(21.8, "female"), 200_000),
+        "micro.sarcf_score": _mejor(lambda: sarcf_score(1, 1, 0, 2, 1), 100_000),
+    }
+
+def pipeline() -> Dict[str, float]:
+    import pandas as pd
+    r0 = evaluar(**PACIENTE)
+
+    def completo():
+        r = evaluar(**PACIENTE)
+        pd.DataFrame(filas_tabla(PACIENTE, r), columns=COLUMNAS)
+        construir_informe(PACIENTE, r)
+
+    return {
+        "pipeline.evaluar": _mejor(lambda: evaluar(**PACIENTE), 20_000),
+        "pipeline.tabla_informe": _mejor(lambda: (filas_tabla(PACIENTE, r0), construir_informe(PACIENTE, r0)), 20_000),
+        "pipeline.completo": _mejor(completo, 2_000),
+    }
+
+def lote(tamanos=(10_000, 100_000, 1_000_000)) -> Dict[str, float]:
+    from sarkob import evaluar_cohorte
+    from .sintetico import cohorte_sintetica
+    out = {}
+    for n in tamanos:
+        df = cohorte_sintetica(n)
+        out[f"lote.evaluar_cohorte.{n}"] = _mejor(lambda: evaluar_cohorte(df), 1, repeat=3)
+    return out
+
+def paralelo(n: int = 1_000_000) -> Dict[str, float]:
+    # curva de escalado: 1, 2, 4… procesos hasta los núcleos de la máquina
+    from sarkob import evaluar_cohorte
+    from sarkob.paralelo import EvaluadorParalelo
+    from .sintetico import cohorte_sintetica
+    df = cohorte_sintetica(n)
+    out = {f"paralelo.serie.{n}": _mejor(lambda: evaluar_cohorte(df), 1, repeat=3)}
+    p = 1
+    while p <= (os.cpu_count() or 1):
+        with EvaluadorParalelo(p) as ev:
+            ev.evaluar(df)  # arranque del pool y reserva de memoria fuera de la medida
+            out[f"paralelo.p{p}.{n}"] = _mejor(lambda: ev.evaluar(df), 1, repeat=3)
+        p *= 2
+    return out
+
+def barrido(n: int = 1_000_000, puntos: int = 200) -> Dict[str, float]:
+    import numpy as np
+    from sarkob.sensibilidad import Sensibilidad
+    from .sintetico import cohorte_sintetica
+    s = Sensibilidad(cohorte_sintetica(n))
+    g1, g2 = np.linspace(12, 20, puntos), np.linspace(15, 35, puntos)
+    return {
+        f"barrido.1d.{n}x{puntos}": _mejor(lambda: s.barrer("chair5_slow_s", g1), 1, repeat=5),
+        f"barrido.2d.{n}x{puntos}x{puntos}": _mejor(
+            lambda: s.barrer("handgrip_low.female", g1 + 4, "smmwt_sarc_cut.female", g2), 1, repeat=5),
+    }
+
+def informes(n: int = 50_000) -> Dict[str, float]:
+    import io
+    from sarkob.exportacion import escribir_informes, informes_df
+    from .sintetico import cohorte_sintetica
+    df = cohorte_sintetica(n)
+    return {f"informes.{fmt}.{n}": _mejor(lambda: escribir_informes(io.BytesIO(), informes_df(df), fmt), 1, repeat=3)
+            for fmt in ("zip", "csv")}
+
+def cubo(n: int = 1_000_000) -> Dict[str, float]:
+    from sarkob.cubo import construir_cubo
+    from .sintetico import cohorte_sintetica
+    df = cohorte_sintetica(n)
+    c = construir_cubo(df)
+    filtros = dict(sexo=["female"], clase_imc=["obesidad I", "obesidad II"], diagnostico=["sarcopenia"])
+
+    def consulta():
+        c.prevalencia("banda_edad", **filtros)
+        c.distribucion("perc", "banda_edad", **filtros)
+        c.resumen("perc", "banda_edad", **filtros)
+
+    return {f"cubo.construir.{n}": _mejor(lambda: construir_cubo(df), 1, repeat=3),
+            "cubo.consulta": _mejor(consulta, 20)}
+
+def rerun(n: int = 30) -> Dict[str, float]:
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    tiempos = []
+    for i in range(n):
+        # alterna una medida que sólo afecta a una fila y otra que cambia el diagnóstico
+        at.number_input[16 if i % 2 else 8].set_value(30.0 + i * 0.1)
+        t0 = time.perf_counter()
+        at.run()
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    return {"rerun.mediana": tiempos[len(tiempos) // 2], "rerun.p90": tiempos[int(len(tiempos) * 0.9)]}
+
+GRUPOS = {"micro": micro, "pipeline": pipeline, "lote": lote, "paralelo": paralelo, "barrido": barrido, "informes": informes, "cubo": cubo, "rerun": rerun}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench", description=__doc__.splitlines()[0])
+    ap.add_argument("--solo", default=",".join(GRUPOS), help="grupos separados por comas: " + ", ".join(GRUPOS))
+    ap.add_argument("--tamanos", default="10000,100000,1000000", help="tamaños de cohorte del grupo lote")
+    ap.add_argument("--guardar", action="store_true", help=f"guarda los resultados en {os.path.basename(BASELINE)}")
+    ap.add_argument("--tolerancia", type=float, default=1.5, help="factor de enlentecimiento tolerado")
+    args = ap.parse_args(argv)
+
+    res: Dict[str, float] = {}
+    for g in args.solo.split(","):
+        if g == "lote":
+            res.update(lote(tuple(int(x) for x in args.tamanos.split(","))))
+        else:
+            res.update(GRUPOS[g]())
+
+    ref = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            ref = json.load(f)
+    cpus = os.cpu_count() or 1
+    otra_maquina = ref.get("maquina.cpus", cpus) != cpus
+    if otra_maquina:
+        print(f"aviso: la referencia se midió con {ref['maquina.cpus']} CPU y esta máquina tiene {cpus}; "
+              "el grupo paralelo no se compara")
+    regresiones = 0
+    for k, v in res.items():
+        linea = f"{k:40s} {v * 1e6:14.2f} µs"
+        if k.startswith(("lote.", "paralelo.", "informes.")):
+            linea += f"  ({int(k.rsplit('.', 1)[1]) / v:,.0f} filas/s)"
+        if k.startswith("paralelo.p") and "paralelo.serie." + k.rsplit(".", 1)[1] in res:
+            linea += f"  ×{res['paralelo.serie.' + k.rsplit('.', 1)[1]] / v:.2f} vs serie"
+        if k in ref and not (otra_maquina and k.startswith("paralelo.")):
+            ratio = v / ref[k]
+            linea += f"  ×{ratio:.2f} vs referencia"
+            if ratio > args.tolerancia:
+                linea += "  ← REGRESIÓN"
+                regresiones += 1
+        print(linea)
+    if args.guardar:
+        ref.update(res)
+        ref["maquina.cpus"] = cpus
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(ref, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if regresiones and not args.guardar else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
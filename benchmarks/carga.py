@@ -0,0 +1,104 @@
+"""Generador de carga para el servicio HTTP (`sarkob.servicio`).
+
+    python -m benchmarks.carga --arrancar --conexiones 300 --peticiones 20000
+    python -m benchmarks.carga --puerto 8750 --lote 500 --peticiones 200
+
+Abre `--conexiones` conexiones keep-alive concurrentes contra localhost y
+reparte entre ellas `--peticiones` peticiones a /evaluar (o a /lote con
+`--lote N` pacientes por petición). Informa del rendimiento y de los
+percentiles de latencia (p50/p90/p99/máx). Con `--arrancar` lanza el
+servicio en un subproceso y lo para al terminar.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import List
+
+from .sintetico import cohorte_sintetica
+
+async def _peticion(reader, writer, ruta: str, cuerpo: bytes) -> int:
+    writer.write((f"POST {ruta} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(cuerpo)}\r\n\r\n").encode("latin-1") + cuerpo)
+    await writer.drain()
+    cabecera = await reader.readuntil(b"\r\n\r\n")
+    estado = int(cabecera.split(b" ", 2)[1])
+    n = 0
+    for linea in cabecera.split(b"\r\n"):
+        if linea.lower().startswith(b"content-length:"):
+            n = int(linea.split(b":", 1)[1])
+    await reader.readexactly(n)
+    return estado
+
+async def _cliente(host, puerto, ruta, cuerpos: List[bytes], latencias: List[float], errores: List[int]):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        for cuerpo in cuerpos:
+            t0 = time.perf_counter()
+            estado = await _peticion(reader, writer, ruta, cuerpo)
+            latencias.append(time.perf_counter() - t0)
+            if estado != 200: errores.append(estado)
+    finally:
+        writer.close()
+
+async def _esperar(host, puerto, timeout=20.0):
+    fin = time.monotonic() + timeout
+    while True:
+        try:
+            _, w = await asyncio.open_connection(host, puerto)
+            w.close()
+            return
+        except OSError:
+            if time.monotonic() > fin: raise
+            await asyncio.sleep(0.1)
+
+async def ejecutar(host: str, puerto: int, conexiones: int, peticiones: int, lote: int) -> dict:
+    pacientes = cohorte_sintetica(max(1000, lote)).to_dict("records")
+    if lote:
+        ruta = "/lote"
+        cuerpos = [json.dumps({"pacientes": pacientes[:lote]}).encode()]
+    else:
+        ruta = "/evaluar"
+        cuerpos = [json.dumps(p).encode() for p in pacientes]
+    por_conexion = [[cuerpos[i % len(cuerpos)] for i in range(c, peticiones, conexiones)]
+                    for c in range(conexiones)]
+    await _esperar(host, puerto)
+    latencias: List[float] = []
+    errores: List[int] = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_cliente(host, puerto, ruta, cs, latencias, errores) for cs in por_conexion if cs))
+    dt = time.perf_counter() - t0
+    latencias.sort()
+    pct = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    return {"peticiones": len(latencias), "errores": len(errores), "segundos": dt,
+            "peticiones_s": len(latencias) / dt, "pacientes_s": len(latencias) * max(1, lote) / dt,
+            "p50_ms": pct(0.50), "p90_ms": pct(0.90), "p99_ms": pct(0.99), "max_ms": latencias[-1] * 1000}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.carga", description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8750)
+    ap.add_argument("--conexiones", type=int, default=200)
+    ap.add_argument("--peticiones", type=int, default=10_000)
+    ap.add_argument("--lote", type=int, default=0, help="pacientes por petición a /lote (0 = usar /evaluar)")
+    ap.add_argument("--arrancar", action="store_true", help="lanza el servicio en un subproceso")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.arrancar:
+        proc = subprocess.Popen([sys.executable, "-m", "sarkob.servicio", "--host", args.host, "--puerto", str(args.puerto)])
+    try:
+        r = asyncio.run(ejecutar(args.host, args.puerto, args.conexiones, args.peticiones, args.lote))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print(f"{r['peticiones']} peticiones ({r['errores']} errores) en {r['segundos']:.2f} s: "
+          f"{r['peticiones_s']:.0f} pet/s, {r['pacientes_s']:.0f} pacientes/s")
+    print(f"latencia ms: p50 {r['p50_ms']:.2f}  p90 {r['p90_ms']:.2f}  p99 {r['p99_ms']:.2f}  máx {r['max_ms']:.2f}")
+    return 1 if r["errores"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Corpus golden de casos SARKOB.
+
+    python -m benchmarks.golden --generar   # regenera benchmarks/golden.jsonl
+    python -m benchmarks.golden             # comprueba todos los motores contra el corpus
+
+Los casos cubren todas las bandas de edad de `_PERC_TABLE` (y edades fuera de
+banda), ambos sexos, todas las bandas de IMC de `calf_cutoff_adjusted`, cada
+umbral de `Thr` justo por debajo, en y por encima del corte, y todas las
+combinaciones de criterios del diagnóstico. Cada línea guarda las entradas,
+las salidas de `evaluar` y un hash de la tabla + informe. La comprobación
+exige igualdad exacta de `evaluar`, `Derivados`, `evaluar_cohorte` y
+`evaluar_paralelo`, y que las matrices de confusión de `Sensibilidad.barrer`
+(sumas acumuladas) coincidan con reevaluar la cohorte con `evaluar_cohorte`
+en puntos al azar de la rejilla de cada eje de `EJES` y de cada par de ejes.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from itertools import combinations, product
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from sarkob import ENTRADAS, T, evaluar, filas_tabla, construir_informe
+from sarkob.percentiles import _PERC_TABLE, _PERCENT_KEYS
+from sarkob.perfiles import UMBRALES
+
+RUTA = os.path.join(os.path.dirname(__file__), "golden.jsonl")
+SEXOS = ("female", "male")
+# IMC objetivo (talla 170 cm) que recorre todas las bandas del ajuste de pantorrilla
+IMCS = (None, 18.5, 24.9, 25.0, 29.9, 30.0, 39.9, 40.0, 48.0)
+
+def _caso(**kw) -> Dict[str, Any]:
+    e = dict(ENTRADAS)
+    e.update(kw)
+    return e
+
+def _peso(bmi):
+    return 0.0 if bmi is None else round(bmi * 1.7**2, 1)
+
+def _umbrales(sex: str, cut: float, campo: str) -> List[Dict[str, Any]]:
+    # Traduce un corte de Thr a las entradas que lo ponen a prueba
+    out = []
+    for d in (-0.1, 0.0, 0.1):
+        c = round(cut + d, 4)
+        out.append({
+            "handgrip_low":        lambda: _caso(sex_in=sex, hand_kg=c),
+            "gait_slow_mps":       lambda: _caso(sex_in=sex, time_4m=round(4.0 / c, 4)),
+            "chair5_slow_s":       lambda: _caso(sex_in=sex, chair5_s=c),
+            "waist_elev":          lambda: _caso(sex_in=sex, waist_cm=c),
+            "whr_elev":            lambda: _caso(sex_in=sex, waist_cm=round(c * 100, 4), hip_cm=100.0),
+            "whtr_elev":           lambda: _caso(sex_in=sex, waist_cm=round(c * 170, 4)),
+            "neck_ow":             lambda: _caso(sex_in=sex, neck_cm=c),
+            "neck_ob":             lambda: _caso(sex_in=sex, neck_cm=c),
+            "calf_base":           lambda: _caso(sex_in=sex, weight_kg=60.0, calf_cm=c),
+            # talla 100 cm → IMC = peso; pantorrilla justo bajo el corte base
+            "calf_bmi_adj":        lambda: _caso(sex_in=sex, height_cm=100.0, weight_kg=c, calf_cm=T.calf_base[sex] - 1.0),
+            "fat_obese_pct":       lambda: _caso(sex_in=sex, fat_pct=c),
+            "vat_high_cm2":        lambda: _caso(sex_in=sex, vat_cm2=c),
+            "vatsat_high":         lambda: _caso(sex_in=sex, vatsat=c),
+            "smmwt_sarc_cut":      lambda: _caso(sex_in=sex, weight_kg=100.0, smm_kg=c),
+            "smmwt_lowmass_upper": lambda: _caso(sex_in=sex, weight_kg=100.0, smm_kg=c),
+            "dxa_almwt_low_pct":   lambda: _caso(sex_in=sex, weight_kg=100.0, dxa_alm_kg=c),
+            "sarcf_pos_cut":       lambda: _caso(sex_in=sex, **dict(zip(("s1", "s2", "s3", "s4"), _items(round(cut + d * 10))))),
+        }[campo]())
+    return out
+
+def _items(score: int) -> List[int]:
+    return [min(2, max(0, score - 2 * i)) for i in range(4)]
+
+def casos() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # 1) Bandas de edad × sexo × IMC, con la fuerza en cada punto de la fila y entre puntos
+    for sex in SEXOS:
+        for b, row in enumerate(_PERC_TABLE[sex]):
+            vals = sorted(row[k] for k in _PERCENT_KEYS)
+            fuerzas = [vals[0] - 1.0] + vals + [round((a + c) / 2, 2) for a, c in zip(vals, vals[1:])] + [vals[-1] + 1.0]
+            for i, h in enumerate(fuerzas):
+                bmi = IMCS[(b + i) % len(IMCS)]
+                age = row["age_min"] if i % 2 else row["age_max"]
+                calf = round(T.calf_base[sex] - 6 + (i % 5) * 1.5, 1)
+                yield "bandas", _caso(sex_in=sex, age_in=age, hand_kg=h, weight_kg=_peso(bmi), calf_cm=calf,
+                                      time_4m=4.0 + (i % 3), smm_kg=round(_peso(bmi) * 0.3, 1))
+    # 2) Edades fuera de banda o en los bordes
+    for sex, age in product(SEXOS, (None, 0, 19, 19.5, 20, 24, 24.5, 25, 99.5, 100, 150, 150.5, 151)):
+        yield "edades", _caso(sex_in=sex, age_in=age, hand_kg=30.0)
+    # 3) Cada umbral de Thr justo por debajo, en y por encima del corte
+    for campo, sex in product(UMBRALES, SEXOS):
+        cut = getattr(T, campo)
+        cortes = [d for d, _ in cut] if campo == "calf_bmi_adj" else [cut[sex] if isinstance(cut, dict) else cut]
+        for c in cortes:
+            for e in _umbrales(sex, c, campo):
+                yield f"umbral:{campo}", e
+    # 4) Combinaciones de criterios del diagnóstico
+    for sex, fuerza, marcha, silla, smm, dxa in product(SEXOS, *([(False, True)] * 5)):
+        yield "diagnostico", _caso(
+            sex_in=sex, weight_kg=100.0,
+            hand_kg=(T.handgrip_low[sex] - 1 if fuerza else T.handgrip_low[sex] + 1),
+            time_4m=(6.0 if marcha else 4.0), chair5_s=(20.0 if silla else 10.0),
+            smm_kg=(T.smmwt_sarc_cut[sex] - 1 if smm else T.smmwt_lowmass_upper[sex] + 1),
+            dxa_alm_kg=(T.dxa_almwt_low_pct[sex] - 1 if dxa else T.dxa_almwt_low_pct[sex] + 1))
+
+def huella(e: Dict[str, Any], r: Dict[str, Any]) -> str:
+    texto = json.dumps(filas_tabla(e, r), ensure_ascii=False) + "\n" + construir_informe(e, r)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+def generar(ruta: str = RUTA) -> int:
+    n = 0
+    with open(ruta, "w", encoding="utf-8") as f:
+        for n, (grupo, e) in enumerate(casos(), 1):
+            r = evaluar(**e)
+            f.write(json.dumps({"caso": n, "grupo": grupo, "entradas": e, "salidas": r,
+                                "huella": huella(e, r)}, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return n
+
+def cargar(ruta: str = RUTA) -> List[Dict[str, Any]]:
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def _igual(esperado, obtenido) -> bool:
+    if esperado is None:
+        return obtenido is None or (isinstance(obtenido, float) and math.isnan(obtenido))
+    return esperado == obtenido
+
+def comprobar(ruta: str = RUTA, procesos: int = 2) -> List[str]:
+    """Devuelve la lista de discrepancias (vacía si todos los motores coinciden)."""
+    from sarkob.derivados import Derivados
+    fallos: List[str] = []
+    corpus = cargar(ruta)
+
+    def comparar(motor, c, obtenido):
+        for k, v in c["salidas"].items():
+            if not _igual(v, obtenido[k]):
+                fallos.append(f"{motor} caso {c['caso']} ({c['grupo']}): {k} = {obtenido[k]!r}, esperado {v!r}")
+
+    deriv = Derivados()
+    for c in corpus:
+        r = evaluar(**c["entradas"])
+        comparar("evaluar", c, r)
+        if huella(c["entradas"], r) != c["huella"]:
+            fallos.append(f"informe caso {c['caso']} ({c['grupo']}): tabla/informe distintos")
+        comparar("derivados", c, deriv.actualizar(c["entradas"]))
+
+    import pandas as pd
+    from sarkob import evaluar_cohorte, evaluar_paralelo
+    df = pd.DataFrame([c["entradas"] for c in corpus])
+    motores = [("cohorte", evaluar_cohorte(df))]
+    if procesos > 1:
+        motores.append(("paralelo", evaluar_paralelo(df, procesos=procesos)))
+    for motor, res in motores:
+        filas = res.astype(object).to_dict("records")
+        for c, r in zip(corpus, filas):
+            comparar(motor, c, r)
+    return fallos + comprobar_barridos(df)
+
+def _puntos(rng, v: np.ndarray, n: int) -> np.ndarray:
+    # la mitad, valores de la propia cohorte (empates con el corte); el resto, al azar en su rango
+    v = v[~np.isnan(v)]
+    if not len(v):
+        return rng.uniform(0, 1, n)
+    return np.concatenate([rng.choice(v, n // 2), rng.uniform(v.min() - 1, v.max() + 1, n - n // 2)])
+
+def comprobar_barridos(df, semilla: int = 0, puntos: int = 6) -> List[str]:
+    """Discrepancias entre `Sensibilidad.barrer` y evaluar la cohorte completa con
+    el perfil de cada punto (`perfil_en`), en `puntos` puntos al azar por eje y
+    3 × 3 por cada par de ejes. Se añade una cohorte sintética al corpus."""
+    import pandas as pd
+    from sarkob import evaluar_cohorte
+    from sarkob.sensibilidad import CRITERIOS, EJES, Sensibilidad, _eje
+    from .sintetico import cohorte_sintetica
+    df = pd.concat([df, cohorte_sintetica(2_000, seed=semilla)], ignore_index=True)
+    rng = np.random.default_rng(semilla)
+    s = Sensibilidad(df)
+    ref = evaluar_cohorte(df)["diagnostico"].cat.codes.to_numpy()
+    fallos: List[str] = []
+
+    def rejilla(eje, n):
+        u, sexo = _eje(eje)
+        v = s.medidas[CRITERIOS[u][1]]
+        return _puntos(rng, v if sexo is None else v[s.sexo == sexo], n)
+
+    def comparar(b):
+        for idx in np.ndindex(*(len(g) for g in b.valores)):
+            dx = evaluar_cohorte(df, s.perfil_en(b, *idx))["diagnostico"].cat.codes.to_numpy()
+            esperado = np.zeros((3, 3), dtype=np.int64)
+            np.add.at(esperado, (ref, dx), 1)
+            obtenido = b.confusion[(slice(None), slice(None), *idx)]
+            if not np.array_equal(obtenido, esperado):
+                punto = ", ".join(f"{e} = {float(g[i])!r}" for e, g, i in zip(b.ejes, b.valores, idx))
+                fallos.append(f"barrido {punto}: {obtenido.tolist()}, esperado {esperado.tolist()}")
+
+    for e in EJES:
+        comparar(s.barrer(e, rejilla(e, puntos)))
+    for e1, e2 in combinations(EJES, 2):
+        comparar(s.barrer(e1, rejilla(e1, 3), e2, rejilla(e2, 3)))
+    return fallos
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.golden", description=__doc__.splitlines()[0])
+    ap.add_argument("--generar", action="store_true", help="regenera el corpus con la implementación actual")
+    ap.add_argument("--procesos", type=int, default=2, help="procesos para comprobar evaluar_paralelo (1 = omitir)")
+    args = ap.parse_args(argv)
+    if args.generar:
+        print(f"{generar()} casos escritos en {RUTA}")
+        return 0
+    fallos = comprobar(procesos=args.procesos)
+    for f in fallos[:50]:
+        print(f)
+    print(f"{len(cargar())} casos, {len(fallos)} discrepancias")
+    return 1 if fallos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Cohortes sintéticas reproducibles para benchmarks y pruebas de carga."""
+import numpy as np
+import pandas as pd
+
+def cohorte_sintetica(n: int, seed: int = 0, p_vacio: float = 0.2) -> pd.DataFrame:
+    """`n` pacientes con los campos del formulario; ~`p_vacio` de cada medida a 0 (no medida)."""
+    rng = np.random.default_rng(seed)
+
+    def medida(lo, hi, dec=1):
+        v = np.round(rng.uniform(lo, hi, n), dec)
+        v[rng.random(n) < p_vacio] = 0.0
+        return v
+
+    return pd.DataFrame({
+        "sex_in": rng.choice(["female", "male"], n),
+        "age_in": rng.integers(18, 101, n),
+        "height_cm": np.round(rng.uniform(145, 200, n), 1),
+        "weight_kg": np.round(rng.uniform(45, 180, n), 1),
+        "s1": rng.integers(0, 3, n), "s2": rng.integers(0, 3, n),
+        "s3": rng.integers(0, 3, n), "s4": rng.integers(0, 3, n),
+        "falls_n": rng.integers(0, 7, n),
+        "hand_kg": medida(5, 65), "time_4m": medida(2, 10), "chair5_s": medida(5, 30),
+        "fat_pct": medida(10, 55), "vat_cm2": medida(20, 320, 0), "vatsat": medida(0.1, 1.2, 2),
+        "waist_cm": medida(60, 160), "hip_cm": medida(70, 160), "neck_cm": medida(28, 50),
+        "smm_kg": medida(10, 50), "dxa_alm_kg": medida(8, 32), "calf_cm": medida(25, 48),
+    })
@@ -0,0 +1,141 @@
+import os
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sarkob import ENTRADAS, cargar_perfiles
+from sarkob.almacen import Almacen
+from sarkob.lotes import leer_cohorte
+from sarkob.sensibilidad import EJES, DIAGNOSTICOS, Sensibilidad
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_DB = os.environ.get("SARKOB_DB", "sarkob.db")
+DIR_PERFILES = os.environ.get("SARKOB_PERFILES", os.path.join(RAIZ, "perfiles"))
+
+# umbral → (nombre, mínimo, máximo, paso) de la rejilla
+RANGOS = {
+    "handgrip_low": ("Fuerza prensil (kg)", 5.0, 50.0, 0.5),
+    "gait_slow_mps": ("Velocidad de la marcha (m/s)", 0.3, 1.8, 0.01),
+    "chair5_slow_s": ("Silla-5 (s)", 5.0, 40.0, 0.1),
+    "smmwt_sarc_cut": ("SMM/peso muy baja (%)", 10.0, 50.0, 0.1),
+    "dxa_almwt_low_pct": ("DXA ALM/peso baja (%)", 10.0, 40.0, 0.1),
+}
+SEXO = {"female": "mujeres", "male": "hombres"}
+
+st.set_page_config(page_title="SARKOB – Sensibilidad de los puntos de corte", page_icon="🧬", layout="wide")
+
+# =========================
+# Datos (cacheados por origen y perfiles)
+# =========================
+@st.cache_resource
+def _perfiles(directorio):
+    return cargar_perfiles(directorio)
+
+@st.cache_resource(max_entries=2, show_spinner="Leyendo la cohorte…")
+def _cohorte(origen: str, _fuente=None):
+    if origen.startswith("registro:"):
+        with Almacen(RUTA_DB) as db:
+            return db.consultar_df(list(ENTRADAS)), 0
+    return leer_cohorte(_fuente, _fuente.name)
+
+@st.cache_resource(max_entries=4, show_spinner="Evaluando la cohorte…")
+def _sensibilidad(origen: str, base: str, referencia: str, _df, _perfiles):
+    return Sensibilidad(_df, _perfiles[base], _perfiles[referencia])
+
+def _nombre(eje: str) -> str:
+    u, _, s = eje.partition(".")
+    return RANGOS[u][0] + (f" – {SEXO[s]}" if s else "")
+
+def _actual(eje: str, thr) -> float:
+    u, _, s = eje.partition(".")
+    return getattr(thr, u)[s] if s else getattr(thr, u)
+
+def _rejilla(eje: str, thr, clave: str, puntos: int) -> np.ndarray:
+    _, lo, hi, paso = RANGOS[eje.partition(".")[0]]
+    actual = _actual(eje, thr)
+    defecto = (max(lo, round(actual * 0.7 / paso) * paso), min(hi, round(actual * 1.3 / paso) * paso))
+    desde, hasta = st.slider(f"Rango – {_nombre(eje)}", lo, hi, defecto, paso, key=f"{clave}_{eje}")
+    return np.linspace(desde, hasta, puntos)
+
+# =========================
+# UI
+# =========================
+st.title("🧬 SARKOB – Sensibilidad de los puntos de corte")
+st.caption("Prevalencia de cada diagnóstico en la cohorte al variar uno o dos umbrales, "
+           "y concordancia con un perfil de referencia.")
+
+perfiles = _perfiles(DIR_PERFILES)
+with st.sidebar:
+    origen = st.radio("Cohorte", ["Fichero", "Registro de visitas"])
+    archivo = st.file_uploader("Fichero CSV/Parquet", type=["csv", "parquet"]) if origen == "Fichero" else None
+    base = st.selectbox("Perfil base", list(perfiles), help="Umbrales que no se barren.")
+    referencia = st.selectbox("Perfil de referencia", list(perfiles), help="Diagnóstico con el que se compara.")
+
+if origen == "Fichero":
+    if archivo is None:
+        st.info("Sube un fichero con los campos del formulario (una fila por paciente).")
+        st.stop()
+    clave_origen = f"fichero:{archivo.file_id}"
+else:
+    with Almacen(RUTA_DB) as db:
+        ultima = db.con.execute("SELECT max(id) FROM visitas").fetchone()[0]
+    if ultima is None:
+        st.info(f"El registro {RUTA_DB} no tiene visitas.")
+        st.stop()
+    clave_origen = f"registro:{RUTA_DB}:{ultima}"
+
+df, descartadas = _cohorte(clave_origen, archivo)
+s = _sensibilidad(clave_origen, base, referencia, df, perfiles)
+st.write(f"**{s.n:,}** pacientes" + (f" ({descartadas:,} filas no válidas descartadas)" if descartadas else ""))
+
+c1, c2, c3 = st.columns(3)
+with c1:
+    eje = st.selectbox("Umbral", EJES, index=EJES.index("chair5_slow_s"), format_func=_nombre)
+with c2:
+    eje2 = st.selectbox("Segundo umbral (opcional)", [None] + [e for e in EJES if e != eje],
+                        format_func=lambda e: "—" if e is None else _nombre(e))
+with c3:
+    puntos = st.slider("Puntos por umbral", 10, 200, 200 if eje2 is None else 60)
+
+thr = perfiles[base]
+valores = _rejilla(eje, thr, "r1", puntos)
+valores2 = _rejilla(eje2, thr, "r2", puntos) if eje2 else None
+b = s.barrer(eje, valores, eje2, valores2)
+
+if eje2 is None:
+    prev = pd.DataFrame(b.prevalencia.T * 100, columns=list(DIAGNOSTICOS), index=pd.Index(b.valores[0], name=_nombre(eje)))
+    st.subheader("Prevalencia (%)")
+    st.line_chart(prev)
+    st.subheader("Concordancia con la referencia (%)")
+    st.line_chart(pd.Series(b.concordancia * 100, index=prev.index, name="concordancia"))
+    i = st.select_slider("Punto de corte", options=range(len(b.valores[0])),
+                         value=int(np.argmin(np.abs(b.valores[0] - _actual(eje, thr)))),
+                         format_func=lambda k: f"{b.valores[0][k]:.2f}")
+    idx = (i,)
+else:
+    dx = st.radio("Diagnóstico", DIAGNOSTICOS, index=2, horizontal=True)
+    larga = b.a_dataframe()
+    # los nombres de eje llevan "." (campo anidado para Vega-Lite)
+    larga = larga[larga["diagnostico"] == dx].rename(columns={eje: "x", eje2: "y"})
+    larga = larga.assign(prevalencia=larga["prevalencia"] * 100)
+    st.subheader(f"Prevalencia de {dx} (%)")
+    st.altair_chart(alt.Chart(larga).mark_rect().encode(
+        x=alt.X("x:O", title=_nombre(eje), axis=alt.Axis(format=".2f", labelOverlap=True)),
+        y=alt.Y("y:O", title=_nombre(eje2), sort="descending", axis=alt.Axis(format=".2f", labelOverlap=True)),
+        color=alt.Color("prevalencia:Q", title="%"),
+        tooltip=[alt.Tooltip("x:Q", title=_nombre(eje), format=".2f"), alt.Tooltip("y:Q", title=_nombre(eje2), format=".2f"),
+                 alt.Tooltip("prevalencia:Q", format=".1f"), "pacientes:Q"],
+    ), use_container_width=True)
+    k1, k2 = st.columns(2)
+    with k1:
+        i = st.select_slider(_nombre(eje), options=range(len(b.valores[0])), format_func=lambda k: f"{b.valores[0][k]:.2f}")
+    with k2:
+        j = st.select_slider(_nombre(eje2), options=range(len(b.valores[1])), format_func=lambda k: f"{b.valores[1][k]:.2f}")
+    idx = (i, j)
+
+st.subheader("Confusión frente a la referencia")
+st.caption(f"Filas: {referencia}; columnas: {base} con " +
+           ", ".join(f"{_nombre(e)} = {g[k]:.2f}" for e, g, k in zip(b.ejes, b.valores, idx)))
+st.table(b.matriz(*idx))
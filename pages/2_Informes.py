@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+from datetime import date
+
+import streamlit as st
+
+from sarkob import cargar_perfiles
+from sarkob.almacen import Almacen
+from sarkob.cohorte import ETIQUETAS
+from sarkob.exportacion import MIME, escribir_informes, informes_almacen, informes_df
+from sarkob.lotes import leer_cohorte
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_DB = os.environ.get("SARKOB_DB", "sarkob.db")
+DIR_PERFILES = os.environ.get("SARKOB_PERFILES", os.path.join(RAIZ, "perfiles"))
+FORMATOS = {"ZIP (un .txt por paciente)": "zip", "CSV": "csv", "Markdown": "md"}
+# Los ficheros generados se guardan en un directorio propio y se borran al
+# cambiar la selección, al regenerar o, si la sesión se abandona, pasado
+# RETENCION segundos (se purga en cada ejecución de la página)
+DIR_INFORMES = os.path.join(tempfile.gettempdir(), "sarkob_informes")
+RETENCION = int(os.environ.get("SARKOB_INFORMES_RETENCION", 3600))
+
+st.set_page_config(page_title="SARKOB – Informes en lote", page_icon="🧬", layout="wide")
+
+@st.cache_resource
+def _perfiles(directorio):
+    return cargar_perfiles(directorio)
+
+@st.cache_resource(max_entries=2, show_spinner="Leyendo la cohorte…")
+def _cohorte(origen: str, _fuente):
+    return leer_cohorte(_fuente, _fuente.name)
+
+def _purgar(retencion: int = RETENCION):
+    limite = time.time() - retencion
+    with os.scandir(DIR_INFORMES) as it:
+        for e in it:
+            try:
+                if e.is_file() and e.stat().st_mtime < limite:
+                    os.remove(e.path)
+            except FileNotFoundError:  # borrado a la vez por otra sesión
+                pass
+
+def _borrar_anterior():
+    # el fichero generado anterior deja de servir al cambiar algo
+    anterior = st.session_state.pop("sarkob_informes", None)
+    if anterior and os.path.exists(anterior["ruta"]):
+        os.remove(anterior["ruta"])
+
+# =========================
+# UI
+# =========================
+st.title("🧬 SARKOB – Informes en lote")
+st.caption("Genera el informe de texto de cada paciente de una cohorte y descárgalos juntos. "
+           "Se escriben por bloques en un fichero temporal, sin tener la cohorte entera en memoria.")
+
+os.makedirs(DIR_INFORMES, exist_ok=True)
+_purgar()
+perfiles = _perfiles(DIR_PERFILES)
+with st.sidebar:
+    origen = st.radio("Cohorte", ["Fichero", "Registro de visitas"])
+    formato = FORMATOS[st.radio("Formato", list(FORMATOS))]
+
+filtros = {}
+if origen == "Fichero":
+    archivo = st.file_uploader("Fichero CSV/Parquet", type=["csv", "parquet"])
+    if archivo is None:
+        st.info("Sube un fichero con los campos del formulario (una fila por paciente).")
+        st.stop()
+    thr = perfiles[st.selectbox("Perfil de umbrales", list(perfiles))]
+    df, descartadas = _cohorte(f"fichero:{archivo.file_id}", archivo)
+    total = len(df)
+    st.write(f"**{total:,}** pacientes" + (f" ({descartadas:,} filas no válidas descartadas)" if descartadas else ""))
+    clave = ("fichero", archivo.file_id, thr.nombre, thr.version, formato)
+else:
+    st.caption("Las visitas del registro ya están evaluadas: cada informe usa el perfil con que se guardó.")
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        desde = st.date_input("Desde", date.today())
+    with c2:
+        hasta = st.date_input("Hasta", date.today())
+    with c3:
+        dx = st.multiselect("Diagnóstico", ETIQUETAS["diagnostico"])
+    filtros = {"desde": desde, "hasta": hasta}
+    if dx:
+        filtros["diagnostico"] = dx
+    with Almacen(RUTA_DB) as db:
+        total = db.contar(**filtros)
+    st.write(f"**{total:,}** visitas en {RUTA_DB}")
+    clave = ("registro", RUTA_DB, str(desde), str(hasta), tuple(dx), formato)
+
+if st.session_state.get("sarkob_informes", {}).get("clave") != clave:
+    _borrar_anterior()
+
+if st.button("Generar informes", type="primary", disabled=not total):
+    _borrar_anterior()
+    barra = st.progress(0.0, text="Generando informes…")
+    avance = lambda n: barra.progress(min(n / total, 1.0), text=f"{n:,} / {total:,} informes")
+    t0 = time.perf_counter()
+    with tempfile.NamedTemporaryFile(suffix=f".{formato}", dir=DIR_INFORMES, delete=False) as f:
+        if origen == "Fichero":
+            n = escribir_informes(f, informes_df(df, thr), formato, avance)
+        else:
+            with Almacen(RUTA_DB) as db:
+                n = escribir_informes(f, informes_almacen(db, **filtros), formato, avance)
+    barra.empty()
+    st.session_state["sarkob_informes"] = {"clave": clave, "ruta": f.name, "n": n, "segundos": time.perf_counter() - t0}
+
+hecho = st.session_state.get("sarkob_informes")
+if hecho and not os.path.exists(hecho["ruta"]):
+    st.session_state.pop("sarkob_informes")
+    st.info(f"Los informes generados se borran pasados {RETENCION // 60} min; vuelve a generarlos.")
+elif hecho:
+    st.success(f"{hecho['n']:,} informes en {hecho['segundos']:.1f} s "
+               f"({os.path.getsize(hecho['ruta']) / 1e6:.1f} MB)")
+    # download_button necesita el contenido completo (bytes o fichero), no un generador
+    with open(hecho["ruta"], "rb") as f:
+        st.download_button("Descargar", f, file_name=f"informes_sarkob.{formato}", mime=MIME[formato])
+    st.caption(f"El fichero se conserva {RETENCION // 60} min en el servidor.")
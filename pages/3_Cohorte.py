@@ -0,0 +1,116 @@
+import hashlib
+import os
+import time
+
+import altair as alt
+import streamlit as st
+
+from sarkob import ENTRADAS, cargar_perfiles, metricas
+from sarkob.almacen import Almacen
+from sarkob.cubo import DIMENSIONES, MEDIDAS, construir_cubo
+from sarkob.lotes import leer_cohorte
+from sarkob.perfiles import clave
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUTA_DB = os.environ.get("SARKOB_DB", "sarkob.db")
+DIR_PERFILES = os.environ.get("SARKOB_PERFILES", os.path.join(RAIZ, "perfiles"))
+NOMBRES = {"sexo": "Sexo", "banda_edad": "Banda de edad", "clase_imc": "Clase de IMC", "diagnostico": "Diagnóstico"}
+SEXO = {"female": "Mujeres", "male": "Hombres"}
+
+st.set_page_config(page_title="SARKOB – Cohorte", page_icon="🧬", layout="wide")
+
+# =========================
+# Datos: el cubo se calcula una vez por cohorte y perfil
+# =========================
+@st.cache_resource
+def _perfiles(directorio):
+    return cargar_perfiles(directorio)
+
+@st.cache_resource(max_entries=4)
+def _huella_fichero(file_id: str, _archivo) -> str:
+    return "fichero:" + hashlib.sha256(_archivo.getvalue()).hexdigest()
+
+@st.cache_data(max_entries=8, show_spinner="Agregando la cohorte…")
+def _cubo(huella: str, perfil: str, _fuente, _thr):
+    # sólo se lee la cohorte si no hay cubo para esta huella y perfil
+    if huella.startswith("registro:"):
+        with Almacen(RUTA_DB) as db:
+            df, descartadas = db.consultar_df(list(ENTRADAS)), 0
+    else:
+        df, descartadas = leer_cohorte(_fuente, _fuente.name)
+    return construir_cubo(df, _thr), descartadas
+
+def _etiqueta(dim: str, v: str) -> str:
+    return SEXO.get(v, v) if dim == "sexo" else v
+
+# =========================
+# UI
+# =========================
+st.title("🧬 SARKOB – Cohorte")
+st.caption("Prevalencia de cada diagnóstico y distribución de las medidas por sexo, banda de edad y clase de IMC.")
+
+perfiles = _perfiles(DIR_PERFILES)
+with st.sidebar:
+    origen = st.radio("Cohorte", ["Fichero", "Registro de visitas"])
+    archivo = st.file_uploader("Fichero CSV/Parquet", type=["csv", "parquet"]) if origen == "Fichero" else None
+    perfil = st.selectbox("Perfil de umbrales", list(perfiles))
+    st.subheader("Filtros")
+    filtros = {d: st.multiselect(NOMBRES[d], cats, format_func=lambda v, d=d: _etiqueta(d, v), key=f"f_{d}")
+               for d, cats in DIMENSIONES.items()}
+
+if origen == "Fichero":
+    if archivo is None:
+        st.info("Sube un fichero con los campos del formulario (una fila por paciente).")
+        st.stop()
+    huella = _huella_fichero(archivo.file_id, archivo)
+else:
+    with Almacen(RUTA_DB) as db:
+        ultima = db.con.execute("SELECT max(id) FROM visitas").fetchone()[0]
+    if ultima is None:
+        st.info(f"El registro {RUTA_DB} no tiene visitas.")
+        st.stop()
+    huella = f"registro:{RUTA_DB}:{ultima}"
+
+thr = perfiles[perfil]
+cubo, descartadas = _cubo(huella, clave(thr), archivo, thr)
+
+por = st.selectbox("Desglosar por", [None, "sexo", "banda_edad", "clase_imc"],
+                   format_func=lambda d: "—" if d is None else NOMBRES[d], key="por")
+medida = st.selectbox("Medida", list(MEDIDAS), format_func=lambda m: MEDIDAS[m][0], key="medida")
+t0 = time.perf_counter()
+with metricas.etapa("cubo"):
+    total = cubo.prevalencia(**filtros)
+    prev = cubo.prevalencia(por, **filtros)
+    dist = cubo.distribucion(medida, por, **filtros)
+    resumen = cubo.resumen(medida, por, **filtros)
+consulta_ms = (time.perf_counter() - t0) * 1e3
+if por:
+    prev.index = [_etiqueta(por, v) for v in prev.index]
+    dist.columns = resumen.index = [_etiqueta(por, v) for v in dist.columns]
+
+n = int(total["pacientes"].sum(axis=1).iloc[0])
+st.write(f"**{n:,}** de {cubo.total:,} pacientes (perfil {cubo.perfil})" +
+         (f"; {descartadas:,} filas no válidas descartadas" if descartadas else ""))
+
+st.subheader("Prevalencia")
+cols = st.columns(len(DIMENSIONES["diagnostico"]))
+for c, dx in zip(cols, DIMENSIONES["diagnostico"]):
+    c.metric(dx, f"{total['%'][dx].iloc[0]:.1f} %", f"{int(total['pacientes'][dx].iloc[0]):,} pacientes", delta_color="off")
+if filtros["diagnostico"]:
+    st.caption("El filtro de diagnóstico no se aplica a la prevalencia.")
+if por:
+    larga = prev["%"].rename_axis("grupo").reset_index().melt("grupo", var_name="diagnostico", value_name="porcentaje")
+    st.altair_chart(alt.Chart(larga).mark_bar().encode(
+        x=alt.X("porcentaje:Q", title="%", stack="normalize", axis=alt.Axis(format="%")),
+        y=alt.Y("grupo:N", title=NOMBRES[por], sort=list(prev.index)),
+        color=alt.Color("diagnostico:N", title="Diagnóstico", sort=list(DIMENSIONES["diagnostico"])),
+        tooltip=["grupo:N", "diagnostico:N", alt.Tooltip("porcentaje:Q", format=".1f")],
+    ), use_container_width=True)
+    st.dataframe(prev.round(1), use_container_width=True)
+
+st.subheader(MEDIDAS[medida][0])
+st.caption("% de los pacientes con la medida informada de cada grupo, por intervalo; "
+           "medianas y cuartiles interpolados en esos intervalos.")
+st.line_chart(dist)
+st.dataframe(resumen.round(2), use_container_width=True)
+st.caption(f"Consulta sobre el cubo: {consulta_ms:.1f} ms")
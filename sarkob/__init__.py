@@ -0,0 +1,39 @@
+"""Núcleo clínico SARKOB, independiente de la interfaz Streamlit.
+
+Importar el paquete sólo carga las reglas en Python puro (sin Streamlit,
+pandas ni NumPy). Las APIs por lotes se cargan bajo demanda al primer acceso,
+p. ej. `sarkob.evaluar_cohorte`, que es cuando se importan pandas y NumPy.
+"""
+from .reglas import (
+    Thr, T, norm_sex, handgrip_percentile, gait_speed_4m, label_strength,
+    calf_cutoff_adjusted, smm_weight_pct_label, sarcf_score,
+)
+from .percentiles import INDICE, IndicePercentiles, handgrip_percentile_array
+from . import metricas
+from .perfiles import UMBRALES, perfil, cargar_perfil, cargar_perfiles, guardar_perfil
+from .evaluacion import ENTRADAS, evaluar
+from .informe import COLUMNAS, filas_tabla, construir_informe
+
+# nombre → submódulo que lo define (carga perezosa)
+_PEREZOSOS = {
+    "evaluar_cohorte": "cohorte", "evaluar_arrays": "cohorte", "ETIQUETAS": "cohorte",
+    "rescorar_cohorte": "cohorte",
+    "evaluar_paralelo": "paralelo", "EvaluadorParalelo": "paralelo",
+    "procesar": "lotes", "validar": "lotes", "leer_cohorte": "lotes",
+    "Sensibilidad": "sensibilidad", "barrer": "sensibilidad",
+    "Almacen": "almacen",
+    "escribir_informes": "exportacion", "informes_df": "exportacion",
+    "Cubo": "cubo", "construir_cubo": "cubo",
+}
+
+def __getattr__(name):
+    mod = _PEREZOSOS.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{mod}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_PEREZOSOS))
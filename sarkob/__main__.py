@@ -0,0 +1,59 @@
+"""Entrada de línea de comandos: `python -m sarkob entrada.csv salida.parquet`."""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from . import metricas
+from .reglas import T
+from .perfiles import cargar_perfil
+from .lotes import CHUNKSIZE, procesar
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m sarkob",
+                                 description="Evaluación SARKOB en lote (CSV/Parquet, por bloques).")
+    ap.add_argument("entrada", help="fichero .csv o .parquet con los campos del formulario")
+    ap.add_argument("salida", help="fichero .csv o .parquet de resultados")
+    ap.add_argument("--errores", help="CSV de filas no válidas (por defecto <salida>.errores.csv)")
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE, help=f"filas por bloque (por defecto {CHUNKSIZE})")
+    ap.add_argument("--procesos", type=int, default=1, help="procesos en paralelo (0 = todos los núcleos)")
+    ap.add_argument("--db", help="registro SQLite donde guardar también las visitas evaluadas")
+    ap.add_argument("--fecha", help="fecha de las visitas (AAAA-MM-DD) si la entrada no trae columna 'fecha'")
+    ap.add_argument("--perfil", help="fichero JSON de perfil de umbrales (por defecto, el base)")
+    ap.add_argument("--metricas", metavar="RUTA", help="activa las métricas y las escribe en RUTA (formato Prometheus)")
+    ap.add_argument("--cprofile", metavar="RUTA", help="perfila la ejecución con cProfile y guarda las estadísticas "
+                                                       "en RUTA (con --procesos > 1 sólo el proceso principal)")
+    args = ap.parse_args(argv)
+    if args.fecha:
+        try:
+            date.fromisoformat(args.fecha)
+        except ValueError:
+            ap.error(f"--fecha no válida: {args.fecha!r} (usa AAAA-MM-DD)")
+    if args.metricas:
+        metricas.activar()
+
+    thr = T
+    if args.perfil:
+        thr = cargar_perfil(args.perfil)
+
+    almacen = None
+    if args.db:
+        from .almacen import Almacen
+        almacen = Almacen(args.db)
+    t0 = time.perf_counter()
+    ejecutar = lambda: procesar(args.entrada, args.salida, errores=args.errores, chunksize=args.chunksize, thr=thr,
+                                procesos=args.procesos or (os.cpu_count() or 1), almacen=almacen, fecha=args.fecha)
+    try:
+        r = metricas.perfilar(ejecutar, args.cprofile) if args.cprofile else ejecutar()
+    finally:
+        if almacen is not None: almacen.cerrar()
+    dt = time.perf_counter() - t0
+    print(f"{r['filas']} filas, {r['evaluadas']} evaluadas, {r['errores']} con error "
+          f"en {dt:.1f} s ({r['filas']/dt if dt else 0:.0f} filas/s)", file=sys.stderr)
+    if args.metricas:
+        metricas.escribir(args.metricas)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,443 @@
+"""Registro persistente de visitas (SQLite en modo WAL).
+
+Cada visita guarda las entradas del formulario, todas las salidas de
+`evaluar`, el perfil de umbrales con que se evaluó (`perfil`, "nombre@version")
+y tres columnas de agrupación indexadas: `banda_edad` (límite inferior de la
+banda de `_PERC_TABLE`), `clase_imc` (OMS) y `fecha` (ISO). La app guarda
+visitas sueltas (`guardar`) y el modo lote bloques enteros (`guardar_df`),
+siempre en una transacción por llamada. En modo WAL varios procesos pueden
+leer mientras uno escribe.
+
+Los umbrales de cada perfil usado quedan en la tabla `perfiles`, así que
+`rescorar` puede pasar visitas a otro perfil recalculando sólo las salidas que
+dependen de umbrales distintos y reescribiendo sólo las filas que cambian. El
+perfil no se guarda en cada fila: cada visita apunta a un grupo (tabla
+`grupos`, id → perfil) y la columna `perfil` de `consultar` y sus filtros se
+resuelven a través de él; al rescorar sin filtros se cambia el perfil de los
+grupos enteros en vez de el de cada fila.
+
+    with Almacen("sarkob.db") as db:
+        db.contar(sexo="male", edad_min=65, diagnostico="sarcopenia", vat_label="elevada", anio=2025)
+
+Sólo usa la biblioteca estándar; pandas/NumPy se importan en `guardar_df` y
+`consultar_df`.
+"""
+import json
+import sqlite3
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .reglas import CLASES_IMC, Thr, T, norm_sex, clase_imc
+from .percentiles import BANDAS_EDAD, banda_edad
+from .perfiles import a_dict, clave, desde_dict, umbrales
+from .evaluacion import ENTRADAS, EJEMPLO_SALIDAS, evaluar
+
+ESQUEMA = 3   # PRAGMA user_version (1: sin perfiles; 2: perfil en cada fila)
+
+def _tipo(v: Any) -> str:
+    if isinstance(v, str): return "TEXT"
+    if isinstance(v, (bool, int)): return "INTEGER"
+    return "REAL"
+
+def _columnas() -> Dict[str, str]:
+    cols = {"paciente": "TEXT", "fecha": "TEXT NOT NULL", "perfil": "TEXT NOT NULL",
+            "banda_edad": "INTEGER", "clase_imc": "TEXT NOT NULL"}
+    cols.update((k, _tipo(v)) for k, v in ENTRADAS.items())
+    # tipos de las salidas a partir de un paciente con todas las medidas informadas
+    cols.update((k, _tipo(v)) for k, v in EJEMPLO_SALIDAS.items())
+    return cols
+
+COLUMNAS_DB: Dict[str, str] = _columnas()
+_NOMBRES: Tuple[str, ...] = tuple(COLUMNAS_DB)
+# en la tabla, `perfil` es el grupo de visitas (ver `_grupo`)
+_TABLA: Dict[str, str] = {("grupo" if k == "perfil" else k): ("INTEGER NOT NULL" if k == "perfil" else t)
+                          for k, t in COLUMNAS_DB.items()}
+_PERFIL = "(SELECT perfil FROM grupos WHERE grupos.id = visitas.grupo)"
+_INSERT = (f"INSERT INTO visitas ({', '.join(_TABLA)}) VALUES "
+           f"({', '.join('(SELECT MIN(id) FROM grupos WHERE perfil = ?)' if k == 'perfil' else '?' for k in _NOMBRES)})")
+
+# El índice de cohorte cubre los recuentos por diagnóstico, sexo, banda de edad,
+# clase de IMC, fecha y etiquetas de grasa/VAT sin leer la tabla (el sexo solo,
+# ~50 %, se resuelve con skip-scan sobre él); el resto de etiquetas se
+# comprueba en las filas candidatas.
+_INDICES = {
+    "ix_visitas_cohorte": "diagnostico, sex_in, banda_edad, clase_imc, fecha, fat_label, vat_label",
+    "ix_visitas_banda": "banda_edad",
+    "ix_visitas_imc": "clase_imc",
+    "ix_visitas_fecha": "fecha",
+    "ix_visitas_paciente": "paciente, fecha",
+    "ix_visitas_grupo": "grupo",
+}
+
+RESCORAR_BLOQUE = 100_000   # filas leídas y reescritas por bloque en `rescorar`
+
+def _fecha(f) -> str:
+    # fecha suelta (argumento o filtro): date, texto ISO AAAA-MM-DD o None = hoy
+    if isinstance(f, str):
+        try:
+            return date.fromisoformat(f.strip()).isoformat()
+        except ValueError:
+            raise ValueError(f"fecha no válida: {f!r} (usa AAAA-MM-DD)") from None
+    return (f or date.today()).isoformat()
+
+def fechas_iso(col):
+    """Columna de fechas → (texto AAAA-MM-DD o None si está vacía, máscara de
+    las que no son una fecha ISO válida, p. ej. "2025-13-45" o "01/02/2025").
+
+    El formato es estricto: no se adivinan órdenes día/mes ni se corrigen
+    fechas imposibles.
+    """
+    import numpy as np
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.dt.strftime("%Y-%m-%d").astype(object).where(col.notna(), None), np.zeros(len(col), dtype=bool)
+    texto = col.astype("string").str.strip()     # date → "AAAA-MM-DD"
+    vacia = (texto.isna() | (texto == "")).to_numpy(dtype=bool)
+    iso = texto.str.fullmatch(r"\d{4}-\d{2}-\d{2}").fillna(False).to_numpy(dtype=bool)
+    f = pd.to_datetime(texto.where(iso), format="%Y-%m-%d", errors="coerce")
+    return f.dt.strftime("%Y-%m-%d").astype(object).where(f.notna(), None), (f.isna().to_numpy() & ~vacia)
+
+class Almacen:
+    """Conexión al registro; crea el esquema si hace falta."""
+
+    def __init__(self, ruta: str = "sarkob.db", timeout: float = 30.0):
+        self.ruta = ruta
+        self.con = sqlite3.connect(ruta, timeout=timeout)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.execute("PRAGMA cache_size=-65536")      # 64 MB
+        self.con.execute("PRAGMA mmap_size=268435456")    # 256 MB
+        self._perfiles: Dict[str, Thr] = {}
+        version = self.con.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, 1, 2, ESQUEMA):
+            raise ValueError(f"{ruta}: versión de esquema {version} no soportada (esperada {ESQUEMA})")
+        with self.con:
+            self.con.execute("CREATE TABLE IF NOT EXISTS grupos (\n  id INTEGER PRIMARY KEY,\n  perfil TEXT NOT NULL\n)")
+            self.con.execute("CREATE INDEX IF NOT EXISTS ix_grupos_perfil ON grupos (perfil)")
+            if version in (1, 2):
+                if version == 1:
+                    # las visitas anteriores se evaluaron con el perfil base
+                    self.con.execute("INSERT INTO grupos (perfil) VALUES (?)", (clave(T),))
+                else:
+                    self.con.execute("INSERT INTO grupos (perfil) SELECT DISTINCT perfil FROM visitas")
+                self.con.execute("ALTER TABLE visitas ADD COLUMN grupo INTEGER NOT NULL DEFAULT 1")
+                if version == 2:
+                    self.con.execute("UPDATE visitas SET grupo = (SELECT id FROM grupos WHERE grupos.perfil = visitas.perfil)")
+                    self.con.execute("DROP INDEX IF EXISTS ix_visitas_perfil")
+                    try:
+                        self.con.execute("ALTER TABLE visitas DROP COLUMN perfil")
+                    except sqlite3.OperationalError:
+                        pass    # SQLite < 3.35: la columna se queda, sin usar (tiene valor por defecto)
+            cols = ",\n  ".join(f"{k} {t}" for k, t in _TABLA.items())
+            self.con.execute(f"CREATE TABLE IF NOT EXISTS visitas (\n  id INTEGER PRIMARY KEY,\n  {cols}\n)")
+            for nombre, cols in _INDICES.items():
+                self.con.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON visitas ({cols})")
+            self.con.execute("CREATE TABLE IF NOT EXISTS perfiles (\n  clave TEXT PRIMARY KEY,\n"
+                             "  nombre TEXT NOT NULL,\n  version TEXT NOT NULL,\n  umbrales TEXT NOT NULL\n)")
+            self.con.execute(f"PRAGMA user_version={ESQUEMA}")
+        self.registrar_perfil(T)
+
+    # =========================
+    # Perfiles
+    # =========================
+    def registrar_perfil(self, thr: Thr) -> str:
+        """Guarda los umbrales de `thr` (si no estaban) y devuelve su clave.
+
+        Una clave ya registrada con otros umbrales es un error: los cambios de
+        umbrales necesitan una versión nueva.
+        """
+        k = clave(thr)
+        if k in self._perfiles:
+            if umbrales(self._perfiles[k]) != umbrales(thr):
+                raise ValueError(f"el perfil {k} ya está registrado con otros umbrales; usa otra versión")
+            return k
+        d = a_dict(thr)
+        fila = self.con.execute("SELECT umbrales FROM perfiles WHERE clave = ?", (k,)).fetchone()
+        if fila is None:
+            with self.con:
+                self.con.execute("INSERT INTO perfiles VALUES (?, ?, ?, ?)",
+                                 (k, d["nombre"], d["version"], json.dumps(d["umbrales"], ensure_ascii=False)))
+        elif umbrales(desde_dict(dict(d, umbrales=json.loads(fila[0])))) != umbrales(thr):
+            raise ValueError(f"el perfil {k} ya está registrado con otros umbrales; usa otra versión")
+        self._perfiles[k] = thr
+        return k
+
+    def perfil(self, k: str) -> Thr:
+        """Perfil registrado con clave `k`."""
+        if k not in self._perfiles:
+            fila = self.con.execute("SELECT nombre, version, umbrales FROM perfiles WHERE clave = ?", (k,)).fetchone()
+            if fila is None:
+                raise KeyError(f"perfil no registrado: {k}")
+            self._perfiles[k] = desde_dict({"nombre": fila[0], "version": fila[1], "umbrales": json.loads(fila[2])})
+        return self._perfiles[k]
+
+    def perfiles(self) -> List[str]:
+        return [r[0] for r in self.con.execute("SELECT clave FROM perfiles ORDER BY clave")]
+
+    def _grupo(self, perfil: str) -> int:
+        # grupo al que se añaden las visitas evaluadas con `perfil`; la primera
+        # sentencia es una escritura, así que abre la transacción y nadie puede
+        # cambiar el perfil del grupo antes de que se confirmen las inserciones
+        self.con.execute("INSERT INTO grupos (perfil) SELECT ? WHERE NOT EXISTS "
+                         "(SELECT 1 FROM grupos WHERE perfil = ?)", (perfil, perfil))
+        return self.con.execute("SELECT MIN(id) FROM grupos WHERE perfil = ?", (perfil,)).fetchone()[0]
+
+    # =========================
+    # Escritura
+    # =========================
+    def guardar(self, entradas: Dict[str, Any], resultado: Optional[Dict[str, Any]] = None,
+                paciente: Optional[str] = None, fecha=None, thr: Thr = T) -> int:
+        """Guarda una visita (entradas + salidas de `evaluar` con el perfil `thr`)
+        y devuelve su id. Las entradas que falten toman el valor por defecto del
+        formulario.
+        """
+        e = dict(ENTRADAS, **entradas)
+        e["sex_in"] = norm_sex(e["sex_in"])
+        if resultado is None:
+            resultado = evaluar(**e, thr=thr)
+        v = dict(e, **resultado)
+        v.update(paciente=paciente, fecha=_fecha(fecha), perfil=self.registrar_perfil(thr),
+                 banda_edad=banda_edad(v["age_in"]), clase_imc=clase_imc(v["bmi"]))
+        with self.con:
+            self._grupo(v["perfil"])
+            return self.con.execute(_INSERT, [v.get(k) for k in _NOMBRES]).lastrowid
+
+    def guardar_filas(self, filas: Iterable[Sequence[Any]], perfil: str) -> int:
+        """Inserta en una sola transacción filas ya ordenadas como `COLUMNAS_DB`,
+        todas evaluadas con el perfil (registrado) `perfil`."""
+        with self.con:
+            self._grupo(perfil)
+            cur = self.con.executemany(_INSERT, filas)
+        return cur.rowcount
+
+    def guardar_df(self, df, resultado=None, fecha=None, thr: Thr = T) -> int:
+        """Guarda un bloque de visitas: `df` con las entradas (y opcionalmente
+        columnas `paciente`/`fecha`, esta en ISO AAAA-MM-DD; vacía = `fecha`),
+        `resultado` como el de `evaluar_cohorte` con el perfil `thr`.
+        """
+        import numpy as np
+        import pandas as pd
+        from .cohorte import codificar_sexo, evaluar_cohorte
+        perfil = self.registrar_perfil(thr)
+        if resultado is None:
+            resultado = evaluar_cohorte(df, thr)
+        n = len(df)
+        edad = pd.to_numeric(df["age_in"], errors="coerce").to_numpy(dtype=float)
+        i = np.searchsorted(np.array(BANDAS_EDAD, dtype=float), edad, side="right") - 1
+        banda = pd.array(np.array(BANDAS_EDAD)[np.maximum(i, 0)], dtype="Int64")
+        banda[(i < 0) | np.isnan(edad)] = pd.NA
+        bmi = resultado["bmi"].to_numpy(dtype=float)
+        j = np.searchsorted(np.array([lo for lo, _ in CLASES_IMC]), bmi, side="right") - 1
+        clase = np.where(np.isnan(bmi) | (j < 0), "", np.array([c for _, c in CLASES_IMC], dtype=object)[np.maximum(j, 0)])
+        fechas = pd.Series([_fecha(fecha)] * n, dtype=object)
+        if "fecha" in df:
+            # sin fecha en la fila, la de `fecha`; una fecha no válida es un error
+            # (el modo lote las descarta antes, ver `lotes.validar`)
+            propias, invalidas = fechas_iso(df["fecha"])
+            if invalidas.any():
+                malas = df["fecha"][invalidas]
+                raise ValueError(f"{len(malas)} fechas no válidas (usa AAAA-MM-DD), p. ej. {malas.iloc[0]!r}")
+            fechas = propias.where(propias.notna(), fechas[0] if n else None).reset_index(drop=True)
+        extra = {
+            "paciente": df["paciente"].astype(object) if "paciente" in df else pd.Series([None] * n, dtype=object),
+            "fecha": fechas, "perfil": pd.Series([perfil] * n, dtype=object),
+            "banda_edad": banda, "clase_imc": clase,
+            "sex_in": np.array(("female", "male"), dtype=object)[codificar_sexo(df["sex_in"])],
+        }
+        cols = []
+        for k in _NOMBRES:
+            if k in extra: s = pd.Series(extra[k])
+            elif k in resultado: s = resultado[k]
+            elif k in df: s = pd.to_numeric(df[k], errors="coerce")
+            else: s = pd.Series(np.zeros(n))
+            s = s.astype(object)
+            cols.append(s.where(s.notna(), None).tolist())
+        return self.guardar_filas(zip(*cols), perfil)
+
+    def rescorar(self, thr: Thr, bloque: int = RESCORAR_BLOQUE, **filtros) -> Dict[str, int]:
+        """Pasa al perfil `thr` las visitas que cumplen `filtros` (ver `consultar`).
+
+        Por cada perfil de origen sólo se leen las filas que pueden cambiar (las
+        que tienen informada alguna medida de `medidas_candidatas`) y las
+        columnas que necesitan los nodos afectados por los umbrales distintos,
+        sólo se recalculan esas salidas y sólo se reescriben las filas en las
+        que alguna cambia. Sin más filtros que `perfil`, el resto de visitas
+        pasa al perfil nuevo cambiando el de sus grupos, sin tocarlas; con
+        filtros, se mueven una a una a un grupo del perfil nuevo. Todo en una
+        transacción. Devuelve cuántas visitas se han pasado al perfil nuevo y
+        cuántas han cambiado de resultado.
+        """
+        import numpy as np
+        import pandas as pd
+        from .cohorte import (ETIQUETAS, TIPOS_SALIDA, codificar_sexo, distintos, medidas_candidatas,
+                              plan_rescorado, rescorar_arrays)
+        nuevo = self.registrar_perfil(thr)
+        solo = filtros.pop("perfil", None)
+        if isinstance(solo, str): solo = [solo]
+        where, args = self._filtro(**filtros)
+        y = " AND " if where else " WHERE "
+
+        def a_array(k, vals):
+            if k == "sex_in": return codificar_sexo(vals)
+            if k in ETIQUETAS: return pd.Categorical(vals, categories=ETIQUETAS[k]).codes.astype(np.int8)
+            a = np.array(vals, dtype=float)    # None → NaN
+            if k in ENTRADAS: return a if k == "age_in" else np.nan_to_num(a, nan=0.0)
+            return a.astype(TIPOS_SALIDA[k]) if TIPOS_SALIDA[k].kind != "f" else a
+
+        def a_db(k, a):
+            if k in ETIQUETAS: return np.array(ETIQUETAS[k], dtype=object)[a].tolist()
+            if a.dtype.kind == "f": return [None if x != x else x for x in a.tolist()]
+            return a.astype(np.int64).tolist()
+
+        n = n_cambio = 0
+        with self.con:
+            self.con.execute("BEGIN IMMEDIATE")
+            origenes: Dict[str, List[int]] = {}
+            for g, p in self.con.execute("SELECT id, perfil FROM grupos WHERE perfil != ? ORDER BY id", (nuevo,)):
+                if solo is None or p in solo:
+                    origenes.setdefault(p, []).append(g)
+            destino = self._grupo(nuevo) if where and origenes else None
+            for origen, grupos in origenes.items():
+                antes = self.perfil(origen)
+                _, necesarias, salidas = plan_rescorado(antes, thr)
+                salidas = [k for k in _NOMBRES if k in salidas]
+                ids_grupos = ", ".join(map(str, grupos))
+                en = f"grupo IN ({ids_grupos})"
+                movidas = 0
+                if salidas:
+                    medidas = medidas_candidatas(antes, thr)
+                    # "+grupo": recorrer por id es más rápido que el índice de grupo más una ordenación
+                    en_cand = f"+{en}" if medidas is None else f"+{en} AND ({' OR '.join(f'{k} != 0' for k in medidas)})"
+                    cols = list(dict.fromkeys(["id", *necesarias, *salidas]))
+                    sql = f"SELECT {', '.join(cols)} FROM visitas{where}{y}{en_cand} AND id > ? ORDER BY id LIMIT ?"
+                    escritas = [*salidas, "grupo"] if destino else salidas
+                    upd = f"UPDATE visitas SET {', '.join(f'{k} = ?' for k in escritas)} WHERE id = ?"
+                    ultimo = 0
+                    while True:
+                        filas = self.con.execute(sql, [*args, ultimo, bloque]).fetchall()
+                        if not filas: break
+                        datos = dict(zip(cols, zip(*filas)))
+                        ultimo = datos["id"][-1]
+                        nuevas = rescorar_arrays({k: a_array(k, datos[k]) for k in necesarias}, antes, thr)
+                        cambio = np.zeros(len(filas), dtype=bool)
+                        for k in salidas:
+                            cambio |= distintos(a_array(k, datos[k]), nuevas[k])
+                        idx = np.flatnonzero(cambio)
+                        if len(idx):
+                            valores = [a_db(k, nuevas[k][idx]) for k in salidas]
+                            ids = np.asarray(datos["id"])[idx].tolist()
+                            if destino: valores.append([destino] * len(idx))
+                            self.con.executemany(upd, zip(*valores, ids))
+                            movidas += len(idx)
+                            n_cambio += len(idx)
+                if destino:
+                    # con filtros, el resto de visitas que los cumplen cambia de grupo
+                    movidas += self.con.execute(f"UPDATE visitas SET grupo = ?{where}{y}{en}", [destino, *args]).rowcount
+                    n += movidas
+                else:
+                    n += self.con.execute(f"SELECT COUNT(*) FROM visitas WHERE {en}").fetchone()[0]
+                    self.con.execute(f"UPDATE grupos SET perfil = ? WHERE id IN ({ids_grupos})", (nuevo,))
+        return {"visitas": n, "cambiadas": n_cambio}
+
+    def analizar(self) -> None:
+        """Actualiza las estadísticas del planificador (tras cargas grandes)."""
+        self.con.execute("ANALYZE")
+
+    # =========================
+    # Consulta
+    # =========================
+    def _filtro(self, sexo=None, edad_min=None, edad_max=None, anio=None, desde=None, hasta=None,
+                **iguales) -> Tuple[str, List[Any]]:
+        cond: List[str] = []
+        args: List[Any] = []
+
+        def igual(col, v):
+            if isinstance(v, (list, tuple, set, frozenset)):
+                v = list(v)
+                c = f"{col} IN ({', '.join('?' * len(v))})"
+                args.extend(v)
+            else:
+                c = f"{col} = ?"
+                args.append(v)
+            cond.append(f"grupo IN (SELECT id FROM grupos WHERE {c})" if col == "perfil" else c)
+
+        if sexo is not None:
+            igual("sex_in", norm_sex(sexo) if isinstance(sexo, str) else [norm_sex(s) for s in sexo])
+        if edad_min is not None:
+            b = banda_edad(edad_min)
+            if b is not None:
+                # permite usar los índices; si la edad es un límite de banda, basta con ella
+                cond.append("banda_edad >= ?"); args.append(b)
+            if b != edad_min:
+                cond.append("age_in >= ?"); args.append(edad_min)
+        if edad_max is not None:
+            cond.append("age_in <= ?"); args.append(edad_max)
+        # con otro filtro indexado, "+fecha" impide que el planificador elija el
+        # índice de fecha (poco selectivo); la fecha se comprueba en el de cohorte
+        fecha = "+fecha" if cond or set(iguales) & {"diagnostico", "banda_edad", "clase_imc", "paciente"} else "fecha"
+        if anio is not None:
+            cond.append(f"{fecha} >= ? AND {fecha} < ?"); args += [f"{int(anio):04d}-01-01", f"{int(anio) + 1:04d}-01-01"]
+        if desde is not None:
+            cond.append(f"{fecha} >= ?"); args.append(_fecha(desde))
+        if hasta is not None:
+            cond.append(f"{fecha} <= ?"); args.append(_fecha(hasta))
+        for k, v in iguales.items():
+            if k not in COLUMNAS_DB and k != "id":
+                raise ValueError(f"filtro desconocido: {k}")
+            igual(k, v)
+        return (" WHERE " + " AND ".join(cond)) if cond else "", args
+
+    def contar(self, **filtros) -> int:
+        """Nº de visitas que cumplen los filtros (ver `consultar`)."""
+        where, args = self._filtro(**filtros)
+        return self.con.execute(f"SELECT COUNT(*) FROM visitas{where}", args).fetchone()[0]
+
+    def consultar(self, columnas: Optional[Sequence[str]] = None, limite: Optional[int] = None,
+                  **filtros) -> List[Dict[str, Any]]:
+        """Visitas que cumplen todos los filtros, como lista de dicts.
+
+        Filtros: `sexo`, `edad_min`/`edad_max`, `anio`, `desde`/`hasta` (fechas)
+        y cualquier columna por igualdad, p. ej. `diagnostico="sarcopenia"`,
+        `clase_imc=("obesidad II", "obesidad III")`, `vat_label="elevada"`.
+        """
+        cur = self._cursor(columnas, limite, filtros)
+        nombres = [d[0] for d in cur.description]
+        return [dict(zip(nombres, fila)) for fila in cur]
+
+    def consultar_df(self, columnas: Optional[Sequence[str]] = None, limite: Optional[int] = None, **filtros):
+        """Como `consultar`, pero devuelve un DataFrame."""
+        import pandas as pd
+        cur = self._cursor(columnas, limite, filtros)
+        return pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+    def iterar(self, columnas: Optional[Sequence[str]] = None, bloque: int = RESCORAR_BLOQUE,
+               **filtros) -> Iterator[List[Tuple[Any, ...]]]:
+        """Como `consultar`, pero en listas de como mucho `bloque` tuplas (en el
+        orden de `columnas`), para recorrer cohortes grandes con memoria acotada."""
+        cur = self._cursor(columnas, None, filtros)
+        while True:
+            filas = cur.fetchmany(bloque)
+            if not filas:
+                return
+            yield filas
+
+    def _cursor(self, columnas, limite, filtros) -> sqlite3.Cursor:
+        cols = list(columnas) if columnas else ["id", *_NOMBRES]
+        desconocidas = [c for c in cols if c not in COLUMNAS_DB and c != "id"]
+        if desconocidas:
+            raise ValueError(f"columnas desconocidas: {', '.join(desconocidas)}")
+        where, args = self._filtro(**filtros)
+        sql = f"SELECT {', '.join(f'{_PERFIL} AS perfil' if c == 'perfil' else c for c in cols)} FROM visitas{where} ORDER BY id"
+        if limite is not None:
+            sql += " LIMIT ?"; args.append(int(limite))
+        return self.con.execute(sql, args)
+
+    def cerrar(self) -> None:
+        self.con.execute("PRAGMA optimize")
+        self.con.close()
+
+    def __enter__(self) -> "Almacen":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
@@ -0,0 +1,286 @@
+"""Evaluación SARKOB vectorizada (columna a columna) para cohortes completas.
+
+Produce exactamente las mismas métricas, etiquetas y `diagnostico` que
+`sarkob.evaluacion.evaluar`, pero sobre arrays NumPy. Como en el formulario,
+un valor 0 (o ausente/NaN) significa "no medido".
+"""
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .reglas import Thr, T
+from .percentiles import handgrip_percentile_array
+from .perfiles import UMBRALES, cambiados, umbrales
+from .evaluacion import ENTRADAS, Nodo, nodo, ejecutar, salidas_por_nodo, afectados
+
+_SEXOS = ("female", "male")
+_SEX_CODE = {"f": 0, "female": 0, "m": 1, "male": 1}
+
+# Categorías de cada etiqueta; el array de salida guarda el índice (int8)
+ETIQUETAS: Dict[str, Tuple[str, ...]] = {
+    "strength_label": ("", "baja", "normal"),
+    "perc_label":     ("", "muy bajo", "bajo", "normal"),
+    "smm_label":      ("", "muy baja masa muscular", "baja masa muscular", "normal"),
+    "dxa_label":      ("", "baja masa muscular (DXA)", "normal (DXA)"),
+    "waist_label":    ("", "elevada", "normal"),
+    "whr_label":      ("", "elevado", "normal"),
+    "whtr_label":     ("", "elevado", "normal"),
+    "neck_label":     ("", "obesidad", "sobrepeso", "normal"),
+    "calf_label":     ("", "baja", "normal"),
+    "fat_label":      ("", "obesidad grasa", "normal"),
+    "vat_label":      ("", "elevada", "normal"),
+    "vatsat_label":   ("", "exceso VAT", "normal"),
+    "diagnostico":    ("no sarcopenia", "dinapenia", "sarcopenia"),
+}
+
+# =========================
+# Motor vectorizado
+# =========================
+def _por_sexo(d: Dict[str, float], sex: np.ndarray) -> np.ndarray:
+    return np.array([d["female"], d["male"]], dtype=float)[sex]
+
+def _etiqueta(n: int, *casos) -> np.ndarray:
+    # casos = (máscara, código), el primero que se cumple gana; resto → 0 ("")
+    out = np.zeros(n, dtype=np.int8)
+    for mask, code in reversed(casos):
+        out[mask] = code
+    return out
+
+def codificar_sexo(values, invalido: str = "raise") -> np.ndarray:
+    """Códigos 0 (female) / 1 (male); con `invalido="coerce"` lo no reconocido es -1."""
+    # factorize: se normalizan sólo los valores distintos, no cada fila. Los
+    # vacíos (código -1, el último de la tabla) no son un sexo válido
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    lut = np.full(len(uniques) + 1, -1, dtype=np.int8)
+    for i, u in enumerate(uniques):
+        key = str(u).strip().lower()
+        if key not in _SEX_CODE and invalido == "raise":
+            raise KeyError(f"sexo no reconocido: {u!r}")
+        lut[i] = _SEX_CODE.get(key, -1)
+    if invalido == "raise" and len(uniques) < len(values) and (codes < 0).any():
+        raise KeyError(f"sexo no reconocido: {values.iloc[int(np.argmax(codes < 0))]!r}")
+    return lut[codes]
+
+# =========================
+# Nodos vectorizados (mismo grafo y nombres que `sarkob.evaluacion`)
+# =========================
+def _imc(weight_kg, height_cm):
+    has_bmi = (weight_kg != 0) & (height_cm != 0)
+    return {"bmi": np.where(has_bmi, weight_kg / ((height_cm/100)**2), np.nan)}
+
+def _sarcf(s1, s2, s3, s4, falls_n):
+    s5 = np.where(falls_n <= 0, 0, np.where(falls_n <= 3, 1, 2)).astype(np.int64)
+    score = s5.copy()
+    for s in (s1, s2, s3, s4):
+        score += np.trunc(np.clip(s, 0, 2)).astype(np.int64)
+    return {"s5": s5, "sarcf_score": score}
+
+def _sarcf_riesgo(sarcf_score, sarcf_pos_cut):
+    return {"sarcf_risk": sarcf_score >= sarcf_pos_cut}
+
+def _velocidad(time_4m):
+    return {"gait_speed_mps": np.where(time_4m > 0, 4.0 / time_4m, np.nan)}
+
+def _marcha(gait_speed_mps, gait_slow_mps):
+    return {"gait_slow": gait_speed_mps <= gait_slow_mps}       # NaN (sin tiempo) → False
+
+def _fuerza(hand_kg, sex_in, handgrip_low):
+    has_hand = hand_kg > 0
+    strength_low = has_hand & (hand_kg < _por_sexo(handgrip_low, sex_in))
+    return {"strength_label": _etiqueta(len(hand_kg), (strength_low, 1), (has_hand, 2)), "strength_low": strength_low}
+
+def _silla(chair5_s, chair5_slow_s):
+    return {"chair_slow": (chair5_s != 0) & (chair5_s > chair5_slow_s)}
+
+def _smm_pct(smm_kg, weight_kg):
+    return {"smm_pct": np.where((smm_kg != 0) & (weight_kg != 0), smm_kg/weight_kg*100.0, np.nan)}
+
+def _smm(smm_pct, sex_in, smmwt_sarc_cut, smmwt_lowmass_upper):
+    has_smm = ~np.isnan(smm_pct)
+    return {"smm_label": _etiqueta(len(smm_pct), (smm_pct < _por_sexo(smmwt_sarc_cut, sex_in), 1),
+                                   (smm_pct < _por_sexo(smmwt_lowmass_upper, sex_in), 2), (has_smm, 3))}
+
+def _smm_muy_baja(smm_pct, sex_in, smmwt_sarc_cut):
+    return {"very_low_mass_smm": smm_pct < _por_sexo(smmwt_sarc_cut, sex_in)}
+
+def _dxa_pct(dxa_alm_kg, weight_kg):
+    return {"dxa_alm_wt_pct": np.where((dxa_alm_kg != 0) & (weight_kg != 0), dxa_alm_kg/weight_kg*100.0, np.nan)}
+
+def _dxa(dxa_alm_wt_pct, sex_in, dxa_almwt_low_pct):
+    dxa_cut = _por_sexo(dxa_almwt_low_pct, sex_in)
+    low_mass_dxa = dxa_alm_wt_pct < dxa_cut
+    return {"dxa_cut": dxa_cut, "low_mass_dxa": low_mass_dxa,
+            "dxa_label": _etiqueta(len(dxa_cut), (low_mass_dxa, 1), (~np.isnan(dxa_alm_wt_pct), 2))}
+
+def _cintura(waist_cm, sex_in, waist_elev):
+    has_waist = waist_cm != 0
+    return {"waist_label": _etiqueta(len(waist_cm), (has_waist & (waist_cm > _por_sexo(waist_elev, sex_in)), 1), (has_waist, 2))}
+
+def _whr(waist_cm, hip_cm):
+    return {"whr": np.where((waist_cm != 0) & (hip_cm != 0), waist_cm/hip_cm, np.nan)}
+
+def _whr_label(whr, sex_in, whr_elev):
+    return {"whr_label": _etiqueta(len(whr), (whr > _por_sexo(whr_elev, sex_in), 1), (~np.isnan(whr), 2))}
+
+def _whtr(waist_cm, height_cm):
+    return {"whtr": np.where((waist_cm != 0) & (height_cm != 0), waist_cm/height_cm, np.nan)}
+
+def _whtr_label(whtr, whtr_elev):
+    return {"whtr_label": _etiqueta(len(whtr), (whtr > whtr_elev, 1), (~np.isnan(whtr), 2))}
+
+def _cuello(neck_cm, sex_in, neck_ow, neck_ob):
+    has_neck = neck_cm != 0
+    return {"neck_label": _etiqueta(len(neck_cm), (has_neck & (neck_cm > _por_sexo(neck_ob, sex_in)), 1),
+                                    (has_neck & (neck_cm > _por_sexo(neck_ow, sex_in)), 2), (has_neck, 3))}
+
+def _pantorrilla(calf_cm, sex_in, bmi, calf_base, calf_bmi_adj):
+    adj = np.zeros(len(bmi))
+    for desde, d in calf_bmi_adj:
+        adj[bmi >= desde] = d
+    calf_cut = _por_sexo(calf_base, sex_in) + adj
+    has_calf = calf_cm != 0
+    return {"calf_cut": calf_cut, "calf_label": _etiqueta(len(calf_cm), (has_calf & (calf_cm < calf_cut), 1), (has_calf, 2))}
+
+def _grasa(fat_pct, sex_in, fat_obese_pct):
+    has_fat = fat_pct != 0
+    return {"fat_label": _etiqueta(len(fat_pct), (has_fat & (fat_pct >= _por_sexo(fat_obese_pct, sex_in)), 1), (has_fat, 2))}
+
+def _vat(vat_cm2, sex_in, vat_high_cm2):
+    has_vat = vat_cm2 != 0
+    return {"vat_label": _etiqueta(len(vat_cm2), (has_vat & (vat_cm2 > _por_sexo(vat_high_cm2, sex_in)), 1), (has_vat, 2))}
+
+def _vatsat(vatsat, vatsat_high):
+    has_vatsat = vatsat != 0
+    return {"vatsat_label": _etiqueta(len(vatsat), (has_vatsat & (vatsat > vatsat_high), 1), (has_vatsat, 2))}
+
+def _percentil(hand_kg, sex_in, age_in):
+    perc = handgrip_percentile_array(hand_kg, sex_in, age_in, _SEXOS)
+    return {"perc": perc, "perc_label": _etiqueta(len(perc), (perc < 5, 1), (perc < 25, 2), (~np.isnan(perc), 3))}
+
+def _funcion(strength_low, gait_slow, chair_slow):
+    return {"function_low": strength_low | gait_slow | chair_slow}
+
+def _diagnostico(function_low, very_low_mass_smm, low_mass_dxa):
+    return {"diagnostico": _etiqueta(len(function_low), (function_low & (very_low_mass_smm | low_mass_dxa), 2), (function_low, 1))}
+
+NODOS_V: Tuple[Nodo, ...] = tuple(nodo(f) for f in (
+    _imc, _sarcf, _sarcf_riesgo, _velocidad, _marcha, _fuerza, _silla, _smm_pct, _smm,
+    _smm_muy_baja, _dxa_pct, _dxa, _cintura, _whr, _whr_label, _whtr, _whtr_label, _cuello,
+    _pantorrilla, _grasa, _vat, _vatsat, _percentil, _funcion, _diagnostico,
+))
+
+def _fila_vacia() -> Dict[str, np.ndarray]:
+    x = {k: np.ones(1) for k in ENTRADAS}
+    x["sex_in"] = np.zeros(1, dtype=np.int8)
+    return x
+
+_v = dict(_fila_vacia(), **umbrales())
+with np.errstate(divide="ignore", invalid="ignore"):
+    SALIDAS_V: Tuple[Tuple[str, ...], ...] = salidas_por_nodo(NODOS_V, _v)
+_NOMBRES_SALIDA: Tuple[str, ...] = tuple(k for sal in SALIDAS_V for k in sal)
+# dtype de cada salida (códigos int8 en las etiquetas)
+TIPOS_SALIDA: Dict[str, np.dtype] = {k: _v[k].dtype for k in _NOMBRES_SALIDA}
+del _v
+
+def evaluar_arrays(x: Dict[str, np.ndarray], thr: Thr = T) -> Dict[str, np.ndarray]:
+    """Evalúa arrays de entrada (sexo ya codificado 0/1, float64 con 0 = no medido).
+
+    Las etiquetas se devuelven como códigos int8 sobre `ETIQUETAS`.
+    """
+    # las salidas infinitas (entradas ínfimas) se rechazan después, ver `lotes.validar_resultados`
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        v = ejecutar(dict(x, **umbrales(thr)), NODOS_V)
+    return {k: v[k] for k in _NOMBRES_SALIDA}
+
+# =========================
+# Re-evaluación incremental al cambiar de perfil
+# =========================
+def plan_rescorado(antes: Thr, despues: Thr) -> Tuple[Tuple[Nodo, ...], Tuple[str, ...], FrozenSet[str]]:
+    """Nodos a recalcular, columnas que necesitan (entradas o salidas previas)
+    y salidas que pueden cambiar al pasar de `antes` a `despues`."""
+    idx, salidas = afectados(NODOS_V, SALIDAS_V, cambiados(antes, despues))
+    nodos = tuple(NODOS_V[i] for i in idx)
+    producidas = {k for i in idx for k in SALIDAS_V[i]}
+    necesarias = tuple(dict.fromkeys(d for n in nodos for d in n.deps if d not in UMBRALES and d not in producidas))
+    return nodos, necesarias, salidas
+
+# Medida sin la que ninguna salida depende del umbral: en las filas en que no
+# está informada (0) el umbral no cambia nada. Los umbrales que no aparecen
+# (corte de pantorrilla y DXA, SARC-F) dan salidas distintas en todas las filas.
+MEDIDA_UMBRAL: Dict[str, str] = {
+    "handgrip_low": "hand_kg", "gait_slow_mps": "time_4m", "chair5_slow_s": "chair5_s",
+    "smmwt_sarc_cut": "smm_kg", "smmwt_lowmass_upper": "smm_kg",
+    "waist_elev": "waist_cm", "whr_elev": "waist_cm", "whtr_elev": "waist_cm",
+    "neck_ow": "neck_cm", "neck_ob": "neck_cm", "fat_obese_pct": "fat_pct",
+    "vat_high_cm2": "vat_cm2", "vatsat_high": "vatsat",
+}
+
+def medidas_candidatas(antes: Thr, despues: Thr) -> Optional[Tuple[str, ...]]:
+    """Medidas de las que al menos una tiene que estar informada para que una
+    fila pueda cambiar al pasar de `antes` a `despues`; None si puede cambiar
+    cualquier fila."""
+    medidas = []
+    for u in cambiados(antes, despues):
+        if u not in MEDIDA_UMBRAL:
+            return None
+        medidas.append(MEDIDA_UMBRAL[u])
+    return tuple(dict.fromkeys(medidas))
+
+def rescorar_arrays(x: Dict[str, np.ndarray], antes: Thr, despues: Thr) -> Dict[str, np.ndarray]:
+    """Recalcula sólo las salidas que dependen de umbrales distintos entre los dos
+    perfiles. `x` basta con que tenga las columnas `necesarias` de `plan_rescorado`
+    (entradas y salidas previas, etiquetas como códigos). Devuelve las salidas nuevas.
+    """
+    nodos, _, salidas = plan_rescorado(antes, despues)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        v = ejecutar(dict(x, **umbrales(despues)), nodos)
+    return {k: v[k] for k in _NOMBRES_SALIDA if k in salidas}
+
+def distintos(viejo: np.ndarray, nuevo: np.ndarray) -> np.ndarray:
+    """Máscara de posiciones con distinto valor (NaN == NaN)."""
+    d = viejo != nuevo
+    if nuevo.dtype.kind == "f":
+        d &= ~(np.isnan(viejo) & np.isnan(nuevo))
+    return d
+
+def _entrada(df: pd.DataFrame, k: str) -> np.ndarray:
+    # Columnas ausentes o NaN → 0 ("no medido"); la edad ausente queda NaN (primera banda)
+    if k == "sex_in":
+        return codificar_sexo(df["sex_in"])
+    col = pd.to_numeric(df[k], errors="coerce").to_numpy(dtype=float) if k in df else np.zeros(len(df))
+    return col if k == "age_in" else np.nan_to_num(col, nan=0.0)
+
+def preparar_entradas(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    return {k: _entrada(df, k) for k in ENTRADAS}
+
+def _valores(col: pd.Series) -> np.ndarray:
+    # salida de `evaluar_cohorte` → array como el de `evaluar_arrays`
+    return col.cat.codes.to_numpy(dtype=np.int8) if isinstance(col.dtype, pd.CategoricalDtype) else col.to_numpy()
+
+_TIPOS_ETIQUETA = {k: pd.CategoricalDtype(list(v)) for k, v in ETIQUETAS.items()}
+
+def a_dataframe(r: Dict[str, np.ndarray], index=None) -> pd.DataFrame:
+    # Las etiquetas pasan de códigos int8 a categóricas con sus textos. Sin
+    # copiar ni consolidar los arrays (recién calculados) en bloques 2D
+    cols = {k: (pd.Categorical.from_codes(v, dtype=_TIPOS_ETIQUETA[k]) if k in ETIQUETAS else v) for k, v in r.items()}
+    return pd.DataFrame(cols, index=index, copy=False)
+
+def evaluar_cohorte(df: pd.DataFrame, thr: Thr = T) -> pd.DataFrame:
+    """Devuelve un DataFrame (mismo índice que `df`) con todas las salidas de `evaluar`."""
+    return a_dataframe(evaluar_arrays(preparar_entradas(df), thr), df.index)
+
+def rescorar_cohorte(df: pd.DataFrame, res: pd.DataFrame, antes: Thr, despues: Thr) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Pasa `res` (= `evaluar_cohorte(df, antes)`) al perfil `despues` recalculando
+    sólo las columnas afectadas. Devuelve el nuevo DataFrame y la máscara de filas
+    en las que alguna salida ha cambiado.
+    """
+    _, necesarias, _ = plan_rescorado(antes, despues)
+    x = {k: (_valores(res[k]) if k in res else _entrada(df, k)) for k in necesarias}
+    out = res.copy(deep=False)
+    cambio = np.zeros(len(res), dtype=bool)
+    for k, v in rescorar_arrays(x, antes, despues).items():
+        cambio |= distintos(_valores(res[k]), v)
+        out[k] = pd.Categorical.from_codes(v, ETIQUETAS[k]) if k in ETIQUETAS else v
+    return out, cambio
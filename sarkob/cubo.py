@@ -0,0 +1,180 @@
+"""Cubo de agregados de una cohorte para el cuadro de mando.
+
+La cohorte se evalúa y se agrupa una sola vez por sexo × banda de edad de
+`_PERC_TABLE` × clase de IMC × diagnóstico: por celda se guardan el nº de
+pacientes y, para cada medida de `MEDIDAS`, un histograma de rejilla fija, el
+nº de pacientes con la medida informada y su suma. Cualquier filtro o desglose
+por esas dimensiones es después una suma sobre un array de unos cientos de
+celdas (microsegundos), sin volver a los datos por paciente.
+
+    c = construir_cubo(df, thr)
+    c.prevalencia(por="clase_imc", sexo=["female"])
+    c.resumen("gait_speed_mps", por="banda_edad", diagnostico=["sarcopenia"])
+
+Las medias son exactas; los cuantiles se interpolan en el histograma (error
+menor que un intervalo de la rejilla). Los valores fuera de la rejilla cuentan
+en el primer o último intervalo.
+"""
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .reglas import CLASES_IMC, Thr, T
+from .percentiles import _PERC_TABLE, BANDAS_EDAD
+from .cohorte import ETIQUETAS, _entrada, evaluar_cohorte, _valores
+
+# medida → (nombre, mínimo, máximo, ancho de intervalo)
+MEDIDAS: Dict[str, Tuple[str, float, float, float]] = {
+    "perc": ("Percentil de fuerza prensil (%)", 0.0, 100.0, 1.0),
+    "gait_speed_mps": ("Velocidad de la marcha (m/s)", 0.0, 2.5, 0.05),
+    "smm_pct": ("SMM/peso (%)", 10.0, 50.0, 0.5),
+    "vat_cm2": ("VAT (cm²)", 0.0, 400.0, 10.0),
+}
+
+# dimensión → categorías (el código de cada paciente es el índice)
+DIMENSIONES: Dict[str, Tuple[str, ...]] = {
+    "sexo": ("female", "male"),
+    "banda_edad": tuple(f"{r['age_min']}–{r['age_max']}" for r in _PERC_TABLE["male"]) + ("sin banda",),
+    "clase_imc": tuple(c for _, c in CLASES_IMC) + ("sin IMC",),
+    "diagnostico": ETIQUETAS["diagnostico"],
+}
+_EJES = {d: i for i, d in enumerate(DIMENSIONES)}
+_FORMA = tuple(len(v) for v in DIMENSIONES.values())
+
+def _rejilla(medida: str) -> np.ndarray:
+    _, lo, hi, paso = MEDIDAS[medida]
+    return np.linspace(lo, hi, int(round((hi - lo) / paso)) + 1)
+
+class Cubo(NamedTuple):
+    n: np.ndarray                       # pacientes por celda (sexo, banda, imc, dx)
+    histogramas: Dict[str, np.ndarray]  # medida → (sexo, banda, imc, dx, intervalo)
+    sumas: Dict[str, np.ndarray]        # medida → suma de la medida por celda
+    perfil: str                         # "nombre@version" con que se evaluó
+
+    @property
+    def total(self) -> int:
+        return int(self.n.sum())
+
+    def _mascara(self, filtros: Dict[str, Optional[Sequence[str]]]) -> Tuple[np.ndarray, ...]:
+        # filtros: dimensión → categorías admitidas (None o vacío = todas)
+        desconocidos = set(filtros) - set(DIMENSIONES)
+        if desconocidos:
+            raise ValueError(f"dimensiones desconocidas: {', '.join(sorted(desconocidos))}")
+        out = []
+        for d, cats in DIMENSIONES.items():
+            sel = filtros.get(d)
+            m = np.ones(len(cats), dtype=bool)
+            if sel:
+                m = np.isin(np.array(cats, dtype=object), list(sel))
+            out.append(m)
+        return tuple(out)
+
+    def _reducir(self, a: np.ndarray, conservar: Tuple[str, ...], filtros) -> np.ndarray:
+        """Suma `a` (celdas en los 4 primeros ejes, luego lo que sea) sobre las
+        celdas filtradas, conservando las dimensiones de `conservar`."""
+        for eje, m in enumerate(self._mascara(filtros)):
+            if not m.all():
+                a = np.compress(m, a, axis=eje)
+        return a.sum(axis=tuple(_EJES[d] for d in DIMENSIONES if d not in conservar))
+
+    def _agrupar(self, a: np.ndarray, por: Optional[str], filtros) -> np.ndarray:
+        # (grupo, ...): un único grupo "total" sin `por`
+        return self._reducir(a, (por,), filtros) if por else self._reducir(a, (), filtros)[None]
+
+    def _categorias(self, por: Optional[str], filtros) -> pd.Index:
+        if por is None:
+            return pd.Index(["total"], name="grupo")
+        m = self._mascara(filtros)[_EJES[por]]
+        return pd.Index(np.array(DIMENSIONES[por], dtype=object)[m], name=por)
+
+    def prevalencia(self, por: Optional[str] = None, **filtros) -> pd.DataFrame:
+        """Pacientes y % de cada diagnóstico (columnas) por grupo de `por` (filas).
+
+        El filtro de diagnóstico no se aplica: la prevalencia es sobre todos.
+        """
+        if por == "diagnostico":
+            raise ValueError("la prevalencia ya se desglosa por diagnóstico")
+        filtros = dict(filtros, diagnostico=None)
+        n = self._reducir(self.n, (por, "diagnostico") if por else ("diagnostico",), filtros)
+        cuenta = pd.DataFrame(n if por else n[None], index=self._categorias(por, filtros),
+                              columns=list(DIMENSIONES["diagnostico"]))
+        pct = cuenta.div(cuenta.sum(axis=1).replace(0, np.nan), axis=0) * 100
+        return pd.concat({"pacientes": cuenta, "%": pct}, axis=1)
+
+    def distribucion(self, medida: str, por: Optional[str] = None, porcentaje: bool = True,
+                     **filtros) -> pd.DataFrame:
+        """Histograma de `medida`: filas = centro de cada intervalo, columnas = grupos
+        de `por`; en % de los pacientes con la medida informada de cada grupo."""
+        h = self._agrupar(self.histogramas[medida], por, filtros)
+        g = _rejilla(medida)
+        df = pd.DataFrame(h.T, index=pd.Index(np.round((g[:-1] + g[1:]) / 2, 6), name=MEDIDAS[medida][0]),
+                          columns=self._categorias(por, filtros))
+        if porcentaje:
+            df = df.div(df.sum(axis=0).replace(0, np.nan), axis=1) * 100
+        return df
+
+    def resumen(self, medida: str, por: Optional[str] = None, **filtros) -> pd.DataFrame:
+        """n informados, media (exacta) y p25/mediana/p75 (del histograma) por grupo."""
+        h = self._agrupar(self.histogramas[medida], por, filtros).astype(float)
+        s = self._agrupar(self.sumas[medida], por, filtros)
+        g = _rejilla(medida)
+        n = h.sum(axis=1)
+        acum = np.cumsum(h, axis=1)
+        out = {"n": n.astype(np.int64)}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["media"] = s / n
+            for nombre, q in (("p25", 0.25), ("mediana", 0.5), ("p75", 0.75)):
+                obj = q * n
+                # intervalo donde la frecuencia acumulada alcanza q·n, e interpolación lineal en él
+                i = np.minimum((acum < obj[:, None]).sum(axis=1), len(g) - 2)[:, None]
+                dentro = np.take_along_axis(h, i, axis=1)[:, 0]
+                antes = np.take_along_axis(acum, i, axis=1)[:, 0] - dentro
+                i = i[:, 0]
+                frac = np.clip((obj - antes) / dentro, 0, 1)
+                out[nombre] = np.where(n > 0, g[i] + frac * (g[i + 1] - g[i]), np.nan)
+        out["media"] = np.where(n > 0, out["media"], np.nan)
+        return pd.DataFrame(out, index=self._categorias(por, filtros))
+
+# =========================
+# Construcción
+# =========================
+def codigos(df: pd.DataFrame, res: pd.DataFrame) -> np.ndarray:
+    """Celda (índice plano en `DIMENSIONES`) de cada paciente."""
+    sexo = _entrada(df, "sex_in").astype(np.int64)
+    edad = _entrada(df, "age_in")
+    b = np.searchsorted(np.array(BANDAS_EDAD, dtype=float), edad, side="right") - 1
+    banda = np.where((b < 0) | np.isnan(edad), _FORMA[1] - 1, b)
+    bmi = res["bmi"].to_numpy(dtype=float)
+    j = np.searchsorted(np.array([lo for lo, _ in CLASES_IMC]), bmi, side="right") - 1
+    imc = np.where(np.isnan(bmi) | (j < 0), _FORMA[2] - 1, j)
+    dx = _valores(res["diagnostico"]).astype(np.int64)
+    return np.ravel_multi_index((sexo, banda, imc, dx), _FORMA)
+
+def _valores_medida(df: pd.DataFrame, res: pd.DataFrame, medida: str) -> np.ndarray:
+    # NaN = no informada; en las entradas, 0 también
+    if medida in res:
+        return res[medida].to_numpy(dtype=float)
+    v = _entrada(df, medida)
+    return np.where(v > 0, v, np.nan)
+
+def agregar(df: pd.DataFrame, res: pd.DataFrame, perfil: str = "") -> Cubo:
+    """Cubo de una cohorte ya evaluada (`res` = `evaluar_cohorte(df, thr)`)."""
+    celdas = int(np.prod(_FORMA))
+    c = codigos(df, res)
+    n = np.bincount(c, minlength=celdas).reshape(_FORMA)
+    histogramas, sumas = {}, {}
+    for m in MEDIDAS:
+        v = _valores_medida(df, res, m)
+        ok = ~np.isnan(v)
+        g = _rejilla(m)
+        i = np.clip(np.searchsorted(g, v[ok], side="right") - 1, 0, len(g) - 2)
+        histogramas[m] = np.bincount(c[ok] * (len(g) - 1) + i, minlength=celdas * (len(g) - 1)
+                                     ).astype(np.int32).reshape(_FORMA + (len(g) - 1,))
+        sumas[m] = np.bincount(c[ok], weights=v[ok], minlength=celdas).reshape(_FORMA)
+    return Cubo(n, histogramas, sumas, perfil)
+
+def construir_cubo(df: pd.DataFrame, thr: Thr = T) -> Cubo:
+    """Evalúa la cohorte `df` con `thr` y la agrega."""
+    from .perfiles import clave
+    return agregar(df, evaluar_cohorte(df, thr), clave(thr))
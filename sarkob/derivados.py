@@ -0,0 +1,76 @@
+"""Estado derivado incremental para la app interactiva.
+
+`Derivados` guarda el último valor de cada entrada, de cada umbral del perfil
+activo y de cada salida de los nodos de `sarkob.evaluacion` (más la tabla y el
+informe) y, en cada actualización, sólo vuelve a ejecutar los nodos con alguna
+dependencia que haya cambiado; al cambiar de perfil, sólo los que usan algún
+umbral distinto. Si un nodo se recalcula pero sus salidas no cambian, los nodos que
+dependen de él tampoco se recalculan.
+"""
+from time import perf_counter
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from . import metricas
+from .reglas import Thr, T
+from .perfiles import umbrales
+from .evaluacion import NODOS, Nodo, nodo
+from .informe import filas_tabla, construir_informe
+
+def _tabla(sex_in, hand_kg, chair5_s, calf_cm, waist_cm, neck_cm, fat_pct, vat_cm2, vatsat,
+           perc, perc_label, gait_speed_mps, gait_slow, chair_slow, strength_label,
+           smm_pct, smm_label, dxa_alm_wt_pct, dxa_cut, dxa_label, calf_cut, calf_label,
+           waist_label, whr, whr_label, whtr, whtr_label, neck_label,
+           fat_label, vat_label, vatsat_label, diagnostico,
+           # umbrales que aparecen en los puntos de corte de la tabla
+           handgrip_low, gait_slow_mps, chair5_slow_s, smmwt_sarc_cut, smmwt_lowmass_upper,
+           neck_ow, neck_ob, waist_elev, whr_elev, whtr_elev, fat_obese_pct, vat_high_cm2, vatsat_high):
+    v = locals()
+    return {"tabla": filas_tabla(v, v, SimpleNamespace(**v))}
+
+def _informe(sex_in, age_in, height_cm, weight_kg, hand_kg, chair5_s, calf_cm, waist_cm,
+             fat_pct, vat_cm2, vatsat, bmi, perc, gait_speed_mps, gait_slow, chair_slow,
+             strength_label, smm_pct, smm_label, dxa_alm_wt_pct, dxa_label, calf_cut, calf_label,
+             fat_label, vat_label, vatsat_label, waist_label, whr, whr_label, whtr, whtr_label,
+             diagnostico):
+    v = locals()
+    return {"informe": construir_informe(v, v)}
+
+NODOS_APP: Tuple[Nodo, ...] = NODOS + (nodo(_tabla, etapa="tabla"), nodo(_informe, etapa="informe"))
+
+def _igual(a, b) -> bool:
+    try:
+        return type(a) is type(b) and bool(a == b)
+    except (TypeError, ValueError):  # p. ej. DataFrames: se consideran distintos
+        return False
+
+class Derivados:
+    def __init__(self, nodos: Iterable[Nodo] = NODOS_APP):
+        self.nodos = tuple(nodos)
+        self.valores: Dict[str, Any] = {}
+        self.recalculados: List[str] = []   # nodos ejecutados en la última actualización
+
+    def actualizar(self, entradas: Dict[str, Any], thr: Thr = T) -> Dict[str, Any]:
+        entradas = dict(entradas, **umbrales(thr))
+        v = self.valores
+        primera = not v
+        cambiados: Set[str] = {k for k, x in entradas.items() if k not in v or not _igual(v[k], x)}
+        v.update(entradas)
+        self.recalculados = []
+        medir = metricas.ACTIVAS
+        tiempos: Dict[str, float] = {}
+        for n in self.nodos:
+            if not primera and cambiados.isdisjoint(n.deps): continue
+            self.recalculados.append(n.fn.__name__)
+            if medir: t0 = perf_counter()
+            for k, x in n.fn(**{k: v[k] for k in n.deps}).items():
+                if k not in v or not _igual(v[k], x):
+                    cambiados.add(k)
+                    v[k] = x
+            if medir: tiempos[n.etapa] = tiempos.get(n.etapa, 0.0) + perf_counter() - t0
+        if medir:
+            metricas.observar_etapas(tiempos)
+            # una evaluación por diagnóstico calculado, no por cada rerun de la app
+            if "_diagnostico" in self.recalculados:
+                metricas.contar("sarkob_evaluaciones_total", modo="app", diagnostico=v["diagnostico"])
+        return v
@@ -0,0 +1,295 @@
+"""Evaluación SARKOB de un paciente (misma lógica que el formulario de la app).
+
+La evaluación está partida en nodos: funciones puras cuyos parámetros son los
+nombres de las entradas, de los umbrales (`sarkob.perfiles.UMBRALES`) o de
+salidas de nodos anteriores, y que devuelven un dict con sus propias salidas.
+`evaluar` ejecuta todos los nodos en orden; `sarkob.derivados.Derivados` los
+reutiliza para recalcular sólo lo que cambia. Como los umbrales son
+dependencias explícitas, `afectados` sabe qué salidas cambian con cada umbral.
+"""
+import math
+from inspect import signature
+from time import perf_counter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from . import metricas
+from .reglas import Thr, T, norm_sex, gait_speed_4m, sarcf_score, handgrip_percentile
+from .perfiles import UMBRALES, umbrales
+
+# Campos de entrada del formulario y su valor por defecto (0 = no medido)
+ENTRADAS: Dict[str, Any] = {
+    "sex_in": "male", "age_in": 45, "height_cm": 170.0, "weight_kg": 70.0,
+    "s1": 0, "s2": 0, "s3": 0, "s4": 0, "falls_n": 0,
+    "hand_kg": 0.0, "time_4m": 0.0, "chair5_s": 0.0,
+    "fat_pct": 0.0, "vat_cm2": 0.0, "vatsat": 0.0,
+    "waist_cm": 0.0, "hip_cm": 0.0, "neck_cm": 0.0,
+    "smm_kg": 0.0, "dxa_alm_kg": 0.0, "calf_cm": 0.0,
+}
+
+# Límites de los campos numéricos del formulario (None = sin límite superior)
+LIMITES: Dict[str, Tuple[float, Optional[float]]] = {
+    "age_in": (0, 120),
+    "s1": (0, 2), "s2": (0, 2), "s3": (0, 2), "s4": (0, 2), "falls_n": (0, 50),
+}
+
+def reglas_valor(k: str, x) -> List[Tuple[Any, str]]:
+    """Reglas de validez del valor numérico `x` de la entrada `k`: pares
+    (condición que lo invalida, motivo). `x` puede ser un número o un
+    array/Series (NaN = vacío, no invalida), para el formulario y el modo lote.
+    """
+    lo, hi = LIMITES.get(k, (0, None))
+    fuera = (x < lo) if hi is None else ((x < lo) | (x > hi))
+    return [(abs(x) == math.inf, f"{k} no finito"),
+            ((abs(x) < math.inf) & fuera,
+             f"{k} fuera de rango" + (f" [{lo}, {hi}]" if hi is not None else f" (< {lo})"))]
+
+def normalizar_entradas(d: Dict[str, Any], obligatorias: Tuple[str, ...] = ("sex_in", "age_in")) -> Dict[str, Any]:
+    """Valida un dict de entradas (p. ej. JSON) y lo completa con 0 ("no medido").
+
+    Lanza ValueError con todos los motivos si algo no es válido.
+    """
+    errores = [f"campo desconocido: {k}" for k in d if k not in ENTRADAS]
+    errores += [f"falta {k}" for k in obligatorias if d.get(k) is None]
+    e: Dict[str, Any] = {}
+    for k in ENTRADAS:
+        x = d.get(k)
+        if k == "sex_in":
+            try:
+                e[k] = norm_sex(str(x).strip().lower())
+            except KeyError:
+                if x is not None: errores.append(f"sexo no reconocido: {x!r}")
+            continue
+        if x is None:
+            e[k] = 0
+            continue
+        if isinstance(x, bool) or not isinstance(x, (int, float)) or x != x:
+            errores.append(f"{k} no numérico")
+            continue
+        errores += [motivo for no_valido, motivo in reglas_valor(k, x) if no_valido]
+        e[k] = x
+    if errores:
+        raise ValueError("; ".join(errores))
+    return e
+
+class Nodo(NamedTuple):
+    fn: Callable[..., Dict[str, Any]]
+    deps: Tuple[str, ...]
+    etapa: str = "composicion"     # para `sarkob.metricas`
+
+# Etapa de los nodos que no son de composición corporal/antropometría
+ETAPAS: Dict[str, str] = {
+    "_sarcf": "funcion", "_sarcf_riesgo": "funcion", "_velocidad": "funcion", "_marcha": "funcion",
+    "_fuerza": "funcion", "_silla": "funcion", "_percentil": "percentil",
+    "_funcion": "diagnostico", "_diagnostico": "diagnostico",
+}
+
+def nodo(fn: Callable[..., Dict[str, Any]], etapa: Optional[str] = None) -> Nodo:
+    # las dependencias son los nombres de los parámetros
+    return Nodo(fn, tuple(signature(fn).parameters), etapa or ETAPAS.get(fn.__name__, "composicion"))
+
+# =========================
+# Nodos
+# =========================
+def _imc(weight_kg, height_cm):
+    return {"bmi": (weight_kg / ((height_cm/100)**2)) if (weight_kg and height_cm) else None}
+
+def _sarcf(s1, s2, s3, s4, falls_n):
+    s5 = 0 if falls_n<=0 else (1 if falls_n<=3 else 2)
+    return {"s5": s5, "sarcf_score": sarcf_score(s1,s2,s3,s4,s5)["score"]}
+
+def _sarcf_riesgo(sarcf_score, sarcf_pos_cut):
+    return {"sarcf_risk": sarcf_score >= sarcf_pos_cut}
+
+def _velocidad(time_4m):
+    gait = gait_speed_4m(time_4m if time_4m>0 else None)
+    return {"gait_speed_mps": (gait["speed_mps"] if gait else None)}
+
+def _marcha(gait_speed_mps, gait_slow_mps):
+    return {"gait_slow": bool(gait_speed_mps is not None and gait_speed_mps <= gait_slow_mps)}
+
+def _fuerza(hand_kg, sex_in, handgrip_low):
+    if not hand_kg > 0:
+        return {"strength_label": "", "strength_low": False}
+    low = hand_kg < handgrip_low[sex_in]
+    return {"strength_label": ("baja" if low else "normal"), "strength_low": low}
+
+def _silla(chair5_s, chair5_slow_s):
+    return {"chair_slow": bool(chair5_s and chair5_s > chair5_slow_s)}
+
+def _smm_pct(smm_kg, weight_kg):
+    return {"smm_pct": (smm_kg/weight_kg*100.0) if (smm_kg and weight_kg) else None}
+
+def _smm(smm_pct, sex_in, smmwt_sarc_cut, smmwt_lowmass_upper):
+    smm_label = ""
+    if smm_pct is not None:
+        if smm_pct < smmwt_sarc_cut[sex_in]: smm_label = "muy baja masa muscular"
+        elif smm_pct < smmwt_lowmass_upper[sex_in]: smm_label = "baja masa muscular"
+        else: smm_label = "normal"
+    return {"smm_label": smm_label}
+
+def _smm_muy_baja(smm_pct, sex_in, smmwt_sarc_cut):
+    return {"very_low_mass_smm": (smm_pct is not None and smm_pct < smmwt_sarc_cut[sex_in])}     # "muy baja masa muscular"
+
+def _dxa_pct(dxa_alm_kg, weight_kg):
+    return {"dxa_alm_wt_pct": (dxa_alm_kg/weight_kg*100.0) if (dxa_alm_kg and weight_kg) else None}
+
+def _dxa(dxa_alm_wt_pct, sex_in, dxa_almwt_low_pct):
+    dxa_cut = dxa_almwt_low_pct[sex_in]
+    dxa_label = ""
+    if dxa_alm_wt_pct is not None:
+        dxa_label = "baja masa muscular (DXA)" if dxa_alm_wt_pct < dxa_cut else "normal (DXA)"
+    low_mass_dxa = (dxa_alm_wt_pct is not None and dxa_alm_wt_pct < dxa_cut)              # "baja masa muscular (DXA)"
+    return {"dxa_cut": dxa_cut, "dxa_label": dxa_label, "low_mass_dxa": low_mass_dxa}
+
+def _cintura(waist_cm, sex_in, waist_elev):
+    return {"waist_label": ("elevada" if waist_cm and waist_cm > waist_elev[sex_in] else ("normal" if waist_cm else ""))}
+
+def _whr(waist_cm, hip_cm):
+    return {"whr": (waist_cm/hip_cm) if (waist_cm and hip_cm) else None}
+
+def _whr_label(whr, sex_in, whr_elev):
+    return {"whr_label": ("elevado" if (whr is not None and whr > whr_elev[sex_in]) else ("normal" if whr is not None else ""))}
+
+def _whtr(waist_cm, height_cm):
+    return {"whtr": (waist_cm/height_cm) if (waist_cm and height_cm) else None}
+
+def _whtr_label(whtr, whtr_elev):
+    return {"whtr_label": ("elevado" if (whtr is not None and whtr > whtr_elev) else ("normal" if whtr is not None else ""))}
+
+def _cuello(neck_cm, sex_in, neck_ow, neck_ob):
+    neck_label = ""
+    if neck_cm:
+        if neck_cm > neck_ob[sex_in]: neck_label = "obesidad"
+        elif neck_cm > neck_ow[sex_in]: neck_label = "sobrepeso"
+        else: neck_label = "normal"
+    return {"neck_label": neck_label}
+
+def _pantorrilla(calf_cm, sex_in, bmi, calf_base, calf_bmi_adj):
+    calf_cut = calf_base[sex_in]
+    if bmi is not None:
+        adj = 0.0
+        for desde, d in calf_bmi_adj:
+            if bmi >= desde: adj = d
+        calf_cut += adj
+    calf_label = ""
+    if calf_cm:
+        calf_label = "baja" if calf_cm < calf_cut else "normal"
+    return {"calf_cut": calf_cut, "calf_label": calf_label}
+
+def _grasa(fat_pct, sex_in, fat_obese_pct):
+    fat_label = ""
+    if fat_pct:
+        fat_label = "obesidad grasa" if fat_pct >= fat_obese_pct[sex_in] else "normal"
+    return {"fat_label": fat_label}
+
+def _vat(vat_cm2, sex_in, vat_high_cm2):
+    vat_label = ""
+    if vat_cm2:
+        vat_label = "elevada" if vat_cm2 > vat_high_cm2[sex_in] else "normal"
+    return {"vat_label": vat_label}
+
+def _vatsat(vatsat, vatsat_high):
+    vatsat_label = ""
+    if vatsat:
+        vatsat_label = "exceso VAT" if vatsat > vatsat_high else "normal"
+    return {"vatsat_label": vatsat_label}
+
+def _percentil(hand_kg, sex_in, age_in):
+    perc = handgrip_percentile(hand_kg if hand_kg>0 else None, sex_in, age_in)
+    perc_label = ("muy bajo" if perc is not None and perc < 5 else ("bajo" if perc is not None and perc < 25 else ("normal" if perc is not None else "")))
+    return {"perc": perc, "perc_label": perc_label}
+
+def _funcion(strength_low, gait_slow, chair_slow):
+    # Función baja por cualquier técnica
+    return {"function_low": bool(strength_low or gait_slow or chair_slow)}
+
+def _diagnostico(function_low, very_low_mass_smm, low_mass_dxa):
+    # Diagnóstico:
+    # - Sarcopenia = función baja y (muy baja SMM/peso o baja DXA ALM/peso)
+    # - Dinapenia  = función baja y composición normal
+    # - No sarcopenia = resto
+    if function_low and (very_low_mass_smm or low_mass_dxa):
+        diagnostico = "sarcopenia"
+    elif function_low and not (very_low_mass_smm or low_mass_dxa):
+        diagnostico = "dinapenia"
+    else:
+        diagnostico = "no sarcopenia"
+    return {"diagnostico": diagnostico}
+
+# Orden topológico: cada nodo sólo depende de entradas, umbrales o nodos anteriores
+NODOS: Tuple[Nodo, ...] = tuple(nodo(f) for f in (
+    _imc, _sarcf, _sarcf_riesgo, _velocidad, _marcha, _fuerza, _silla, _smm_pct, _smm,
+    _smm_muy_baja, _dxa_pct, _dxa, _cintura, _whr, _whr_label, _whtr, _whtr_label, _cuello,
+    _pantorrilla, _grasa, _vat, _vatsat, _percentil, _funcion, _diagnostico,
+))
+
+def ejecutar(v: Dict[str, Any], nodos: Tuple[Nodo, ...] = NODOS) -> Dict[str, Any]:
+    """Ejecuta todos los nodos sobre `v` (entradas y umbrales) y lo completa con sus salidas."""
+    if metricas.ACTIVAS:
+        return _ejecutar_medido(v, nodos)
+    g = v.__getitem__
+    for n in nodos:
+        v.update(n.fn(*[g(k) for k in n.deps]))
+    return v
+
+def _ejecutar_medido(v: Dict[str, Any], nodos: Tuple[Nodo, ...]) -> Dict[str, Any]:
+    g, reloj = v.__getitem__, perf_counter
+    tiempos: Dict[str, float] = {}
+    for n in nodos:
+        t0 = reloj()
+        v.update(n.fn(*[g(k) for k in n.deps]))
+        tiempos[n.etapa] = tiempos.get(n.etapa, 0.0) + reloj() - t0
+    metricas.observar_etapas(tiempos)
+    return v
+
+# =========================
+# Dependencias
+# =========================
+def salidas_por_nodo(nodos: Tuple[Nodo, ...], v: Dict[str, Any]) -> Tuple[Tuple[str, ...], ...]:
+    """Nombres de las salidas de cada nodo, ejecutándolos una vez sobre `v`."""
+    out = []
+    for n in nodos:
+        r = n.fn(**{k: v[k] for k in n.deps})
+        v.update(r)
+        out.append(tuple(r))
+    return tuple(out)
+
+def afectados(nodos: Tuple[Nodo, ...], salidas: Tuple[Tuple[str, ...], ...],
+              nombres: Iterable[str]) -> Tuple[Tuple[int, ...], FrozenSet[str]]:
+    """Nodos (índices, en orden) que hay que recalcular si cambian `nombres`
+    (entradas o umbrales) y salidas que pueden cambiar por ello."""
+    sucios: Set[str] = set(nombres)
+    idx = []
+    for i, (n, sal) in enumerate(zip(nodos, salidas)):
+        if sucios.intersection(n.deps):
+            idx.append(i)
+            sucios.update(sal)
+    return tuple(idx), frozenset(sucios.difference(nombres))
+
+# Paciente con todas las medidas informadas (para recorrer todas las ramas)
+_COMPLETO = {k: (v if isinstance(v, str) else 1) for k, v in ENTRADAS.items()}
+_v = dict(_COMPLETO, **umbrales())
+SALIDAS: Tuple[Tuple[str, ...], ...] = salidas_por_nodo(NODOS, _v)
+
+_NOMBRES_SALIDA: Tuple[str, ...] = tuple(k for sal in SALIDAS for k in sal)
+# Salidas de `evaluar` para ese paciente (p. ej. para conocer el tipo de cada una)
+EJEMPLO_SALIDAS: Dict[str, Any] = {k: _v[k] for k in _NOMBRES_SALIDA}
+del _v
+
+# Umbral → salidas de `evaluar` que dependen de él (directa o indirectamente)
+DEPENDENCIAS: Dict[str, FrozenSet[str]] = {u: afectados(NODOS, SALIDAS, (u,))[1] for u in UMBRALES}
+
+def evaluar(sex_in: str = "male", age_in: Optional[float] = 45,
+            height_cm: float = 170.0, weight_kg: float = 70.0,
+            s1: int = 0, s2: int = 0, s3: int = 0, s4: int = 0, falls_n: int = 0,
+            hand_kg: float = 0.0, time_4m: float = 0.0, chair5_s: float = 0.0,
+            fat_pct: float = 0.0, vat_cm2: float = 0.0, vatsat: float = 0.0,
+            waist_cm: float = 0.0, hip_cm: float = 0.0, neck_cm: float = 0.0,
+            smm_kg: float = 0.0, dxa_alm_kg: float = 0.0, calf_cm: float = 0.0,
+            thr: Thr = T) -> Dict[str, Any]:
+    e = dict(locals())
+    del e["thr"]
+    v = ejecutar(dict(e, **umbrales(thr)))
+    if metricas.ACTIVAS:
+        metricas.contar("sarkob_evaluaciones_total", modo="individual", diagnostico=v["diagnostico"])
+    return {k: v[k] for k in _NOMBRES_SALIDA}
@@ -0,0 +1,117 @@
+"""Tabla de resultados e informe de texto de una evaluación SARKOB.
+
+`e` son las entradas del formulario (claves de `ENTRADAS`) y `r` el resultado
+de `evaluar(**e, thr=thr)`; los puntos de corte de la tabla son los de `thr`.
+"""
+import ast
+import builtins
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .reglas import Thr, T
+
+COLUMNAS = ["Parámetro","Valor","Punto de corte / normalidad","Interpretación"]
+
+def pf(val):
+    return "" if val is None else (f"{val:.2f}" if isinstance(val, float) else str(val))
+
+def _coma(x: float) -> str:
+    return f"{x:g}".replace(".", ",")
+
+def filas_tabla(e: Dict[str, Any], r: Dict[str, Any], thr: Thr = T) -> List[List[str]]:
+    sex_in, hand_kg, chair5_s = e["sex_in"], e["hand_kg"], e["chair5_s"]
+    calf_cm, waist_cm, neck_cm = e["calf_cm"], e["waist_cm"], e["neck_cm"]
+    fat_pct, vat_cm2, vatsat = e["fat_pct"], e["vat_cm2"], e["vatsat"]
+    perc, gait_speed, diagnostico = r["perc"], r["gait_speed_mps"], r["diagnostico"]
+    smm_pct, dxa_alm_wt_pct, whr, whtr = r["smm_pct"], r["dxa_alm_wt_pct"], r["whr"], r["whtr"]
+    gait_slow, chair_slow = r["gait_slow"], r["chair_slow"]
+
+    cut_hand = f"< {thr.handgrip_low[sex_in]:g} kg → baja"
+    cut_gait = f"≤ {thr.gait_slow_mps:g} → lenta"
+    cut_chair = f"> {thr.chair5_slow_s:g} → lenta"
+    sarc, low_up = _coma(thr.smmwt_sarc_cut[sex_in]), _coma(thr.smmwt_lowmass_upper[sex_in])
+    smm_ref_text = f"< {sarc}% muy baja; {sarc}–{low_up}% baja; > {low_up}% normal"
+    cut_neck = (f"H: >{_coma(thr.neck_ow['male'])} SP, >{_coma(thr.neck_ob['male'])} OB · "
+                f"M: >{_coma(thr.neck_ow['female'])} SP, >{_coma(thr.neck_ob['female'])} OB")
+    cut_dxa = f"< {r['dxa_cut']:.1f}% → baja (DXA)"
+    cut_calf = f"< {r['calf_cut']:.1f} → baja" if calf_cm else ""
+
+    rows = []
+    rows.append(["Fuerza prensil (kg)", pf(hand_kg if hand_kg>0 else None), cut_hand, (r["strength_label"] if hand_kg>0 else "")])
+    rows.append(["Percentil de fuerza", ("" if perc is None else f"{perc:.1f}%"),
+                 "P50 ~ referencia por edad/sexo", r["perc_label"]])
+    rows.append(["Velocidad de la marcha (m/s)", ("" if gait_speed is None else f"{gait_speed:.2f}"), cut_gait if gait_speed is not None else "", ("lenta" if gait_slow else ("normal" if gait_speed is not None else ""))])
+    rows.append(["Silla-5 (s)", ("" if not chair5_s else f"{chair5_s:.1f}"), cut_chair if chair5_s else "", ("lenta" if chair_slow else ("normal" if chair5_s else ""))])
+
+    rows.append(["SMM/peso (%)", ("" if smm_pct is None else f"{smm_pct:.1f}%"), (smm_ref_text if smm_pct is not None else ""), r["smm_label"]])
+    rows.append(["DXA ALM/peso (%)", ("" if dxa_alm_wt_pct is None else f"{dxa_alm_wt_pct:.1f}%"), (cut_dxa if dxa_alm_wt_pct is not None else ""), r["dxa_label"]])
+
+    rows.append(["Pantorrilla (cm)", ("" if not calf_cm else f"{calf_cm:.1f}"), cut_calf, r["calf_label"]])
+    rows.append(["Cintura (cm)", ("" if not waist_cm else f"{waist_cm:.1f}"), (f"> {thr.waist_elev[sex_in]:.0f} → elevada" if waist_cm else ""), r["waist_label"]])
+    rows.append(["Cintura/Cadera (WHR)", ("" if whr is None else f"{whr:.2f}"), (f"> {thr.whr_elev[sex_in]:.2f} → elevado" if whr is not None else ""), r["whr_label"]])
+    rows.append(["Cintura/Altura (WHtR)", ("" if whtr is None else f"{whtr:.2f}"), (f"> {thr.whtr_elev:.2f} → elevado" if whtr is not None else ""), r["whtr_label"]])
+    rows.append(["Cuello (cm)", ("" if not neck_cm else f"{neck_cm:.1f}"), cut_neck, r["neck_label"]])
+    rows.append(["% Grasa total", ("" if not fat_pct else f"{fat_pct:.1f}%"), (f"≥ {thr.fat_obese_pct[sex_in]:.0f}% → obesidad" if fat_pct else ""), r["fat_label"]])
+    rows.append(["Grasa visceral (cm²)", ("" if not vat_cm2 else f"{vat_cm2:.0f}"), (f"> {thr.vat_high_cm2[sex_in]:.0f} → elevada" if vat_cm2 else ""), r["vat_label"]])
+    rows.append(["VAT/SAT", ("" if not vatsat else f"{vatsat:.2f}"), (f"> {thr.vatsat_high:.1f} → exceso VAT" if vatsat else ""), r["vatsat_label"]])
+
+    # Fila de diagnóstico global (solicitada)
+    rows.append(["Diagnóstico global", diagnostico, "Definición SARKOB",
+                 "Función baja + (SMM/peso muy baja o DXA ALM/peso baja)" if diagnostico=="sarcopenia"
+                 else ("Función baja + composición normal" if diagnostico=="dinapenia" else "—")])
+    return rows
+
+# =========================
+# Informe de texto: plantilla precompilada
+# =========================
+# (condición, línea): la línea sólo se incluye si la condición (una expresión
+# Python) es cierta; None = siempre. Las líneas son f-strings sin el prefijo.
+# Condiciones y huecos usan nombres de entradas y salidas de `evaluar`, y `pf`.
+PLANTILLA_INFORME: Tuple[Tuple[Optional[str], str], ...] = (
+    (None, "SARKOB – Evaluación de la Sarcopenia en la Obesidad"),
+    (None, ""),
+    (None, "Datos basales:"),
+    (None, "- Sexo: {'Mujer' if sex_in=='female' else 'Hombre'}"),
+    (None, "- Edad: {age_in} años | Talla: {pf(height_cm)} cm | Peso: {pf(weight_kg)} kg | IMC: {pf(bmi)}"),
+    (None, ""),
+    (None, "Resultados clave:"),
+    ("hand_kg", "- Fuerza prensil: {hand_kg:.1f} kg ({strength_label})"),
+    ("perc is not None", "- Percentil de fuerza: {perc:.1f}%"),
+    ("gait_speed_mps is not None", "- Velocidad 4 m: {gait_speed_mps:.2f} m/s ({'lenta' if gait_slow else 'normal'})"),
+    ("chair5_s", "- Silla-5: {chair5_s:.1f} s ({'lenta' if chair_slow else 'normal'})"),
+    ("smm_pct is not None", "- SMM/peso: {smm_pct:.1f}% ({smm_label})"),
+    ("dxa_alm_wt_pct is not None", "- DXA ALM/peso: {dxa_alm_wt_pct:.1f}% ({dxa_label})"),
+    ("calf_cm", "- Pantorrilla: {calf_cm:.1f} cm (corte usado: {calf_cut:.1f} cm → {calf_label})"),
+    ("fat_pct", "- % Grasa: {fat_pct:.1f}% ({fat_label})"),
+    ("vat_cm2", "- VAT: {vat_cm2:.0f} cm² ({vat_label}) | VAT/SAT: {pf(vatsat)} ({vatsat_label})"),
+    ("waist_cm", "- Cintura: {waist_cm:.1f} cm ({waist_label}) | WHR: {pf(whr)} ({whr_label}) | WHtR: {pf(whtr)} ({whtr_label})"),
+    (None, ""),
+    (None, "Diagnóstico global: {diagnostico}"),
+)
+
+class Plantilla(NamedTuple):
+    nombres: Tuple[str, ...]          # parámetros de `fn`, en orden
+    fn: Callable[..., str]
+
+def compilar_plantilla(plantilla: Tuple[Tuple[Optional[str], str], ...] = PLANTILLA_INFORME) -> Plantilla:
+    """Compila la plantilla a una única función con un parámetro por nombre usado.
+
+    Renderizar es entonces una llamada con los valores en posición, sin dicts
+    intermedios (lo que permite generar miles de informes por segundo).
+    """
+    cuerpo = ["    _l = []", "    _a = _l.append"]
+    for cond, linea in plantilla:
+        f = ("f" if "{" in linea else "") + repr(linea)
+        cuerpo.append(f"    _a({f})" if cond is None else f"    if {cond}: _a({f})")
+    cuerpo.append("    return '\\n'.join(_l)")
+    cuerpo = "\n".join(cuerpo)
+    ambito = {"pf": pf}
+    nombres = tuple(sorted({n.id for n in ast.walk(ast.parse("if 1:\n" + cuerpo)) if isinstance(n, ast.Name)}
+                           - {"_l", "_a"} - set(ambito) - set(dir(builtins))))
+    codigo = f"def _informe({', '.join(nombres)}):\n{cuerpo}\n"
+    exec(compile(codigo, "<plantilla del informe>", "exec"), ambito)
+    return Plantilla(nombres, ambito["_informe"])
+
+INFORME: Plantilla = compilar_plantilla()
+
+def construir_informe(e: Dict[str, Any], r: Dict[str, Any]) -> str:
+    return INFORME.fn(*[e[k] if k in e else r[k] for k in INFORME.nombres])
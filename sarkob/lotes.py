@@ -0,0 +1,236 @@
+"""Modo lote: evaluación SARKOB en streaming sobre ficheros CSV/Parquet.
+
+El fichero de entrada se lee por bloques de `chunksize` filas, cada bloque se
+valida y evalúa con el motor vectorizado y el resultado se escribe en cuanto
+está listo, de modo que la memoria no depende del tamaño del fichero. Las
+filas no válidas no se evalúan: se anotan (nº de fila y motivo) en un fichero
+de errores aparte y la ejecución continúa.
+"""
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metricas
+from .reglas import Thr, T
+from .evaluacion import ENTRADAS, reglas_valor
+from .cohorte import codificar_sexo, evaluar_cohorte
+from .paralelo import EvaluadorParalelo
+from .almacen import Almacen, fechas_iso
+
+CHUNKSIZE = 50_000
+
+def _formato(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"): return "parquet"
+    if ext == ".csv": return "csv"
+    raise ValueError(f"formato no soportado: {path!r} (usa .csv o .parquet)")
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:  # pragma: no cover - depende del entorno
+        raise ImportError("Parquet requiere pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+# =========================
+# Lectura por bloques
+# =========================
+def leer_bloques(path: str, chunksize: int = CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """Itera el fichero en DataFrames de como mucho `chunksize` filas.
+
+    El índice de cada bloque es el nº de fila de datos (desde 0) en el fichero.
+    En CSV, `sex_in` y las columnas que no son del formulario (paciente, fecha…)
+    se leen como texto, para que su tipo no dependa de lo que traiga cada bloque.
+    """
+    if _formato(path) == "parquet":
+        _, pq = _pyarrow()
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            df = batch.to_pandas()
+            df.index = pd.RangeIndex(start, start + len(df))
+            start += len(df)
+            yield df
+    else:
+        cols = pd.read_csv(path, nrows=0).columns
+        texto = {c: str for c in cols if c == "sex_in" or c not in ENTRADAS}
+        with pd.read_csv(path, chunksize=chunksize, dtype=texto) as reader:
+            yield from reader
+
+def leer_cohorte(fuente, nombre: Optional[str] = None) -> Tuple[pd.DataFrame, int]:
+    """Lee entera una cohorte pequeña o mediana (ruta o fichero abierto; `nombre`
+    da el formato si `fuente` no es una ruta) y descarta las filas no válidas.
+
+    Devuelve las filas válidas y cuántas se han descartado.
+    """
+    if _formato(nombre or fuente) == "parquet":
+        _pyarrow()
+        df = pd.read_parquet(fuente)
+    else:
+        df = pd.read_csv(fuente, dtype={"sex_in": str})
+    if "sex_in" not in df:
+        raise ValueError("falta la columna obligatoria 'sex_in'")
+    bad = (validar(df) != "").to_numpy()
+    return df[~bad], int(bad.sum())
+
+# =========================
+# Validación por fila
+# =========================
+def validar(df: pd.DataFrame) -> pd.Series:
+    """Motivo de error por fila ("" si la fila es válida)."""
+    err = pd.Series("", index=df.index, dtype=object)
+
+    def anotar(mask, msg):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            err[mask] = err[mask] + "; " + msg
+
+    anotar(codificar_sexo(df["sex_in"], invalido="coerce") < 0, "sexo no reconocido")
+    for k in ENTRADAS:
+        if k == "sex_in" or k not in df: continue
+        raw = df[k]
+        num = pd.to_numeric(raw, errors="coerce")
+        vacio = raw.isna() | (raw.astype(str).str.strip() == "") if raw.dtype == object else raw.isna()
+        anotar(num.isna() & ~vacio, f"{k} no numérico")
+        for no_valido, motivo in reglas_valor(k, num):
+            anotar(no_valido, motivo)
+    if "fecha" in df:
+        anotar(fechas_iso(df["fecha"])[1], "fecha no válida (AAAA-MM-DD)")
+    return err.str[2:]
+
+def validar_resultados(res: pd.DataFrame) -> pd.Series:
+    """Motivo de error por fila de las salidas de `evaluar_cohorte` ("" si son
+    finitas): entradas válidas pero ínfimas, como un tiempo de 4 m de 1e-320,
+    dan velocidades o porcentajes infinitos."""
+    err = pd.Series("", index=res.index, dtype=object)
+    for k in res:
+        if res[k].dtype.kind == "f":
+            inf = np.isinf(res[k].to_numpy())
+            if inf.any():
+                err[inf] = err[inf] + f"; {k} no finito"
+    return err.str[2:]
+
+# =========================
+# Escritura incremental
+# =========================
+def _tipos_fijos(df: pd.DataFrame) -> pd.DataFrame:
+    # Tipos que no dependen del bloque: entradas numéricas (ya validadas) en
+    # float64 y columnas de texto como string, aunque un bloque traiga sólo
+    # enteros o sólo vacíos
+    cols = {k: pd.to_numeric(df[k], errors="coerce").astype(np.float64)
+            for k in ENTRADAS if k != "sex_in" and k in df}
+    cols.update((k, df[k].astype("string")) for k in df if k not in cols and df[k].dtype == object)
+    return df.assign(**cols)
+
+class _Escritor:
+    def __init__(self, path: str):
+        self.path, self.fmt = path, _formato(path)
+        self._fh = self._pq = self._schema = None
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            first = self._fh is None
+            if first:
+                self._fh = open(self.path, "w", newline="", encoding="utf-8")
+            df.to_csv(self._fh, header=first, index=False)
+            return
+        pa, pq = _pyarrow()
+        # las etiquetas son categóricas con categorías fijas (ETIQUETAS) y el
+        # resto de columnas tienen tipos fijos, así que el esquema del primer
+        # bloque vale para todos
+        df = _tipos_fijos(df)
+        if self._pq is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            self._pq = pq.ParquetWriter(self.path, self._schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._pq.write_table(table)
+
+    def cerrar(self) -> None:
+        if self._fh is not None: self._fh.close()
+        if self._pq is not None: self._pq.close()
+
+def procesar(entrada: str, salida: str, errores: Optional[str] = None,
+             chunksize: int = CHUNKSIZE, thr: Thr = T, procesos: int = 1,
+             almacen: Optional[Almacen] = None, fecha=None) -> Dict[str, int]:
+    """Evalúa `entrada` en bloques y escribe entradas + resultados en `salida`.
+
+    Con `procesos` > 1 cada bloque se reparte entre un pool de procesos
+    (conviene entonces un `chunksize` mayor, p. ej. 20 000 filas por proceso)
+    y, mientras el pool lo evalúa, el proceso principal escribe el anterior y
+    lee y valida el siguiente; esa E/S marca el ritmo (ver `sarkob.paralelo`).
+    Con `almacen`, cada bloque evaluado se guarda además como visitas (una
+    transacción por bloque, anotadas con el perfil `thr`), con fecha `fecha`
+    (por defecto, hoy) si la entrada no trae columna `fecha` o la fila la deja
+    vacía; las filas con una fecha que no es ISO AAAA-MM-DD son errores.
+
+    Los errores por fila van a `errores` (por defecto `<salida>.errores.csv`),
+    con `fila` = nº de fila de datos en la entrada, empezando en 1.
+    Devuelve el recuento de filas leídas, evaluadas y con error.
+    """
+    errores = errores or os.path.splitext(salida)[0] + ".errores.csv"
+    out = _Escritor(salida)
+    ev = EvaluadorParalelo(procesos, thr) if procesos > 1 else None
+    n = n_ok = n_err = 0
+    t0 = time.perf_counter()
+    with open(errores, "w", newline="", encoding="utf-8") as ferr:
+        ferr.write("fila,error\n")
+
+        def terminar(df, err, ok, res):
+            nonlocal n, n_ok, n_err, t0
+            bad = (err != "").to_numpy()
+            if len(ok):
+                if not isinstance(res, pd.DataFrame):
+                    res = res.resultado()
+                # filas con salidas infinitas: pasan a los errores
+                inf = validar_resultados(res)
+                no_finito = (inf != "").to_numpy()
+                if no_finito.any():
+                    err.loc[ok.index[no_finito]] = inf[no_finito].to_numpy()
+                    bad = (err != "").to_numpy()
+                    ok, res = ok[~no_finito], res[~no_finito]
+            if bad.any():
+                pd.DataFrame({"fila": df.index[bad] + 1, "error": err[bad]}).to_csv(ferr, header=False, index=False)
+            if len(ok):
+                with metricas.etapa("escritura"):
+                    out.escribir(pd.concat([ok.drop(columns=res.columns, errors="ignore"), res], axis=1))
+                if almacen is not None:
+                    with metricas.etapa("almacen"):
+                        almacen.guardar_df(ok, res, fecha, thr)
+            n += len(df); n_err += int(bad.sum()); n_ok += len(ok)
+            if metricas.ACTIVAS:
+                t1 = time.perf_counter()
+                metricas.contar("sarkob_lote_filas_total", len(ok), estado="evaluada")
+                metricas.contar("sarkob_lote_filas_total", int(bad.sum()), estado="error")
+                metricas.fijar("sarkob_lote_filas_por_segundo", len(df) / (t1 - t0))
+                if len(ok):
+                    metricas.contar_diagnosticos("lote", res["diagnostico"].value_counts(sort=False).items())
+                t0 = t1
+
+        try:
+            # con el pool, el bloque N se evalúa mientras se termina el N-1 y se lee el N+1
+            anterior = None
+            for df in leer_bloques(entrada, chunksize):
+                if "sex_in" not in df:
+                    raise ValueError("falta la columna obligatoria 'sex_in'")
+                with metricas.etapa("entrada"):
+                    err = validar(df)
+                ok = df[~(err != "").to_numpy()]
+                if not len(ok): res = None
+                elif ev: res = ev.enviar(ok)
+                else: res = evaluar_cohorte(ok, thr)
+                if anterior is not None:
+                    terminar(*anterior)
+                anterior = (df, err, ok, res)
+            if anterior is not None:
+                terminar(*anterior)
+            if almacen is not None:
+                almacen.analizar()
+        finally:
+            out.cerrar()
+            if ev: ev.cerrar()
+    return {"filas": n, "evaluadas": n_ok, "errores": n_err}
@@ -0,0 +1,202 @@
+"""Métricas opcionales (formato de texto de Prometheus) y perfilado de lotes.
+
+Desactivadas por defecto: los puntos instrumentados sólo comprueban
+`ACTIVAS` (o usan `etapa`, que entonces devuelve un contexto vacío compartido),
+así que pueden quedarse en los caminos calientes. Se activan con la variable
+de entorno `SARKOB_METRICAS=1` o con `activar()`.
+
+Métricas:
+    sarkob_etapa_segundos{etapa}                  histograma por evaluación y etapa
+    sarkob_evaluaciones_total{modo,diagnostico}   contador
+    sarkob_lote_filas_total{estado}               contador (evaluada / error)
+    sarkob_lote_filas_por_segundo                 último bloque del modo lote
+    sarkob_rerun_segundos                         histograma de las ejecuciones de Streamlit
+    sarkob_peticion_segundos{ruta}                histograma del servicio HTTP
+
+`exportar()` devuelve el texto, `escribir(ruta)` lo deja en un fichero (p. ej.
+para el textfile collector de node_exporter) y `servir(puerto)` lo publica en
+http://host:puerto/metrics desde un hilo. Sólo usa la biblioteca estándar.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Tuple
+
+ACTIVAS = os.environ.get("SARKOB_METRICAS", "").strip().lower() not in ("", "0", "no", "false")
+
+# Límites superiores de los histogramas (segundos)
+BUCKETS: Tuple[float, ...] = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                              0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# nombre → (tipo, ayuda)
+METRICAS: Dict[str, Tuple[str, str]] = {
+    "sarkob_etapa_segundos": ("histogram", "Tiempo por evaluación en cada etapa."),
+    "sarkob_evaluaciones_total": ("counter", "Evaluaciones por modo y diagnóstico."),
+    "sarkob_lote_filas_total": ("counter", "Filas procesadas en modo lote."),
+    "sarkob_lote_filas_por_segundo": ("gauge", "Rendimiento del último bloque del modo lote."),
+    "sarkob_rerun_segundos": ("histogram", "Duración de cada ejecución del script de Streamlit."),
+    "sarkob_peticion_segundos": ("histogram", "Duración de las peticiones al servicio HTTP."),
+}
+
+_Clave = Tuple[str, Tuple[Tuple[str, str], ...]]
+_lock = threading.Lock()
+_valores: Dict[_Clave, float] = {}                 # contadores y gauges
+_histogramas: Dict[_Clave, list] = {}              # [cuentas por bucket..., suma, n]
+
+def activar(activas: bool = True) -> None:
+    global ACTIVAS
+    ACTIVAS = activas
+
+def reiniciar() -> None:
+    with _lock:
+        _valores.clear()
+        _histogramas.clear()
+
+def _clave(nombre: str, etiquetas: Dict[str, object]) -> _Clave:
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+def contar(nombre: str, valor: float = 1.0, **etiquetas) -> None:
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        _valores[k] = _valores.get(k, 0.0) + valor
+
+def fijar(nombre: str, valor: float, **etiquetas) -> None:
+    with _lock:
+        _valores[_clave(nombre, etiquetas)] = float(valor)
+
+def observar(nombre: str, valor: float, **etiquetas) -> None:
+    k = _clave(nombre, etiquetas)
+    with _lock:
+        h = _histogramas.get(k)
+        if h is None:
+            h = _histogramas[k] = [0] * len(BUCKETS) + [0.0, 0]
+        i = bisect_left(BUCKETS, valor)
+        if i < len(BUCKETS):
+            h[i] += 1
+        h[-2] += valor
+        h[-1] += 1
+
+def observar_etapas(tiempos: Dict[str, float]) -> None:
+    for etapa, s in tiempos.items():
+        observar("sarkob_etapa_segundos", s, etapa=etapa)
+
+def contar_diagnosticos(modo: str, diagnosticos: Iterable[Tuple[str, int]]) -> None:
+    for dx, n in diagnosticos:
+        if n: contar("sarkob_evaluaciones_total", n, modo=modo, diagnostico=dx)
+
+# =========================
+# Cronómetros
+# =========================
+class _Etapa:
+    __slots__ = ("nombre", "t0")
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observar("sarkob_etapa_segundos", time.perf_counter() - self.t0, etapa=self.nombre)
+        return False
+
+class _Nulo:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULO = _Nulo()
+
+def etapa(nombre: str):
+    """`with etapa("informe"): ...` mide el bloque si las métricas están activas."""
+    return _Etapa(nombre) if ACTIVAS else _NULO
+
+# =========================
+# Exportación
+# =========================
+def _etiquetas(pares: Iterable[Tuple[str, str]]) -> str:
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    s = ",".join(f'{k}="{esc(v)}"' for k, v in pares)
+    return "{" + s + "}" if s else ""
+
+def _num(x: float) -> str:
+    return str(int(x)) if float(x).is_integer() else repr(float(x))
+
+def exportar() -> str:
+    """Todas las métricas en el formato de texto de Prometheus (0.0.4)."""
+    with _lock:
+        valores = sorted(_valores.items())
+        histogramas = sorted((k, list(h)) for k, h in _histogramas.items())
+    lineas, vistos = [], set()
+
+    def cabecera(nombre):
+        if nombre not in vistos:
+            vistos.add(nombre)
+            tipo, ayuda = METRICAS.get(nombre, ("untyped", ""))
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+    for (nombre, pares), v in valores:
+        cabecera(nombre)
+        lineas.append(f"{nombre}{_etiquetas(pares)} {_num(v)}")
+    for (nombre, pares), h in histogramas:
+        cabecera(nombre)
+        acumulado = 0
+        for b, c in zip(BUCKETS, h):
+            acumulado += c
+            lineas.append(f"{nombre}_bucket{_etiquetas(pares + (('le', repr(b)),))} {acumulado}")
+        lineas.append(f"{nombre}_bucket{_etiquetas(pares + (('le', '+Inf'),))} {h[-1]}")
+        lineas.append(f"{nombre}_sum{_etiquetas(pares)} {repr(h[-2])}")
+        lineas.append(f"{nombre}_count{_etiquetas(pares)} {h[-1]}")
+    return "\n".join(lineas) + "\n"
+
+def escribir(ruta: str) -> None:
+    """Escribe `exportar()` en `ruta` de forma atómica."""
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(exportar())
+    os.replace(tmp, ruta)
+
+_servidor = None
+
+def servir(puerto: int, host: str = "127.0.0.1") -> None:
+    """Publica las métricas en http://host:puerto/metrics (hilo en segundo plano; idempotente)."""
+    global _servidor
+    if _servidor is not None:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            cuerpo = exportar().encode("utf-8")
+            self.send_response(200 if self.path.split("?", 1)[0] in ("/metrics", "/metricas") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    _servidor = ThreadingHTTPServer((host, puerto), _Handler)
+    threading.Thread(target=_servidor.serve_forever, name="sarkob-metricas", daemon=True).start()
+
+# =========================
+# Perfilado
+# =========================
+def perfilar(fn, ruta: Optional[str] = None, lineas: int = 25, salida=None):
+    """Ejecuta `fn()` bajo cProfile; guarda las estadísticas en `ruta` (.prof,
+    legible con pstats/snakeviz) e imprime las `lineas` funciones con más
+    tiempo acumulado en `salida` (por defecto stderr). Devuelve lo que devuelva `fn`."""
+    import cProfile
+    import pstats
+    import sys
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn)
+    finally:
+        if ruta:
+            prof.dump_stats(ruta)
+        pstats.Stats(prof, stream=salida or sys.stderr).sort_stats("cumulative").print_stats(lineas)
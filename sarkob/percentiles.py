@@ -0,0 +1,154 @@
+"""Percentiles de prensión: tabla de referencia e índice compilado para búsqueda rápida.
+
+La tabla se compila una sola vez al importar en un índice por sexo (límites de
+banda de edad + matriz de 11 percentiles) guardado en `array('d')`. La consulta
+hace búsqueda binaria sobre la banda y sobre la fila, sin crear objetos.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional, Dict, Any, List, Tuple
+
+# =========================
+# Percentiles de prensión (tabla completa)
+# =========================
+_PERC_TABLE: Dict[str, List[Dict[str, Any]]] = {
+    "male": [
+        {"age_min":20,"age_max":24,"p5":33.9,"p10":36.8,"p20":40.5,"p30":43.2,"p40":45.7,"p50":48.0,"p60":50.4,"p70":52.9,"p80":56.0,"p90":60.1,"p95":63.6},
+        {"age_min":25,"age_max":29,"p5":35.5,"p10":38.8,"p20":42.1,"p30":44.8,"p40":47.1,"p50":49.3,"p60":51.5,"p70":53.9,"p80":56.7,"p90":60.7,"p95":64.0},
+        {"age_min":30,"age_max":34,"p5":35.0,"p10":38.3,"p20":42.2,"p30":45.0,"p40":47.4,"p50":49.7,"p60":52.0,"p70":54.4,"p80":57.4,"p90":61.5,"p95":64.9},
+        {"age_min":35,"age_max":39,"p5":33.8,"p10":37.3,"p20":41.5,"p30":44.5,"p40":47.1,"p50":49.5,"p60":51.9,"p70":54.4,"p80":57.5,"p90":61.8,"p95":65.3},
+        {"age_min":40,"age_max":44,"p5":32.3,"p10":36.0,"p20":40.4,"p30":43.6,"p40":46.3,"p50":48.8,"p60":51.2,"p70":53.9,"p80":57.1,"p90":61.5,"p95":65.1},
+        {"age_min":45,"age_max":49,"p5":30.6,"p10":34.4,"p20":39.0,"p30":42.3,"p40":45.1,"p50":47.6,"p60":50.2,"p70":52.9,"p80":56.2,"p90":60.7,"p95":64.4},
+        {"age_min":50,"age_max":54,"p5":28.9,"p10":32.8,"p20":37.4,"p30":40.7,"p40":43.5,"p50":46.2,"p60":48.8,"p70":51.6,"p80":54.8,"p90":59.4,"p95":63.1},
+        {"age_min":55,"age_max":59,"p5":27.2,"p10":31.0,"p20":35.6,"p30":38.9,"p40":41.7,"p50":44.4,"p60":47.0,"p70":49.8,"p80":53.1,"p90":57.7,"p95":61.4},
+        {"age_min":60,"age_max":64,"p5":25.5,"p10":29.1,"p20":33.6,"p30":36.9,"p40":39.7,"p50":42.4,"p60":45.0,"p70":47.8,"p80":51.1,"p90":55.6,"p95":59.3},
+        {"age_min":65,"age_max":69,"p5":23.7,"p10":27.2,"p20":31.5,"p30":34.7,"p40":37.5,"p50":40.1,"p60":42.8,"p70":45.6,"p80":48.8,"p90":53.2,"p95":56.8},
+        {"age_min":70,"age_max":74,"p5":21.9,"p10":25.2,"p20":29.3,"p30":32.4,"p40":35.1,"p50":37.7,"p60":40.3,"p70":43.1,"p80":46.3,"p90":50.6,"p95":54.1},
+        {"age_min":75,"age_max":79,"p5":20.0,"p10":23.1,"p20":27.0,"p30":29.9,"p40":32.5,"p50":35.1,"p60":37.6,"p70":40.3,"p80":43.5,"p90":47.7,"p95":51.1},
+        {"age_min":80,"age_max":84,"p5":18.0,"p10":20.8,"p20":24.5,"p30":27.3,"p40":29.8,"p50":32.3,"p60":34.8,"p70":37.5,"p80":40.5,"p90":44.7,"p95":48.0},
+        {"age_min":85,"age_max":89,"p5":15.9,"p10":18.5,"p20":21.9,"p30":24.6,"p40":27.0,"p50":29.4,"p60":31.8,"p70":34.4,"p80":37.4,"p90":41.5,"p95":44.6},
+        {"age_min":90,"age_max":94,"p5":13.7,"p10":16.1,"p20":19.2,"p30":21.7,"p40":24.0,"p50":26.3,"p60":28.7,"p70":31.2,"p80":34.2,"p90":38.1,"p95":41.2},
+        {"age_min":95,"age_max":99,"p5":11.3,"p10":13.5,"p20":16.4,"p30":18.8,"p40":20.9,"p50":23.1,"p60":25.4,"p70":27.9,"p80":30.8,"p90":34.6,"p95":37.5},
+        {"age_min":100,"age_max":150,"p5":8.8,"p10":10.8,"p20":13.5,"p30":15.7,"p40":17.8,"p50":19.8,"p60":22.0,"p70":24.5,"p80":27.2,"p90":30.9,"p95":33.8},
+    ],
+    "female": [
+        {"age_min":20,"age_max":24,"p5":19.7,"p10":21.7,"p20":24.0,"p30":25.7,"p40":27.2,"p50":28.6,"p60":30.0,"p70":31.6,"p80":33.6,"p90":36.6,"p95":39.1},
+        {"age_min":25,"age_max":29,"p5":20.0,"p10":22.0,"p20":24.5,"p30":26.3,"p40":27.9,"p50":29.4,"p60":30.9,"p70":32.6,"p80":34.6,"p90":37.4,"p95":39.7},
+        {"age_min":30,"age_max":34,"p5":19.6,"p10":21.8,"p20":24.4,"p30":26.4,"p40":28.1,"p50":29.7,"p60":31.3,"p70":33.1,"p80":35.2,"p90":38.0,"p95":40.4},
+        {"age_min":35,"age_max":39,"p5":19.0,"p10":21.3,"p20":24.1,"p30":26.2,"p40":28.0,"p50":29.7,"p60":31.4,"p70":33.2,"p80":35.4,"p90":38.4,"p95":40.8},
+        {"age_min":40,"age_max":44,"p5":18.3,"p10":20.7,"p20":23.7,"p30":25.8,"p40":27.6,"p50":29.4,"p60":31.1,"p70":33.0,"p80":35.2,"p90":38.3,"p95":40.8},
+        {"age_min":45,"age_max":49,"p5":17.6,"p10":20.1,"p20":23.1,"p30":25.2,"p40":27.1,"p50":28.9,"p60":30.6,"p70":32.5,"p80":34.8,"p90":37.9,"p95":40.4},
+        {"age_min":50,"age_max":54,"p5":16.9,"p10":19.4,"p20":22.4,"p30":24.5,"p40":26.4,"p50":28.2,"p60":29.9,"p70":31.8,"p80":34.0,"p90":37.1,"p95":39.7},
+        {"age_min":55,"age_max":59,"p5":16.1,"p10":18.5,"p20":21.5,"p30":23.7,"p40":25.5,"p50":27.3,"p60":29.0,"p70":30.9,"p80":33.0,"p90":36.1,"p95":38.6},
+        {"age_min":60,"age_max":64,"p5":15.2,"p10":17.6,"p20":20.6,"p30":22.7,"p40":24.5,"p50":26.2,"p60":27.9,"p70":29.7,"p80":31.8,"p90":34.9,"p95":37.4},
+        {"age_min":65,"age_max":69,"p5":14.3,"p10":16.6,"p20":19.5,"p30":21.6,"p40":23.3,"p50":25.0,"p60":26.6,"p70":28.4,"p80":30.5,"p90":33.4,"p95":35.8},
+        {"age_min":70,"age_max":74,"p5":13.2,"p10":15.5,"p20":18.3,"p30":20.3,"p40":22.0,"p50":23.6,"p60":25.2,"p70":26.9,"p80":28.9,"p90":31.8,"p95":34.1},
+        {"age_min":75,"age_max":79,"p5":12.0,"p10":14.3,"p20":17.0,"p30":18.9,"p40":20.5,"p50":22.1,"p60":23.6,"p70":25.2,"p80":27.2,"p90":29.9,"p95":32.2},
+        {"age_min":80,"age_max":84,"p5":10.7,"p10":12.9,"p20":15.5,"p30":17.4,"p40":18.9,"p50":20.4,"p60":21.9,"p70":23.5,"p80":25.3,"p90":28.0,"p95":30.2},
+        {"age_min":85,"age_max":89,"p5":9.3,"p10":11.4,"p20":13.9,"p30":15.7,"p40":17.2,"p50":18.6,"p60":20.0,"p70":21.5,"p80":23.3,"p90":25.9,"p95":28.0},
+        {"age_min":90,"age_max":94,"p5":7.8,"p10":9.8,"p20":12.2,"p30":13.9,"p40":15.3,"p50":16.7,"p60":18.0,"p70":19.5,"p80":21.2,"p90":23.6,"p95":25.7},
+        {"age_min":95,"age_max":99,"p5":6.1,"p10":8.0,"p20":10.3,"p30":11.9,"p40":13.3,"p50":14.6,"p60":15.9,"p70":17.3,"p80":18.9,"p90":21.2,"p95":23.2},
+        {"age_min":100,"age_max":150,"p5":4.2,"p10":6.1,"p20":8.3,"p30":9.8,"p40":11.2,"p50":12.4,"p60":13.6,"p70":14.9,"p80":16.5,"p90":18.7,"p95":20.6},
+    ]
+}
+_PERCENT_KEYS = ["p5","p10","p20","p30","p40","p50","p60","p70","p80","p90","p95"]
+
+# =========================
+# Índice compilado
+# =========================
+class IndicePercentiles:
+    __slots__ = ("mins", "maxs", "pcts", "vals", "k")
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.k = len(_PERCENT_KEYS)
+        self.mins, self.maxs = array("d"), array("d")
+        self.pcts, self.vals = array("d"), array("d")
+        for r in rows:
+            if self.maxs and r["age_min"] <= self.maxs[-1]:
+                raise ValueError("bandas de edad desordenadas o solapadas")
+            self.mins.append(r["age_min"]); self.maxs.append(r["age_max"])
+            # orden estable por valor (como la versión original)
+            for p, v in sorted(((float(k[1:]), r[k]) for k in _PERCENT_KEYS), key=lambda x: x[1]):
+                self.pcts.append(p); self.vals.append(v)
+
+    def banda(self, age: Optional[float]) -> int:
+        # Sin edad, menor de 20 o fuera de toda banda → primera fila
+        if age is None: return 0
+        i = bisect_right(self.mins, age) - 1
+        return i if i >= 0 and age <= self.maxs[i] else 0
+
+    def percentil(self, handgrip_kg: float, band: int) -> float:
+        k = self.k
+        o = band * k
+        v, p = self.vals, self.pcts
+        if handgrip_kg <= v[o]:
+            if v[o+1] == v[o]: return p[o]
+            return max(0.0, p[o] + (handgrip_kg - v[o])/(v[o+1] - v[o])*(p[o+1] - p[o]))
+        j = o + k - 2
+        if handgrip_kg >= v[j+1]:
+            if v[j+1] == v[j]: return p[j+1]
+            return min(100.0, p[j] + (handgrip_kg - v[j])/(v[j+1] - v[j])*(p[j+1] - p[j]))
+        # primer segmento con v1 <= h <= v2
+        j = bisect_left(v, handgrip_kg, o, o + k) - 1
+        if v[j+1] == v[j]: return p[j]
+        return p[j] + (handgrip_kg - v[j])/(v[j+1] - v[j])*(p[j+1] - p[j])
+
+INDICE: Dict[str, IndicePercentiles] = {sex: IndicePercentiles(rows) for sex, rows in _PERC_TABLE.items()}
+
+# Bandas de edad de la tabla (iguales en ambos sexos), por su límite inferior
+BANDAS_EDAD: Tuple[int, ...] = tuple(r["age_min"] for r in _PERC_TABLE["male"])
+
+def banda_edad(age: Optional[float]) -> Optional[int]:
+    """Límite inferior de la banda de `_PERC_TABLE` que contiene `age` (None si < 20 o sin edad).
+
+    Para agrupar cohortes: a diferencia de `IndicePercentiles.banda`, una edad
+    entre bandas o por encima de la última cae en la banda inferior más próxima.
+    """
+    if age is None or age != age: return None
+    i = bisect_right(BANDAS_EDAD, age) - 1
+    return BANDAS_EDAD[i] if i >= 0 else None
+
+def handgrip_percentile(handgrip_kg: Optional[float], sex: str, age: Optional[float]) -> Optional[float]:
+    if not handgrip_kg: return None
+    ix = INDICE[sex]
+    return ix.percentil(handgrip_kg, ix.banda(age))
+
+def handgrip_percentile_array(handgrip_kg, sex, age, sexos=("female", "male")):
+    """Versión vectorizada: `sex` son códigos enteros sobre `sexos`.
+
+    Devuelve NaN donde la fuerza es 0 o falta. Usa NumPy (importado aquí).
+    """
+    import numpy as np
+    hand = np.asarray(handgrip_kg, dtype=float)
+    sex = np.asarray(sex)
+    age = np.asarray(age, dtype=float)
+    out = np.full(hand.shape, np.nan)
+    for code, name in enumerate(sexos):
+        m = (sex == code) & (hand > 0)
+        if not m.any(): continue
+        ix = INDICE[name]
+        k = ix.k
+        mins, maxs = np.frombuffer(ix.mins), np.frombuffer(ix.maxs)
+        V, P = np.frombuffer(ix.vals), np.frombuffer(ix.pcts)
+        h, a = hand[m], age[m]
+        i = np.searchsorted(mins, a, side="right") - 1
+        ic = np.clip(i, 0, len(mins) - 1)
+        o = np.where((i >= 0) & (a <= maxs[ic]), ic, 0) * k
+        # bisect_left vectorizado dentro de la fila de cada paciente
+        lo, hi = o.copy(), o + k
+        while True:
+            act = lo < hi
+            if not act.any(): break
+            mid = (lo + hi) // 2
+            less = act & (V[np.minimum(mid, len(V) - 1)] < h)
+            lo = np.where(less, mid + 1, lo)
+            hi = np.where(act & ~less, mid, hi)
+        first, last = h <= V[o], h >= V[o + k - 1]
+        j = np.where(first, o, np.where(last, o + k - 2, lo - 1))
+        p1, v1, p2, v2 = P[j], V[j], P[j+1], V[j+1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = p1 + (h - v1)/(v2 - v1)*(p2 - p1)
+        last &= ~first
+        p = np.where(first, np.maximum(0.0, p), np.where(last, np.minimum(100.0, p), p))
+        out[m] = np.where(v2 == v1, np.where(last, p2, p1), p)
+    return out
@@ -0,0 +1,99 @@
+"""Perfiles de umbrales: juegos de cortes con nombre y versión.
+
+Un perfil es una instancia de `Thr` cuyos atributos sustituyen a los valores
+por defecto de la clase; `T` es el perfil base ("sarkob@1"). Los perfiles se
+guardan como JSON:
+
+    {"nombre": "ewgsop2", "version": "1", "descripcion": "...",
+     "umbrales": {"chair5_slow_s": 15.0}}
+
+Los umbrales que no aparecen se toman del perfil base. Un perfil se identifica
+por su clave "nombre@version": una misma clave no debe reutilizarse con
+valores distintos (el registro de visitas lo comprueba).
+"""
+import json
+import os
+from typing import Any, Dict, Tuple
+
+from .reglas import Thr, T
+
+# Nombres de los umbrales (atributos de Thr salvo la identificación del perfil)
+UMBRALES: Tuple[str, ...] = tuple(k for k in vars(Thr) if not k.startswith("_") and k not in ("nombre", "version"))
+_POR_SEXO = frozenset(k for k in UMBRALES if isinstance(getattr(T, k), dict))
+
+def umbrales(thr: Thr = T) -> Dict[str, Any]:
+    """Valores de todos los umbrales de `thr`, por nombre."""
+    return {k: getattr(thr, k) for k in UMBRALES}
+
+def clave(thr: Thr = T) -> str:
+    return f"{thr.nombre}@{thr.version}"
+
+def cambiados(antes: Thr, despues: Thr) -> Tuple[str, ...]:
+    """Umbrales con distinto valor en los dos perfiles."""
+    return tuple(k for k in UMBRALES if getattr(antes, k) != getattr(despues, k))
+
+def _validar(k: str, v: Any) -> Any:
+    num = lambda x: isinstance(x, (int, float)) and not isinstance(x, bool)
+    if k not in UMBRALES:
+        raise ValueError(f"umbral desconocido: {k}")
+    if k in _POR_SEXO:
+        if not (isinstance(v, dict) and set(v) == {"female", "male"} and all(num(x) for x in v.values())):
+            raise ValueError(f"{k}: se esperaba {{\"female\": número, \"male\": número}}")
+        return {"female": v["female"], "male": v["male"]}
+    if k == "calf_bmi_adj":
+        try:
+            pares = tuple((float(a), float(b)) for a, b in v)
+        except (TypeError, ValueError):
+            raise ValueError(f"{k}: se esperaba una lista de pares [IMC desde, ajuste cm]")
+        if any(a >= b for (a, _), (b, _) in zip(pares, pares[1:])):
+            raise ValueError(f"{k}: los IMC deben ir en orden creciente")
+        return pares
+    if not num(v):
+        raise ValueError(f"{k}: se esperaba un número")
+    return v
+
+def perfil(nombre: str, version: str, base: Thr = T, **cambios) -> Thr:
+    """Nuevo perfil: los umbrales de `base` con `cambios` aplicados (validados)."""
+    thr = Thr()
+    thr.nombre, thr.version = str(nombre), str(version)
+    for k, v in umbrales(base).items():
+        setattr(thr, k, v)
+    for k, v in cambios.items():
+        setattr(thr, k, _validar(k, v))
+    return thr
+
+def a_dict(thr: Thr) -> Dict[str, Any]:
+    """Perfil serializable (el formato de los ficheros)."""
+    u = umbrales(thr)
+    u["calf_bmi_adj"] = [list(p) for p in u["calf_bmi_adj"]]
+    return {"nombre": thr.nombre, "version": thr.version, "umbrales": u}
+
+def desde_dict(d: Dict[str, Any]) -> Thr:
+    if not isinstance(d, dict) or not d.get("nombre") or d.get("version") in (None, ""):
+        raise ValueError("el perfil necesita 'nombre' y 'version'")
+    return perfil(d["nombre"], d["version"], **(d.get("umbrales") or {}))
+
+def cargar_perfil(ruta: str) -> Thr:
+    with open(ruta, encoding="utf-8") as f:
+        try:
+            return desde_dict(json.load(f))
+        except ValueError as e:
+            raise ValueError(f"{ruta}: {e}") from None
+
+def guardar_perfil(thr: Thr, ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(a_dict(thr), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+def cargar_perfiles(directorio: str) -> Dict[str, Thr]:
+    """Todos los perfiles `*.json` de `directorio` (más el base), por clave."""
+    out = {clave(T): T}
+    if os.path.isdir(directorio):
+        for nombre in sorted(os.listdir(directorio)):
+            if nombre.endswith(".json"):
+                thr = cargar_perfil(os.path.join(directorio, nombre))
+                k = clave(thr)
+                if k in out and umbrales(out[k]) != umbrales(thr):
+                    raise ValueError(f"{nombre}: la clave {k} ya existe con otros umbrales")
+                out[k] = thr
+    return out
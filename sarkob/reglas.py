@@ -0,0 +1,100 @@
+"""Reglas clínicas SARKOB: umbrales y helpers por paciente."""
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+from .percentiles import _PERC_TABLE, _PERCENT_KEYS, handgrip_percentile  # noqa: F401 (re-exportados)
+
+# =========================
+# UMBRALES Y CONSTANTES
+# =========================
+@dataclass
+class Thr:
+    # Identificación del perfil de umbrales (ver `sarkob.perfiles`)
+    nombre = "sarkob"
+    version = "1"
+
+    # Fuerza (dinamometría)
+    handgrip_low = {"female": 16.0, "male": 27.0}  # kg
+
+    # Función
+    gait_slow_mps = 0.8
+    chair5_slow_s = 17.0  # corte solicitado
+
+    # Antropometría
+    waist_elev = {"female": 88.0, "male": 102.0}   # cm
+    whr_elev   = {"female": 0.85, "male": 0.90}
+    whtr_elev  = 0.5
+    neck_ow    = {"female": 34.0, "male": 37.0}    # sobrepeso
+    neck_ob    = {"female": 36.5, "male": 39.5}    # obesidad
+
+    # Pantorrilla – punto base (antes de ajustar por IMC)
+    calf_base  = {"female": 33.0, "male": 34.0}    # cm
+    # Ajuste por IMC: (IMC desde, cm a sumar al punto base), en orden creciente
+    calf_bmi_adj = ((25.0, -3.0), (30.0, -7.0), (40.0, -12.0))
+
+    # Composición
+    fat_obese_pct = {"female": 35.0, "male": 25.0} # %
+    vat_high_cm2  = {"female": 80.0,  "male": 160.0}
+    vatsat_high   = 0.4
+
+    # Masa muscular – SMM/peso (BIA): bandas y cortes
+    smmwt_sarc_cut = {"female": 22.1, "male": 31.5}      # "muy baja masa muscular"
+    smmwt_lowmass_upper = {"female": 27.6, "male": 37.0} # límite superior de "baja masa muscular"
+
+    # DXA ALM/peso (%)
+    dxa_almwt_low_pct = {"female": 19.4, "male": 25.7}   # "baja masa muscular (DXA)"
+
+    # SARC-F
+    sarcf_pos_cut = 4
+
+T = Thr()
+
+# Clases de IMC (OMS): límite inferior (kg/m²) → nombre
+CLASES_IMC = (
+    (0.0, "bajo peso"), (18.5, "normal"), (25.0, "sobrepeso"),
+    (30.0, "obesidad I"), (35.0, "obesidad II"), (40.0, "obesidad III"),
+)
+
+# Normalizador de sexo
+def norm_sex(s: str) -> str:
+    return {"f":"female","m":"male","female":"female","male":"male"}[s]
+
+# =========================
+# Helpers clínicos
+# =========================
+def gait_speed_4m(time_s: Optional[float], thr: Thr = T) -> Optional[Dict[str, Any]]:
+    if not time_s or time_s <= 0: return None
+    v = 4.0 / time_s
+    return {"speed_mps": v, "is_slow": v <= thr.gait_slow_mps}
+
+def label_strength(hand_kg: Optional[float], sex: str, thr: Thr = T) -> Dict[str, Any]:
+    if hand_kg is None: return {"label": "", "is_low": False}
+    low = hand_kg < thr.handgrip_low[sex]
+    return {"label": ("baja" if low else "normal"), "is_low": low}
+
+def calf_cutoff_adjusted(sex: str, bmi: Optional[float], thr: Thr = T) -> float:
+    base = thr.calf_base[sex]
+    if bmi is None: return base
+    adj = 0.0
+    for desde, d in thr.calf_bmi_adj:
+        if bmi >= desde: adj = d
+    return base + adj
+
+def clase_imc(bmi: Optional[float]) -> str:
+    if bmi is None: return ""
+    nombre = ""
+    for lo, n in CLASES_IMC:
+        if bmi >= lo: nombre = n
+    return nombre
+
+def smm_weight_pct_label(smm_pct: Optional[float], sex: str, thr: Thr = T) -> str:
+    if smm_pct is None: return ""
+    sarc_cut = thr.smmwt_sarc_cut[sex]          # muy baja
+    low_up   = thr.smmwt_lowmass_upper[sex]     # límite sup. de baja
+    if smm_pct < sarc_cut: return "muy baja masa muscular"
+    if smm_pct < low_up:   return "baja masa muscular"
+    return "normal"
+
+def sarcf_score(a,b,c,d,e, thr: Thr = T):
+    score = sum(int(max(0,min(2,v))) for v in (a,b,c,d,e))
+    return {"score": score, "risk": score >= thr.sarcf_pos_cut}
@@ -0,0 +1,213 @@
+"""Análisis de sensibilidad de los puntos de corte sobre una cohorte.
+
+El diagnóstico sólo depende de dos booleanos por paciente: función baja
+(fuerza, marcha o silla) y masa baja (SMM/peso o DXA ALM/peso), y cada uno de
+esos criterios compara una medida con un umbral. Al barrer uno o dos umbrales,
+el resto de criterios de cada paciente queda fijo, así que basta con:
+
+1. evaluar la cohorte una sola vez con el perfil base (y el de referencia),
+2. ordenar una vez los valores de cada criterio (se guarda por eje),
+3. por cada rejilla, situar los puntos de la rejilla en esos valores ordenados
+   y contar con sumas acumuladas cuántos pacientes de cada grupo (resto de
+   criterios, diagnóstico de referencia) cumplen el criterio barrido.
+
+Así un barrido de 1M de pacientes × 200 puntos no ejecuta el motor ninguna vez.
+
+    s = Sensibilidad(df, thr=T, referencia=T)
+    b = s.barrer("chair5_slow_s", np.arange(12, 20.01, 0.05))
+    b.prevalencia          # (3, 161): no sarcopenia / dinapenia / sarcopenia
+    b.confusion            # (3, 3, 161): referencia × barrido
+"""
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .reglas import Thr, T
+from .perfiles import perfil
+from .cohorte import ETIQUETAS, evaluar_arrays, preparar_entradas, rescorar_arrays
+
+# umbral → (criterio booleano, medida, comparación que lo activa, grupo)
+CRITERIOS: Dict[str, Tuple[str, str, str, str]] = {
+    "handgrip_low":      ("strength_low", "hand_kg", "<", "funcion"),
+    "gait_slow_mps":     ("gait_slow", "gait_speed_mps", "<=", "funcion"),
+    "chair5_slow_s":     ("chair_slow", "chair5_s", ">", "funcion"),
+    "smmwt_sarc_cut":    ("very_low_mass_smm", "smm_pct", "<", "masa"),
+    "dxa_almwt_low_pct": ("low_mass_dxa", "dxa_alm_wt_pct", "<", "masa"),
+}
+_SEXOS = ("female", "male")
+# Ejes barribles: los umbrales por sexo se barren para un sexo ("handgrip_low.female")
+EJES: Tuple[str, ...] = tuple(
+    e for u in CRITERIOS
+    for e in ((f"{u}.{s}" for s in _SEXOS) if isinstance(getattr(T, u), dict) else (u,))
+)
+DIAGNOSTICOS = ETIQUETAS["diagnostico"]
+
+class Barrido(NamedTuple):
+    ejes: Tuple[str, ...]
+    valores: Tuple[np.ndarray, ...]     # rejilla de cada eje, en orden creciente
+    confusion: np.ndarray               # recuentos (diag. referencia, diag. barrido, *rejilla)
+    n: int
+
+    @property
+    def recuentos(self) -> np.ndarray:
+        """Pacientes por diagnóstico en cada punto: (3, *rejilla)."""
+        return self.confusion.sum(axis=0)
+
+    @property
+    def prevalencia(self) -> np.ndarray:
+        return self.recuentos / max(self.n, 1)
+
+    @property
+    def concordancia(self) -> np.ndarray:
+        """Fracción de pacientes con el mismo diagnóstico que la referencia."""
+        return np.trace(self.confusion) / max(self.n, 1)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Formato largo: un valor por eje, `diagnostico`, `pacientes` y `prevalencia`."""
+        malla = np.meshgrid(*self.valores, indexing="ij")
+        rec = self.recuentos.reshape(3, -1)
+        cols = {e: np.tile(m.ravel(), 3) for e, m in zip(self.ejes, malla)}
+        cols["diagnostico"] = np.repeat(DIAGNOSTICOS, rec.shape[1])
+        cols["pacientes"] = rec.ravel()
+        cols["prevalencia"] = cols["pacientes"] / max(self.n, 1)
+        return pd.DataFrame(cols)
+
+    def matriz(self, *idx: int) -> pd.DataFrame:
+        """Matriz de confusión (filas: referencia, columnas: barrido) en un punto de la rejilla."""
+        return pd.DataFrame(self.confusion[(slice(None), slice(None), *idx)],
+                            index=pd.Index(DIAGNOSTICOS, name="referencia"),
+                            columns=pd.Index(DIAGNOSTICOS, name="barrido"))
+
+def _eje(eje: str) -> Tuple[str, Optional[int]]:
+    if eje not in EJES:
+        raise ValueError(f"eje no barrible: {eje!r} (opciones: {', '.join(EJES)})")
+    u, _, s = eje.partition(".")
+    return u, (_SEXOS.index(s) if s else None)
+
+def _rejilla(valores: Sequence[float]) -> np.ndarray:
+    g = np.unique(np.asarray(valores, dtype=float))
+    if not len(g) or not np.isfinite(g).all():
+        raise ValueError("la rejilla necesita al menos un valor finito")
+    return g
+
+class Sensibilidad:
+    """Barridos de umbrales sobre una cohorte fija.
+
+    `datos` es un DataFrame con las entradas del formulario (o el dict de
+    arrays de `preparar_entradas`). `thr` fija los umbrales no barridos y
+    `referencia` (por defecto `thr`) el diagnóstico con el que se compara.
+    """
+    def __init__(self, datos, thr: Thr = T, referencia: Optional[Thr] = None):
+        x = preparar_entradas(datos) if isinstance(datos, pd.DataFrame) else datos
+        r = evaluar_arrays(x, thr)
+        self.thr, self.referencia = thr, (referencia or thr)
+        self.n = len(x["sex_in"])
+        self.sexo = np.asarray(x["sex_in"], dtype=np.int8)
+        self.flags = {c: r[c] for c, *_ in CRITERIOS.values()}
+        # medidas; NaN = no medida (el criterio no se activa con ningún corte)
+        self.medidas = {
+            "hand_kg": np.where(x["hand_kg"] > 0, x["hand_kg"], np.nan),
+            "chair5_s": np.where(x["chair5_s"] != 0, x["chair5_s"], np.nan),
+            "gait_speed_mps": r["gait_speed_mps"], "smm_pct": r["smm_pct"], "dxa_alm_wt_pct": r["dxa_alm_wt_pct"],
+        }
+        dx = r["diagnostico"]
+        if self.referencia is not thr:
+            dx = rescorar_arrays(dict(x, **r), thr, self.referencia).get("diagnostico", dx)
+        self.diagnostico_ref = dx.astype(np.int64)
+        self._orden: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _ordenados(self, eje: str) -> Tuple[np.ndarray, np.ndarray]:
+        # (índices de los pacientes con medida válida, ordenados por la medida; valores ordenados)
+        if eje not in self._orden:
+            u, sexo = _eje(eje)
+            v = self.medidas[CRITERIOS[u][1]]
+            validos = ~np.isnan(v) if sexo is None else (~np.isnan(v) & (self.sexo == sexo))
+            idx = np.flatnonzero(validos)
+            idx = idx[np.argsort(v[idx], kind="stable")]
+            self._orden[eje] = (idx, v[idx])
+        return self._orden[eje]
+
+    def _entrada(self, eje: str, g: np.ndarray) -> np.ndarray:
+        """Por paciente, el primer punto de la rejilla (en el sentido en que el
+        criterio se va activando) a partir del cual se cumple; len(g) = nunca."""
+        idx, v = self._ordenados(eje)
+        op = CRITERIOS[_eje(eje)[0]][2]
+        G = len(g)
+        # s[i] = nº de valores ordenados que quedan por debajo del corte g[i]
+        s = np.searchsorted(v, g, side="left" if op == "<" else "right")
+        # el paciente de rango q se activa en los i con s[i] > q ("<", "<=") o s[i] <= q (">"),
+        # así que el nº de puntos con s[i] <= q basta para situarlo
+        k = np.repeat(np.arange(G + 1, dtype=np.int64), np.diff(np.concatenate(([0], s, [len(v)]))))
+        e = np.full(self.n, G, dtype=np.int64)
+        # ">" se activa en un prefijo de la rejilla: se cuenta sobre la rejilla invertida
+        e[idx] = (G - k) if op == ">" else k
+        return e
+
+    def barrer(self, eje: str, valores: Sequence[float],
+               eje2: Optional[str] = None, valores2: Optional[Sequence[float]] = None) -> Barrido:
+        """Diagnósticos de la cohorte en cada punto de la rejilla de uno o dos ejes
+        (ver `EJES`), con el resto de umbrales de `thr`."""
+        ejes = (eje,) if eje2 is None else (eje, eje2)
+        if len(set(ejes)) != len(ejes):
+            raise ValueError("los dos ejes deben ser distintos")
+        rejillas = (_rejilla(valores),) if eje2 is None else (_rejilla(valores), _rejilla(valores2))
+        G1, G2 = len(rejillas[0]), (len(rejillas[1]) if eje2 else 1)
+
+        # Resto de criterios (no barridos) de cada grupo, con los umbrales de `thr`
+        resto = {"funcion": np.zeros(self.n, dtype=bool), "masa": np.zeros(self.n, dtype=bool)}
+        for u, (c, _, _, grupo) in CRITERIOS.items():
+            f = self.flags[c]
+            for e in ejes:
+                ue, sexo = _eje(e)
+                if ue == u:
+                    f = f & (self.sexo != sexo) if sexo is not None else np.zeros(self.n, dtype=bool)
+            resto[grupo] |= f
+
+        # Histograma (grupo, entrada eje 1, entrada eje 2) y recuentos acumulados
+        grupo = (resto["funcion"] * 2 + resto["masa"]) * 3 + self.diagnostico_ref
+        e1 = self._entrada(eje, rejillas[0])
+        e2 = self._entrada(eje2, rejillas[1]) if eje2 else np.ones(self.n, dtype=np.int64)
+        h = np.bincount((grupo * (G1 + 1) + e1) * (G2 + 1) + e2, minlength=12 * (G1 + 1) * (G2 + 1))
+        h = h.reshape(12, G1 + 1, G2 + 1)
+        ambos = h.cumsum(1).cumsum(2)[:, :G1, :G2]             # cumplen los dos criterios barridos
+        k1 = h.sum(2).cumsum(1)[:, :G1, None]
+        k2 = h.sum(1).cumsum(1)[:, None, :G2]
+        total = h.sum((1, 2))[:, None, None]
+        combinaciones = {(True, True): ambos, (True, False): k1 - ambos,
+                         (False, True): k2 - ambos, (False, False): total - k1 - k2 + ambos}
+
+        es_funcion = [CRITERIOS[_eje(e)[0]][3] == "funcion" for e in ejes] + [False]
+        conf = np.zeros((3, 3, G1, G2), dtype=np.int64)
+        for gr in np.flatnonzero(total.ravel()):
+            rf, rm, ref = bool(gr // 6), bool(gr // 3 % 2), gr % 3
+            for (c1, c2), cuenta in combinaciones.items():
+                c2 = c2 and eje2 is not None
+                funcion = rf or (c1 and es_funcion[0]) or (c2 and es_funcion[1])
+                masa = rm or (c1 and not es_funcion[0]) or (c2 and not es_funcion[1])
+                nuevo = (2 if masa else 1) if funcion else 0
+                conf[ref, nuevo] += cuenta[gr]
+
+        # los ejes ">" se contaron sobre la rejilla invertida
+        for i, e in enumerate(ejes):
+            if CRITERIOS[_eje(e)[0]][2] == ">":
+                conf = np.flip(conf, axis=2 + i)
+        if eje2 is None:
+            conf = conf[..., 0]
+        return Barrido(ejes, rejillas, np.ascontiguousarray(conf), self.n)
+
+    def perfil_en(self, barrido: Barrido, *idx: int) -> Thr:
+        """Perfil `thr` con los umbrales barridos en el punto `idx` de la rejilla."""
+        cambios: Dict[str, object] = {}
+        for e, g, i in zip(barrido.ejes, barrido.valores, idx):
+            u, sexo = _eje(e)
+            v = float(g[i])
+            if sexo is not None:
+                v = dict(cambios.get(u) or getattr(self.thr, u), **{_SEXOS[sexo]: v})
+            cambios[u] = v
+        return perfil(self.thr.nombre, f"{self.thr.version}+barrido", base=self.thr, **cambios)
+
+def barrer(df: pd.DataFrame, eje: str, valores: Sequence[float], eje2: Optional[str] = None,
+           valores2: Optional[Sequence[float]] = None, thr: Thr = T, referencia: Optional[Thr] = None) -> Barrido:
+    """Barrido puntual (para varios barridos sobre la misma cohorte, usa `Sensibilidad`)."""
+    return Sensibilidad(df, thr, referencia).barrer(eje, valores, eje2, valores2)
@@ -0,0 +1,287 @@
+"""Servicio HTTP local (JSON) de evaluación SARKOB, sobre asyncio.
+
+    python -m sarkob.servicio --puerto 8750
+
+Rutas:
+    GET  /salud    → {"estado": "ok"}
+    POST /evaluar  → un paciente: {"sex_in": "female", "age_in": 70, "hand_kg": 14.5, ...}
+    POST /lote     → {"pacientes": [{...}, {...}]}
+    GET  /perfiles → claves de los perfiles de umbrales disponibles
+    GET  /metricas → métricas en formato Prometheus (con `--metricas`)
+
+Cada evaluación devuelve `entradas` (normalizadas), `resultado` (salidas de
+`evaluar`), `tabla` (filas de la tabla de la app), `diagnostico` e `informe`.
+Un paciente con entradas no válidas, o tan pequeñas que alguna salida es
+infinita (p. ej. un tiempo de 4 m de 1e-320), es un 400 en /evaluar; en /lote
+lleva `error` en su posición y el resto se evalúa igualmente. Los lotes se
+evalúan con el motor vectorizado y se serializan en un hilo aparte, para que
+un lote grande no bloquee el resto de conexiones. El perfil de umbrales se elige con la clave `"perfil"`
+("nombre@version") en el paciente o, en /lote, en el objeto de la petición;
+por defecto se usa el base. Los perfiles se cargan al arrancar desde
+`--perfiles DIR`. Sólo depende de la biblioteca estándar y del núcleo
+`sarkob`; umbrales e índice de percentiles se cargan una vez al importar.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import metricas
+from .reglas import Thr, T
+from .perfiles import cargar_perfiles, clave
+from .evaluacion import _NOMBRES_SALIDA, evaluar, normalizar_entradas
+from .cohorte import ETIQUETAS, evaluar_cohorte, _valores
+from .informe import COLUMNAS, filas_tabla, construir_informe
+
+log = logging.getLogger("sarkob.servicio")
+
+MAX_CUERPO = 32 * 1024 * 1024     # bytes
+MAX_LOTE = 10_000                 # pacientes por petición (~4 kB de respuesta cada uno)
+
+# /lote se evalúa y serializa fuera del bucle de eventos
+_LOTES = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sarkob-lote")
+
+_ESTADOS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str, cerrar: bool = False):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.cerrar = cerrar    # la petición no se ha leído entera: hay que cerrar la conexión
+
+PERFILES: Dict[str, Thr] = {clave(T): T}
+
+def _perfil(k: Any) -> Thr:
+    if k is None: return T
+    try:
+        return PERFILES[k]
+    except (KeyError, TypeError):
+        raise ValueError(f"perfil desconocido: {k}") from None
+
+def _salida(e: Dict[str, Any], r: Dict[str, Any], thr: Thr) -> Dict[str, Any]:
+    # entradas válidas pero ínfimas pueden dar salidas infinitas: es un error de entrada
+    infinitas = [k for k, v in r.items() if isinstance(v, float) and not math.isfinite(v)]
+    if infinitas:
+        raise ValueError("; ".join(f"{k} no finito" for k in infinitas))
+    with metricas.etapa("tabla"):
+        tabla = [dict(zip(COLUMNAS, fila)) for fila in filas_tabla(e, r, thr)]
+    with metricas.etapa("informe"):
+        informe = construir_informe(e, r)
+    return {"entradas": e, "resultado": r, "perfil": clave(thr),
+            "tabla": tabla, "diagnostico": r["diagnostico"], "informe": informe}
+
+def _entradas(d: Any, thr: Thr) -> Tuple[Dict[str, Any], Thr]:
+    if not isinstance(d, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    with metricas.etapa("entrada"):
+        if "perfil" in d:
+            d = dict(d)
+            thr = _perfil(d.pop("perfil"))
+        return normalizar_entradas(d), thr
+
+def evaluar_json(d: Dict[str, Any], thr: Thr = T) -> Dict[str, Any]:
+    e, thr = _entradas(d, thr)
+    return _salida(e, evaluar(**e, thr=thr), thr)
+
+def _resultados(res: pd.DataFrame) -> List[Dict[str, Any]]:
+    # salidas de `evaluar_cohorte` → dicts como los de `evaluar` (mismo orden,
+    # etiquetas como texto, NaN → None, tipos de Python)
+    cols = []
+    for k in _NOMBRES_SALIDA:
+        v = _valores(res[k])
+        if k in ETIQUETAS:
+            cols.append(np.array(ETIQUETAS[k], dtype=object)[v].tolist())
+        elif v.dtype.kind == "f":
+            cols.append([None if x != x else x for x in v.tolist()])
+        else:
+            cols.append(v.tolist())
+    return [dict(zip(_NOMBRES_SALIDA, fila)) for fila in zip(*cols)]
+
+def evaluar_lote(pacientes: List[Any], thr: Thr = T) -> List[Dict[str, Any]]:
+    """`evaluar_json` de cada paciente (o `{"error": motivo}`), con una
+    evaluación vectorizada por perfil de umbrales en vez de una por paciente."""
+    salida: List[Dict[str, Any]] = [{}] * len(pacientes)
+    grupos: Dict[str, Tuple[Thr, List[int], List[Dict[str, Any]]]] = {}
+    for i, d in enumerate(pacientes):
+        try:
+            e, t = _entradas(d, thr)
+        except ValueError as ex:
+            salida[i] = {"error": str(ex)}
+            continue
+        g = grupos.setdefault(clave(t), (t, [], []))
+        g[1].append(i)
+        g[2].append(e)
+    for t, idx, entradas in grupos.values():
+        res = evaluar_cohorte(pd.DataFrame(entradas, columns=list(entradas[0])), t)
+        if metricas.ACTIVAS:
+            metricas.contar_diagnosticos("individual", res["diagnostico"].value_counts(sort=False).items())
+        for i, e, r in zip(idx, entradas, _resultados(res)):
+            try:
+                salida[i] = _salida(e, r, t)
+            except ValueError as ex:
+                salida[i] = {"error": str(ex)}
+    return salida
+
+def _codificar(datos: Any) -> bytes:
+    try:
+        return json.dumps(datos, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    except ValueError:
+        raise ErrorHTTP(500, "resultado no finito; revisa las entradas")
+
+def _codificar_lote(pacientes: List[Any], thr: Thr) -> bytes:
+    # paciente a paciente: un único json.dumps de decenas de MB retendría el GIL
+    # (y con él el bucle de eventos) durante todo el volcado
+    partes = [_codificar(r) for r in evaluar_lote(pacientes, thr)]
+    return b'{"resultados":[' + b",".join(partes) + b"]}"
+
+# =========================
+# Rutas
+# =========================
+async def _evaluar(cuerpo: Any) -> Dict[str, Any]:
+    if not isinstance(cuerpo, dict):
+        raise ErrorHTTP(400, "se esperaba un objeto JSON con las entradas")
+    try:
+        return evaluar_json(cuerpo)
+    except ValueError as e:
+        raise ErrorHTTP(400, str(e))
+
+async def _lote(cuerpo: Any) -> bytes:
+    pacientes = cuerpo.get("pacientes") if isinstance(cuerpo, dict) else None
+    if not isinstance(pacientes, list):
+        raise ErrorHTTP(400, 'se esperaba {"pacientes": [...]}')
+    if len(pacientes) > MAX_LOTE:
+        raise ErrorHTTP(413, f"máximo {MAX_LOTE} pacientes por lote")
+    try:
+        thr = _perfil(cuerpo.get("perfil"))
+    except ValueError as e:
+        raise ErrorHTTP(400, str(e))
+    # evaluación y serialización (lo caro) en un hilo: el bucle sigue atendiendo
+    return await asyncio.get_running_loop().run_in_executor(_LOTES, _codificar_lote, pacientes, thr)
+
+async def _salud(cuerpo: Any) -> Dict[str, Any]:
+    return {"estado": "ok"}
+
+async def _perfiles(cuerpo: Any) -> Dict[str, Any]:
+    return {"perfiles": sorted(PERFILES)}
+
+async def _metricas(cuerpo: Any) -> str:
+    if not metricas.ACTIVAS:
+        raise ErrorHTTP(404, "métricas desactivadas (arranca con --metricas)")
+    return metricas.exportar()
+
+RUTAS = {("GET", "/salud"): _salud, ("GET", "/perfiles"): _perfiles, ("GET", "/metricas"): _metricas,
+         ("POST", "/evaluar"): _evaluar, ("POST", "/lote"): _lote}
+
+# =========================
+# HTTP/1.1 mínimo (keep-alive, Content-Length)
+# =========================
+async def _leer_peticion(reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> Tuple[str, str, Dict[str, str], bytes]:
+    cabecera = await reader.readuntil(b"\r\n\r\n")
+    lineas = cabecera.decode("latin-1").split("\r\n")
+    try:
+        metodo, ruta, _ = lineas[0].split(" ", 2)
+    except ValueError:
+        raise ErrorHTTP(400, "línea de petición no válida", cerrar=True)
+    headers = {}
+    for linea in lineas[1:]:
+        if ":" in linea:
+            k, v = linea.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        raise ErrorHTTP(411, "se requiere Content-Length", cerrar=True)
+    try:
+        n = int(headers.get("content-length") or 0)
+    except ValueError:
+        n = -1
+    if n < 0:
+        raise ErrorHTTP(400, "Content-Length no válido", cerrar=True)
+    if n > MAX_CUERPO:
+        raise ErrorHTTP(413, "cuerpo demasiado grande", cerrar=True)
+    if n and headers.get("expect", "").lower() == "100-continue":
+        # curl y otros clientes esperan esta respuesta (o ~1 s) antes de enviar el cuerpo
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+    cuerpo = await reader.readexactly(n) if n else b""
+    return metodo, ruta.split("?", 1)[0], headers, cuerpo
+
+def _respuesta(estado: int, datos: Any, cerrar: bool) -> bytes:
+    # las rutas devuelven objetos JSON (o JSON ya serializado, /lote), salvo /metricas (texto)
+    if isinstance(datos, str):
+        cuerpo, tipo = datos.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        cuerpo, tipo = (datos if isinstance(datos, bytes) else _codificar(datos)), "application/json"
+    return (f"HTTP/1.1 {estado} {_ESTADOS.get(estado, '')}\r\n"
+            f"Content-Type: {tipo}; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n").encode("latin-1") + cuerpo
+
+async def atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            cerrar = False
+            try:
+                metodo, ruta, headers, crudo = await _leer_peticion(reader, writer)
+                cerrar = headers.get("connection", "").lower() == "close"
+                fn = RUTAS.get((metodo, ruta))
+                if fn is None:
+                    raise ErrorHTTP(405 if any(r == ruta for _, r in RUTAS) else 404, f"{metodo} {ruta} no existe")
+                try:
+                    cuerpo = json.loads(crudo) if crudo else None
+                except ValueError:
+                    raise ErrorHTTP(400, "JSON no válido")
+                t0 = time.perf_counter()
+                datos = await fn(cuerpo)
+                if metricas.ACTIVAS:
+                    metricas.observar("sarkob_peticion_segundos", time.perf_counter() - t0, ruta=ruta)
+                # se serializa aquí para que un fallo sea un 500 y no una conexión cortada
+                salida = _respuesta(200, datos, cerrar)
+            except ErrorHTTP as e:
+                cerrar = cerrar or e.cerrar
+                salida = _respuesta(e.estado, {"error": str(e)}, cerrar)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except Exception:
+                log.exception("error atendiendo la petición")
+                cerrar = True
+                salida = _respuesta(500, {"error": "error interno"}, cerrar)
+            writer.write(salida)
+            await writer.drain()
+            if cerrar:
+                return
+    finally:
+        writer.close()
+
+async def servir(host: str = "127.0.0.1", puerto: int = 8750) -> None:
+    server = await asyncio.start_server(atender, host, puerto, backlog=1024)
+    log.info("SARKOB escuchando en http://%s:%d", host, puerto)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m sarkob.servicio", description="Servicio HTTP local de evaluación SARKOB.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8750)
+    ap.add_argument("--perfiles", help="directorio con perfiles de umbrales (*.json)")
+    ap.add_argument("--metricas", action="store_true", help="activa las métricas (GET /metricas)")
+    args = ap.parse_args(argv)
+    if args.metricas:
+        metricas.activar()
+    if args.perfiles:
+        PERFILES.update(cargar_perfiles(args.perfiles))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
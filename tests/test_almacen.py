@@ -0,0 +1,145 @@
+"""Registro de visitas: filtros de consulta, fechas, rescorado y migraciones."""
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import cohorte_sintetica
+from sarkob import T, evaluar_cohorte, perfil
+from sarkob.almacen import ESQUEMA, Almacen
+from sarkob.cohorte import ETIQUETAS, rescorar_cohorte
+from sarkob.perfiles import clave
+from sarkob.lotes import procesar, validar
+
+@pytest.fixture
+def db(tmp_path):
+    df = cohorte_sintetica(2_000, seed=3)
+    rng = np.random.default_rng(3)
+    df["fecha"] = pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, len(df)), unit="D")
+    df["fecha"] = df["fecha"].dt.strftime("%Y-%m-%d")
+    df["paciente"] = [f"P{i % 500}" for i in range(len(df))]
+    with Almacen(str(tmp_path / "r.db")) as a:
+        a.guardar_df(df, evaluar_cohorte(df))
+        yield a, pd.concat([df, evaluar_cohorte(df)], axis=1)
+
+@pytest.mark.parametrize("filtros, mascara", [
+    ({"sexo": "female"}, lambda d: d.sex_in == "female"),
+    ({"edad_min": 65}, lambda d: d.age_in >= 65),
+    ({"edad_min": 67, "edad_max": 80}, lambda d: d.age_in.between(67, 80)),
+    ({"anio": 2025}, lambda d: d.fecha.str.startswith("2025")),
+    ({"desde": date(2024, 6, 1), "hasta": "2024-06-30"}, lambda d: d.fecha.between("2024-06-01", "2024-06-30")),
+    ({"diagnostico": ["sarcopenia", "dinapenia"], "sexo": "male"},
+     lambda d: d.diagnostico.isin(["sarcopenia", "dinapenia"]) & (d.sex_in == "male")),
+    ({"vat_label": "elevada", "anio": 2024}, lambda d: (d.vat_label == "elevada") & d.fecha.str.startswith("2024")),
+    ({"paciente": "P7"}, lambda d: d.paciente == "P7"),
+])
+def test_filtros(db, filtros, mascara):
+    a, d = db
+    esperado = int(mascara(d).sum())
+    assert esperado and a.contar(**filtros) == esperado
+    assert len(a.consultar(["id"], **filtros)) == esperado
+
+def test_filtro_desconocido(db):
+    with pytest.raises(ValueError, match="filtro desconocido"):
+        db[0].contar(color="azul")
+
+def test_fechas(tmp_path):
+    df = pd.DataFrame({"sex_in": ["female", "male", "male"], "age_in": [70, 71, 72],
+                       "fecha": ["2025-03-01", "", None]})
+    with Almacen(str(tmp_path / "r.db")) as a:
+        a.guardar_df(df, fecha=date(2025, 6, 1))
+        assert [r["fecha"] for r in a.consultar(["fecha"])] == ["2025-03-01", "2025-06-01", "2025-06-01"]
+        with pytest.raises(ValueError, match="fechas no válidas"):
+            a.guardar_df(df.assign(fecha=["2025-13-45", "", ""]))
+        assert a.contar() == 3
+        with pytest.raises(ValueError, match="fecha no válida"):
+            a.contar(desde="01/02/2025")
+
+def test_lote_descarta_fechas_no_validas(tmp_path):
+    entrada = tmp_path / "f.csv"
+    entrada.write_text("sex_in,age_in,fecha\nfemale,70,2025-03-01\nmale,71,2025-13-45\n"
+                       "male,72,01/02/2025\nfemale,73,\nmale,74,2025-1-5\n", encoding="utf-8")
+    assert validar(pd.read_csv(entrada, dtype=str)).tolist() == [
+        "", "fecha no válida (AAAA-MM-DD)", "fecha no válida (AAAA-MM-DD)", "", "fecha no válida (AAAA-MM-DD)"]
+    with Almacen(str(tmp_path / "r.db")) as a:
+        r = procesar(str(entrada), str(tmp_path / "out.csv"), almacen=a, fecha=date(2025, 6, 1))
+        assert r == {"filas": 5, "evaluadas": 2, "errores": 3}
+        assert [(v["age_in"], v["fecha"]) for v in a.consultar(["age_in", "fecha"])] == [(70, "2025-03-01"), (73, "2025-06-01")]
+    assert pd.read_csv(tmp_path / "out.errores.csv")["fila"].tolist() == [2, 3, 5]
+
+def _como_evaluar(a, df, thr, **filtros):
+    # las salidas guardadas son las de evaluar_cohorte(df, thr) en las filas que cumplen `filtros`
+    res = evaluar_cohorte(df, thr)
+    guardado = a.consultar_df(["id", *res.columns], **filtros)
+    res = res.iloc[guardado["id"].to_numpy() - 1]
+    for k in res:
+        if k in ETIQUETAS:
+            assert (guardado[k].to_numpy() == res[k].astype(str).to_numpy()).all(), k
+        else:
+            np.testing.assert_allclose(guardado[k].to_numpy(dtype=float), res[k].to_numpy(dtype=float), err_msg=k)
+
+def test_rescorar_como_recalcular(db):
+    a, d = db
+    df = d.drop(columns=evaluar_cohorte(d.iloc[:1]).columns)
+    p = perfil("prueba", "1", vat_high_cm2={"female": 90.0, "male": 120.0}, chair5_slow_s=12.0)
+    cambian = rescorar_cohorte(df, evaluar_cohorte(df), T, p)[1]
+    assert a.rescorar(p) == {"visitas": len(df), "cambiadas": int(cambian.sum())}
+    _como_evaluar(a, df, p)
+    assert a.contar(perfil=clave(p)) == len(df) and a.contar(perfil=clave(T)) == 0
+    assert a.rescorar(p) == {"visitas": 0, "cambiadas": 0}
+
+    # con filtros sólo pasan las visitas que los cumplen
+    q = perfil("prueba", "2", base=p, calf_base={"female": 32.0, "male": 33.0})
+    hombres = int((df.sex_in == "male").sum())
+    assert a.rescorar(q, sexo="male")["visitas"] == hombres
+    _como_evaluar(a, df, q, sexo="male")
+    _como_evaluar(a, df, p, sexo="female")
+    assert a.contar(perfil=clave(q)) == hombres and a.contar(perfil=[clave(p), clave(q)]) == len(df)
+    assert {r["perfil"] for r in a.consultar(["perfil"], sexo="female")} == {clave(p)}
+
+    # las visitas nuevas con el perfil de origen no se pasan con las anteriores
+    vid = a.guardar({"sex_in": "female", "age_in": 70, "vat_cm2": 110.0}, thr=p)
+    assert a.rescorar(T, perfil=clave(q))["visitas"] == hombres
+    assert a.consultar(["perfil"], id=vid) == [{"perfil": clave(p)}]
+    assert a.rescorar(T)["visitas"] == len(df) - hombres + 1
+    _como_evaluar(a, df, T, id=list(range(1, len(df) + 1)))
+
+def _esquema_anterior(ruta, version):
+    # deja el registro como lo dejaba la versión `version` del esquema
+    con = sqlite3.connect(ruta)
+    with con:
+        con.execute("ALTER TABLE visitas ADD COLUMN perfil TEXT NOT NULL DEFAULT ''")
+        con.execute("UPDATE visitas SET perfil = (SELECT perfil FROM grupos WHERE grupos.id = visitas.grupo)")
+        con.execute("DROP INDEX ix_visitas_grupo")
+        con.execute("ALTER TABLE visitas DROP COLUMN grupo")
+        con.execute("DROP TABLE grupos")
+        if version == 1:
+            con.execute("ALTER TABLE visitas DROP COLUMN perfil")
+            con.execute("DROP TABLE perfiles")
+        else:
+            con.execute("CREATE INDEX ix_visitas_perfil ON visitas (perfil)")
+        con.execute(f"PRAGMA user_version={version}")
+    con.close()
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_migracion(tmp_path, version):
+    ruta = str(tmp_path / "v.db")
+    df = cohorte_sintetica(200, seed=5)
+    p = perfil("prueba", "1", vat_high_cm2={"female": 90.0, "male": 120.0})
+    with Almacen(ruta) as a:
+        a.guardar_df(df.iloc[:100])
+        a.guardar_df(df.iloc[100:], thr=p if version == 2 else T)
+        antes = a.consultar()
+    _esquema_anterior(ruta, version)
+
+    with Almacen(ruta) as a:
+        assert a.con.execute("PRAGMA user_version").fetchone()[0] == ESQUEMA
+        assert "perfil" not in {r[1] for r in a.con.execute("PRAGMA table_info(visitas)")}
+        assert a.consultar() == antes
+        assert a.contar(perfil=clave(T)) == (100 if version == 2 else 200)
+        assert a.rescorar(p)["visitas"] == (100 if version == 2 else 200)
+        _como_evaluar(a, df, p)
+        a.guardar({"sex_in": "male", "age_in": 70})
+        assert a.contar(perfil=clave(T)) == 1
@@ -0,0 +1,53 @@
+"""Re-evaluación incremental al cambiar de perfil."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import cohorte_sintetica
+from sarkob import T, UMBRALES, evaluar_cohorte, perfil
+from sarkob.cohorte import MEDIDA_UMBRAL, medidas_candidatas, rescorar_cohorte
+
+def _escalar(v, f):
+    return {s: x * f for s, x in v.items()} if isinstance(v, dict) else v * f
+
+@pytest.fixture(scope="module")
+def cohorte():
+    df = cohorte_sintetica(5_000, seed=11, p_vacio=0.3)
+    return df, evaluar_cohorte(df)
+
+@pytest.mark.parametrize("cambios", [
+    {"vat_high_cm2": {"female": 90.0, "male": 120.0}},
+    {"chair5_slow_s": 12.0, "handgrip_low": {"female": 18.0, "male": 30.0}},
+    {"smmwt_sarc_cut": {"female": 20.0, "male": 28.0}, "dxa_almwt_low_pct": {"female": 17.0, "male": 22.0}},
+    {"calf_base": {"female": 32.0, "male": 33.0}, "calf_bmi_adj": [[25.0, -3.0], [30.0, -6.0], [40.0, -9.0]]},
+    {"sarcf_pos_cut": 3},
+])
+def test_rescorar_cohorte_igual_que_recalcular(cohorte, cambios):
+    df, res = cohorte
+    despues = perfil("prueba", "1", **cambios)
+    out, cambio = rescorar_cohorte(df, res, T, despues)
+    esperado = evaluar_cohorte(df, despues)
+    pd.testing.assert_frame_equal(out, esperado)
+    distinta = np.zeros(len(df), dtype=bool)
+    for k in res:
+        distinta |= ~((res[k] == esperado[k]) | (res[k].isna() & esperado[k].isna())).to_numpy()
+    assert cambio.any() and (cambio == distinta).all()
+
+@pytest.mark.parametrize("umbral", sorted(MEDIDA_UMBRAL))
+def test_medida_candidata(cohorte, umbral):
+    # sin la medida informada, ningún cambio del umbral cambia la fila
+    df, res = cohorte
+    medida = MEDIDA_UMBRAL[umbral]
+    cambio = np.zeros(len(df), dtype=bool)
+    for f in (0.5, 0.8, 1.25, 2.0):
+        despues = perfil("prueba", str(f), **{umbral: _escalar(getattr(T, umbral), f)})
+        assert medidas_candidatas(T, despues) == (medida,)
+        cambio |= rescorar_cohorte(df, res, T, despues)[1]
+    assert cambio.any() and (df[medida][cambio] != 0).all()
+
+def test_sin_medida_candidata():
+    assert medidas_candidatas(T, perfil("prueba", "1")) == ()
+    for u in set(UMBRALES) - set(MEDIDA_UMBRAL) - {"calf_bmi_adj"}:
+        assert medidas_candidatas(T, perfil("prueba", "1", **{u: _escalar(getattr(T, u), 2)})) is None
+    assert medidas_candidatas(T, perfil("prueba", "1", vat_high_cm2={"female": 90.0, "male": 120.0},
+                                        sarcf_pos_cut=3)) is None
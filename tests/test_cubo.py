@@ -0,0 +1,69 @@
+"""Cubo de cohorte: recuentos y medias exactos, cuantiles a menos de un intervalo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.sintetico import cohorte_sintetica
+from sarkob import evaluar_cohorte
+from sarkob.cubo import DIMENSIONES, MEDIDAS, agregar
+from sarkob.percentiles import BANDAS_EDAD, banda_edad
+from sarkob.reglas import clase_imc
+
+@pytest.fixture(scope="module")
+def datos():
+    df = cohorte_sintetica(20_000, seed=8)
+    res = evaluar_cohorte(df)
+    bandas = DIMENSIONES["banda_edad"]
+    d = pd.DataFrame({
+        "sexo": df["sex_in"],
+        "banda_edad": [bandas[-1] if b is None else bandas[BANDAS_EDAD.index(b)] for b in map(banda_edad, df["age_in"])],
+        "clase_imc": [clase_imc(x) or "sin IMC" for x in res["bmi"]],
+        "diagnostico": res["diagnostico"].astype(str),
+        "perc": res["perc"], "gait_speed_mps": res["gait_speed_mps"], "smm_pct": res["smm_pct"],
+        "vat_cm2": df["vat_cm2"].where(df["vat_cm2"] > 0),
+    })
+    return agregar(df, res, "sarkob@1"), d
+
+@pytest.mark.parametrize("por, filtros", [
+    (None, {}), ("sexo", {}), ("clase_imc", {"sexo": ["female"]}),
+    ("banda_edad", {"clase_imc": ["obesidad I", "obesidad II"], "sexo": ["male"]}),
+])
+def test_prevalencia(datos, por, filtros):
+    c, d = datos
+    m = np.ones(len(d), dtype=bool)
+    for dim, cats in filtros.items():
+        m &= d[dim].isin(cats).to_numpy()
+    p = c.prevalencia(por, **filtros)["pacientes"]
+    grupos = d[m][por] if por else pd.Series("total", index=d.index[m])
+    esperado = pd.crosstab(grupos, d[m]["diagnostico"])
+    for g in p.index:
+        for dx in p.columns:
+            n = esperado.at[g, dx] if g in esperado.index and dx in esperado.columns else 0
+            assert p.at[g, dx] == n, (g, dx)
+    assert p.to_numpy().sum() == m.sum()
+
+@pytest.mark.parametrize("medida", list(MEDIDAS))
+@pytest.mark.parametrize("por, filtros", [("sexo", {}), ("diagnostico", {"sexo": ["female"]})])
+def test_resumen(datos, medida, por, filtros):
+    c, d = datos
+    m = np.ones(len(d), dtype=bool)
+    for dim, cats in filtros.items():
+        m &= d[dim].isin(cats).to_numpy()
+    r = c.resumen(medida, por, **filtros)
+    _, lo, hi, paso = MEDIDAS[medida]
+    for g, v in d[m].groupby(por)[medida]:
+        v = v.dropna().to_numpy()
+        assert r.at[g, "n"] == len(v)
+        assert r.at[g, "media"] == pytest.approx(v.mean(), rel=1e-12)
+        # fuera de la rejilla los valores cuentan en el primer o último intervalo
+        v = np.clip(v, lo, hi)
+        for nombre, q in (("p25", 0.25), ("mediana", 0.5), ("p75", 0.75)):
+            assert abs(r.at[g, nombre] - np.quantile(v, q)) <= paso, (g, nombre)
+
+def test_grupo_vacio(datos):
+    r = datos[0].resumen("vat_cm2", "sexo", diagnostico=["no existe"])
+    assert (r["n"] == 0).all() and r["media"].isna().all() and r["mediana"].isna().all()
+
+def test_dimension_desconocida(datos):
+    with pytest.raises(ValueError, match="dimensiones desconocidas"):
+        datos[0].prevalencia(color=["azul"])
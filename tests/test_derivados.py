@@ -0,0 +1,31 @@
+"""Estado derivado de la app: sólo se recalcula (y se cuenta) lo que cambia."""
+import re
+
+import pytest
+
+from sarkob import ENTRADAS, metricas
+from sarkob.derivados import Derivados
+
+@pytest.fixture
+def activas():
+    antes = metricas.ACTIVAS
+    metricas.activar(True)
+    metricas.reiniciar()
+    yield
+    metricas.activar(antes)
+    metricas.reiniciar()
+
+def _evaluaciones() -> int:
+    return sum(int(n) for n in re.findall(r'^sarkob_evaluaciones_total\{.*modo="app".*\} (\d+)$',
+                                          metricas.exportar(), re.M))
+
+def test_cuenta_solo_diagnosticos_calculados(activas):
+    d = Derivados()
+    e = dict(ENTRADAS, sex_in="female", age_in=70, hand_kg=22.0)
+    d.actualizar(e)
+    assert _evaluaciones() == 1
+    d.actualizar(e)                                   # rerun sin cambios
+    d.actualizar(dict(e, waist_cm=95.0))              # no afecta al diagnóstico
+    assert "_diagnostico" not in d.recalculados and _evaluaciones() == 1
+    d.actualizar(dict(e, waist_cm=95.0, hand_kg=12.0))
+    assert d.valores["diagnostico"] == "dinapenia" and _evaluaciones() == 2
@@ -0,0 +1,73 @@
+"""Informes en masa: mismos textos que `construir_informe(evaluar(...))` en todos los orígenes y formatos."""
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+
+import pytest
+
+from benchmarks.sintetico import cohorte_sintetica
+from sarkob import ENTRADAS, construir_informe, evaluar, perfil
+from sarkob.almacen import Almacen
+from sarkob.exportacion import escribir_informes, informes_almacen, informes_df, informes_fichero
+
+P = perfil("prueba", "1", vat_high_cm2={"female": 90.0, "male": 120.0}, chair5_slow_s=12.0)
+
+@pytest.fixture(scope="module")
+def cohorte():
+    df = cohorte_sintetica(300, seed=4)
+    esperados = []
+    for fila in df.to_dict("records"):
+        e = dict(ENTRADAS, **fila)
+        esperados.append(construir_informe(e, evaluar(**e, thr=P)))
+    return df, esperados
+
+def _todos(bloques):
+    ids, textos = [], []
+    for i, t in bloques:
+        ids += i; textos += t
+    return ids, textos
+
+def test_desde_dataframe(cohorte):
+    df, esperados = cohorte
+    ids, textos = _todos(informes_df(df, P, bloque=64))
+    assert textos == esperados and ids == [str(i) for i in range(1, len(df) + 1)]
+
+def test_desde_fichero(cohorte, tmp_path):
+    df, esperados = cohorte
+    df.to_csv(tmp_path / "c.csv", index=False)
+    assert _todos(informes_fichero(str(tmp_path / "c.csv"), P, chunksize=100))[1] == esperados
+
+def test_desde_almacen(cohorte, tmp_path):
+    df, esperados = cohorte
+    with Almacen(str(tmp_path / "r.db")) as a:
+        a.guardar_df(df.assign(paciente=[f"P{i}" for i in range(len(df))]), thr=P, fecha=date(2025, 1, 2))
+        ids, textos = _todos(informes_almacen(a, bloque=64))
+    assert textos == esperados and ids[:2] == ["P0_2025-01-02", "P1_2025-01-02"]
+
+@pytest.mark.parametrize("formato", ["zip", "csv", "md"])
+def test_formatos(cohorte, formato):
+    df, esperados = cohorte
+    ids = [f"P{i}/\"x\"" for i in range(len(df))]       # caracteres que hay que escapar
+    f = io.BytesIO()
+    assert escribir_informes(f, [(ids[:100], esperados[:100]), (ids[100:], esperados[100:])], formato) == len(df)
+    datos = f.getvalue()
+    if formato == "zip":
+        with zipfile.ZipFile(io.BytesIO(datos)) as z:
+            nombres = z.namelist()
+            leidos = [z.read(n).decode("utf-8") for n in nombres]
+        assert nombres[:2] == ["000001_P0-x-.txt", "000002_P1-x-.txt"]
+    elif formato == "csv":
+        filas = list(csv.reader(io.StringIO(datos.decode("utf-8"), newline="")))
+        assert filas[0] == ["id", "informe"] and [r[0] for r in filas[1:]] == ids
+        leidos = [r[1] for r in filas[1:]]
+    else:
+        secciones = re.findall(r"## ([^\n]*)\n\n```\n(.*?)\n```\n\n", datos.decode("utf-8"), re.S)
+        assert [s[0] for s in secciones] == ids
+        leidos = [s[1] for s in secciones]
+    assert leidos == esperados
+
+def test_formato_no_soportado():
+    with pytest.raises(ValueError, match="formato no soportado"):
+        escribir_informes(io.BytesIO(), [], "pdf")
@@ -0,0 +1,5 @@
+"""Corpus dorado: todos los motores reproducen las salidas congeladas."""
+from benchmarks.golden import comprobar
+
+def test_corpus_dorado():
+    assert comprobar(procesos=1) == []
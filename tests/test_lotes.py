@@ -0,0 +1,74 @@
+"""Modo lote: los tipos de cada bloque no deben romper la escritura Parquet."""
+import re
+
+import pandas as pd
+import pytest
+
+from sarkob.lotes import procesar
+
+pytest.importorskip("pyarrow")
+
+def test_parquet_con_tipos_distintos_entre_bloques(tmp_path):
+    # bloque 1: hand_kg entero, paciente numérico y fecha vacía;
+    # bloque 2: hand_kg decimal, paciente alfanumérico y fecha informada
+    filas = ["sex_in,age_in,hand_kg,paciente,fecha"]
+    filas += [f"female,70,{20 + i % 5},{i}," for i in range(10)]
+    filas += ["male,71,12.5,H-7,2025-03-01", "f,65,,H-8,2025-03-02"]
+    entrada = tmp_path / "cohorte.csv"
+    entrada.write_text("\n".join(filas) + "\n", encoding="utf-8")
+    salida = tmp_path / "resultados.parquet"
+
+    r = procesar(str(entrada), str(salida), chunksize=10)
+
+    assert r == {"filas": 12, "evaluadas": 12, "errores": 0}
+    df = pd.read_parquet(salida)
+    assert df["hand_kg"].tolist()[-3:-1] == [24.0, 12.5] and pd.isna(df["hand_kg"].iloc[-1])
+    assert df["paciente"].tolist()[-3:] == ["9", "H-7", "H-8"]
+    assert df["fecha"].tolist()[-2:] == ["2025-03-01", "2025-03-02"]
+
+def test_no_finitos_son_errores_de_fila(tmp_path):
+    filas = ["sex_in,age_in,hand_kg,time_4m",
+             "female,70,20,5",
+             "male,71,inf,5",
+             "male,72,-inf,5",
+             "female,73,20,1e-320"]
+    entrada = tmp_path / "cohorte.csv"
+    entrada.write_text("\n".join(filas) + "\n", encoding="utf-8")
+    salida = tmp_path / "resultados.csv"
+
+    r = procesar(str(entrada), str(salida), errores=str(tmp_path / "errores.csv"))
+
+    assert r == {"filas": 4, "evaluadas": 1, "errores": 3}
+    err = pd.read_csv(tmp_path / "errores.csv")
+    assert err["fila"].tolist() == [2, 3, 4]
+    assert err["error"].tolist() == ["hand_kg no finito", "hand_kg no finito", "gait_speed_mps no finito"]
+    assert pd.read_csv(salida)["age_in"].tolist() == [70]
+
+def test_misma_regla_que_el_servicio():
+    # `validar` (lote) y `normalizar_entradas` (servicio) rechazan con el mismo motivo
+    import math
+    from sarkob.evaluacion import normalizar_entradas
+    from sarkob.lotes import validar
+    for x, motivo in ((math.inf, "hand_kg no finito"), (-1.0, "hand_kg fuera de rango (< 0)")):
+        with pytest.raises(ValueError, match=re.escape(motivo)):
+            normalizar_entradas({"sex_in": "male", "age_in": 70, "hand_kg": x})
+        assert validar(pd.DataFrame({"sex_in": ["male"], "age_in": [70], "hand_kg": [x]})).tolist() == [motivo]
+
+def test_en_paralelo_igual_que_en_serie(tmp_path):
+    # varios bloques (uno sólo con errores) y un envío siempre pendiente
+    from benchmarks.sintetico import cohorte_sintetica
+    from sarkob.almacen import Almacen
+    df = cohorte_sintetica(500, seed=2)
+    df.loc[df.index % 7 == 3, "sex_in"] = "x"
+    df.loc[100:149, "hand_kg"] = -1.0
+    entrada = tmp_path / "cohorte.csv"
+    df.to_csv(entrada, index=False)
+    salidas = {}
+    for procesos in (1, 2):
+        with Almacen(str(tmp_path / f"{procesos}.db")) as a:
+            r = procesar(str(entrada), str(tmp_path / f"{procesos}.csv"), chunksize=50, procesos=procesos, almacen=a)
+            salidas[procesos] = (r, pd.read_csv(tmp_path / f"{procesos}.csv"),
+                                 pd.read_csv(tmp_path / f"{procesos}.errores.csv"), a.consultar_df())
+    assert salidas[1][0] == salidas[2][0] == {"filas": 500, "evaluadas": 386, "errores": 114}
+    for a, b in zip(salidas[1][1:], salidas[2][1:]):
+        pd.testing.assert_frame_equal(a, b)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sarkob import evaluar_cohorte, evaluar_paralelo
+
+def _cohorte():
+    # tipos mezclados: texto numérico, NaN, columna ausente (calf_cm) y sexo con variantes
+    return pd.DataFrame({
+        "sex_in": ["female", " Male", "F", "male", "female"] * 20,
+        "age_in": [67, 80, np.nan, 45, 101] * 20,
+        "height_cm": [158.0, 172.0, 165.0, 180.0, 150.0] * 20,
+        "weight_kg": [92.4, 70.0, 0.0, 95.0, np.nan] * 20,
+        "hand_kg": ["15.2", "", "30", "41.5", None] * 20,
+        "time_4m": [5.6, 3.1, np.nan, 4.0, 8.0] * 20,
+        "smm_kg": [20.1, 30.0, 25.0, np.nan, 18.0] * 20,
+    }, index=pd.RangeIndex(10, 110))
+
+def test_igual_que_evaluar_cohorte():
+    df = _cohorte()
+    pd.testing.assert_frame_equal(evaluar_paralelo(df, procesos=2), evaluar_cohorte(df))
+
+def test_cohorte_vacia():
+    df = _cohorte().iloc[:0]
+    pd.testing.assert_frame_equal(evaluar_paralelo(df, procesos=2), evaluar_cohorte(df))
+
+def test_sexo_no_reconocido():
+    df = _cohorte()
+    df.loc[50, "sex_in"] = "x"
+    with pytest.raises(KeyError, match="sexo no reconocido"):
+        evaluar_paralelo(df, procesos=2)
@@ -0,0 +1,98 @@
+"""Servicio HTTP: errores por paciente, códigos de estado y framing HTTP/1.1."""
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+from sarkob import servicio
+from sarkob.servicio import evaluar_json, evaluar_lote
+
+OK = {"sex_in": "female", "age_in": 67, "hand_kg": 15.2, "time_4m": 5.6}
+INFINITO = {"sex_in": "male", "age_in": 70, "time_4m": 1e-320}   # velocidad = inf
+
+def test_salida_infinita_es_error_de_entrada():
+    with pytest.raises(ValueError, match="gait_speed_mps no finito"):
+        evaluar_json(INFINITO)
+
+def test_lote_error_en_su_posicion():
+    r = evaluar_lote([OK, INFINITO, {"sex_in": "x", "age_in": 70}, "no", dict(OK, perfil="nada@1")])
+    assert r[0] == evaluar_json(OK)
+    assert [x.get("error") for x in r[1:]] == [
+        "gait_speed_mps no finito", "sexo no reconocido: 'x'", "se esperaba un objeto JSON", "perfil desconocido: nada@1"]
+
+# =========================
+# HTTP
+# =========================
+@pytest.fixture(scope="module")
+def puerto():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(servicio.atender, "127.0.0.1", 0))
+    hilo = threading.Thread(target=loop.run_forever, daemon=True)
+    hilo.start()
+    yield server.sockets[0].getsockname()[1]
+
+    async def parar():
+        server.close()
+        tareas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(parar(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    hilo.join()
+    loop.close()
+
+def _leer(f):
+    estado = int(f.readline().split()[1])
+    cabeceras = {}
+    while (linea := f.readline().decode("latin-1").strip()):
+        k, v = linea.split(":", 1)
+        cabeceras[k.lower()] = v.strip()
+    cuerpo = f.read(int(cabeceras.get("content-length", 0)))
+    return estado, cabeceras, (json.loads(cuerpo) if cuerpo else None)
+
+def _peticion(puerto, metodo, ruta, cuerpo=None, cabeceras="", conexion=None):
+    s = conexion or socket.create_connection(("127.0.0.1", puerto), timeout=10)
+    crudo = b"" if cuerpo is None else json.dumps(cuerpo).encode()
+    s.sendall(f"{metodo} {ruta} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(crudo)}\r\n{cabeceras}\r\n".encode() + crudo)
+    return _leer(s.makefile("rb"))
+
+def test_evaluar_y_keep_alive(puerto):
+    with socket.create_connection(("127.0.0.1", puerto), timeout=10) as s:
+        estado, cab, datos = _peticion(puerto, "POST", "/evaluar", OK, conexion=s)
+        assert estado == 200 and cab["connection"] == "keep-alive"
+        assert datos["diagnostico"] == evaluar_json(OK)["diagnostico"]
+        assert _peticion(puerto, "GET", "/salud", conexion=s)[0] == 200
+
+def test_codigos_de_error(puerto):
+    assert _peticion(puerto, "POST", "/evaluar", INFINITO)[0] == 400
+    assert _peticion(puerto, "POST", "/evaluar", [1])[0] == 400
+    assert _peticion(puerto, "GET", "/nada")[0] == 404
+    assert _peticion(puerto, "GET", "/evaluar")[0] == 405
+    estado, _, datos = _peticion(puerto, "POST", "/lote", {"pacientes": [OK, INFINITO]})
+    assert estado == 200 and [("error" in r) for r in datos["resultados"]] == [False, True]
+
+def test_lote_demasiado_grande(puerto, monkeypatch):
+    monkeypatch.setattr(servicio, "MAX_LOTE", 2)
+    assert _peticion(puerto, "POST", "/lote", {"pacientes": [OK] * 3})[0] == 413
+
+@pytest.mark.parametrize("longitud", ["abc", "-5"])
+def test_content_length_no_valido_cierra(puerto, longitud):
+    with socket.create_connection(("127.0.0.1", puerto), timeout=10) as s:
+        s.sendall(f"POST /evaluar HTTP/1.1\r\nContent-Length: {longitud}\r\n\r\n".encode())
+        f = s.makefile("rb")
+        estado, cab, _ = _leer(f)
+        assert estado == 400 and cab["connection"] == "close"
+        assert f.read() == b""
+
+def test_expect_100_continue(puerto):
+    crudo = json.dumps(OK).encode()
+    with socket.create_connection(("127.0.0.1", puerto), timeout=10) as s:
+        s.sendall(f"POST /evaluar HTTP/1.1\r\nContent-Length: {len(crudo)}\r\nExpect: 100-continue\r\n\r\n".encode())
+        f = s.makefile("rb")
+        assert f.readline() == b"HTTP/1.1 100 Continue\r\n" and f.readline() == b"\r\n"
+        s.sendall(crudo)
+        assert _leer(f)[0] == 200